@@ -19,21 +19,78 @@ class Settings:
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
     EMBEDDING_DIMENSION: int = int(os.getenv("EMBEDDING_DIMENSION", "3072"))
     
+    # Shared HTTP connection pool of all OpenAI clients
+    OPENAI_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+    OPENAI_MAX_KEEPALIVE: int = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+    OPENAI_KEEPALIVE_EXPIRY: float = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))  # seconds
+    OPENAI_TIMEOUT: float = float(os.getenv("OPENAI_TIMEOUT", "60"))  # seconds
+    OPENAI_CONNECT_TIMEOUT: float = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))  # seconds
+    OPENAI_HTTP2: bool = os.getenv("OPENAI_HTTP2", "false").lower() == "true"  # needs the h2 package
+    
     # Pinecone Configuration
     PINECONE_API_KEY: str = os.getenv("PINECONE_API_KEY", "")
     PINECONE_ENVIRONMENT: str = os.getenv("PINECONE_ENVIRONMENT", "")
     PINECONE_INDEX_NAME: str = os.getenv("PINECONE_INDEX_NAME", "rag-demo-index")
+    PINECONE_READY_TIMEOUT: float = float(os.getenv("PINECONE_READY_TIMEOUT", "300"))  # seconds
     
     # Weaviate Configuration
     WEAVIATE_URL: str = os.getenv("WEAVIATE_URL", "http://localhost:8080")
     WEAVIATE_API_KEY: Optional[str] = os.getenv("WEAVIATE_API_KEY")
     WEAVIATE_CLASS_NAME: str = "RAGDocument"
+    # Sync client connections shared by all threads of one WeaviateStore
+    WEAVIATE_POOL_SIZE: int = int(os.getenv("WEAVIATE_POOL_SIZE", "8"))
     
     # Relevance AI Configuration
     RELEVANCE_PROJECT: str = os.getenv("RELEVANCE_PROJECT", "")
     RELEVANCE_API_KEY: str = os.getenv("RELEVANCE_API_KEY", "")
     RELEVANCE_DATASET_ID: str = os.getenv("RELEVANCE_DATASET_ID", "rag-demo-dataset")
     
+    # Local (in-process) vector store
+    LOCAL_STORE_PATH: str = os.getenv("LOCAL_STORE_PATH", "data/local_store")
+    LOCAL_QUANTIZATION: str = os.getenv("LOCAL_QUANTIZATION", "none")  # none, int8, binary
+    LOCAL_RESCORE_FACTOR: int = int(os.getenv("LOCAL_RESCORE_FACTOR", "4"))
+    LOCAL_PROJECTION_DIM: int = int(os.getenv("LOCAL_PROJECTION_DIM", "256"))  # 0 = by variance
+    LOCAL_PROJECTION_VARIANCE: float = float(os.getenv("LOCAL_PROJECTION_VARIANCE", "0.95"))
+    LOCAL_FLUSH_ROWS: int = int(os.getenv("LOCAL_FLUSH_ROWS", "10000"))
+    LOCAL_FLUSH_INTERVAL: float = float(os.getenv("LOCAL_FLUSH_INTERVAL", "5"))  # seconds
+    LOCAL_COMPACT_ROWS: int = int(os.getenv("LOCAL_COMPACT_ROWS", "100000"))
+    LOCAL_WAL_FSYNC: bool = os.getenv("LOCAL_WAL_FSYNC", "true").lower() == "true"
+    LOCAL_SEARCH_WORKERS: int = int(os.getenv("LOCAL_SEARCH_WORKERS", "0"))  # 0 = CPU count
+    LOCAL_PARALLEL_MIN_ROWS: int = int(os.getenv("LOCAL_PARALLEL_MIN_ROWS", "200000"))
+    
+    # Local approximate-nearest-neighbour (IVF) store
+    IVF_STORE_PATH: str = os.getenv("IVF_STORE_PATH", "data/ivf_store")
+    IVF_NLIST: int = int(os.getenv("IVF_NLIST", "1024"))
+    IVF_NPROBE: int = int(os.getenv("IVF_NPROBE", "16"))
+    
+    # Document store: chunk texts kept locally instead of in the vector stores
+    DOCSTORE_ENABLED: bool = os.getenv("DOCSTORE_ENABLED", "false").lower() == "true"
+    DOCSTORE_PATH: str = os.getenv("DOCSTORE_PATH", "data/docstore.sqlite3")
+    PARENT_WINDOW_CHARS: int = int(os.getenv("PARENT_WINDOW_CHARS", "500"))
+    
+    # Token budget of the retrieved context put into a generation prompt
+    CONTEXT_MAX_TOKENS: int = int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))
+    
+    # Token budget of sentences kept by extractive context compression
+    COMPRESSION_MAX_TOKENS: int = int(os.getenv("COMPRESSION_MAX_TOKENS", "1000"))
+    
+    # OpenAI rate limits shared by batch generation jobs (0 = unlimited) and
+    # the number of concurrent requests of batch generation
+    OPENAI_RPM: int = int(os.getenv("OPENAI_RPM", "500"))
+    OPENAI_TPM: int = int(os.getenv("OPENAI_TPM", "200000"))
+    GENERATE_CONCURRENCY: int = int(os.getenv("GENERATE_CONCURRENCY", "8"))
+    
+    # Persistent cache of generated answers
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+    ANSWER_CACHE_PATH: str = os.getenv("ANSWER_CACHE_PATH", "data/answer_cache.sqlite3")
+    ANSWER_CACHE_TTL: float = float(os.getenv("ANSWER_CACHE_TTL", "86400"))  # seconds
+    
+    # Multi-store retrieval deadlines (seconds)
+    RETRIEVE_STORE_TIMEOUT: float = float(os.getenv("RETRIEVE_STORE_TIMEOUT", "10"))
+    RETRIEVE_TOTAL_TIMEOUT: float = float(os.getenv("RETRIEVE_TOTAL_TIMEOUT", "15"))
+    # Timed-out queries of one store that may still occupy pool threads
+    RETRIEVE_MAX_ABANDONED: int = int(os.getenv("RETRIEVE_MAX_ABANDONED", "2"))
+    
     @classmethod
     def validate(cls) -> bool:
         """
@@ -73,6 +130,9 @@ class Settings:
         print(f"Weaviate Class: {cls.WEAVIATE_CLASS_NAME}")
         print(f"Relevance Project: {cls.RELEVANCE_PROJECT}")
         print(f"Relevance Dataset: {cls.RELEVANCE_DATASET_ID}")
+        print(f"Local Store Path: {cls.LOCAL_STORE_PATH} (quantization: {cls.LOCAL_QUANTIZATION})")
+        print(f"IVF Store: {cls.IVF_STORE_PATH} (nlist={cls.IVF_NLIST}, nprobe={cls.IVF_NPROBE})")
+        print(f"DocStore: {cls.DOCSTORE_PATH if cls.DOCSTORE_ENABLED else 'disabled'}")
         print("=" * 60)
 
 
@@ -3,10 +3,10 @@ Embedding generation using OpenAI's text-embedding-3-large model.
 """
 
 from typing import List
-from openai import OpenAI
 from loguru import logger
 
 from config.settings import settings
+from utils.openai_client import get_openai_client, get_async_openai_client
 
 
 class Embedder:
@@ -32,7 +32,8 @@ class Embedder:
         if not self.api_key:
             raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY in .env file.")
         
-        self.client = OpenAI(api_key=self.api_key)
+        # Shared client: one connection pool for all embedders and generators
+        self.client = get_openai_client(self.api_key)
         logger.info(f"Initialized Embedder with model: {self.model}")
     
     def embed_text(self, text: str) -> List[float]:
@@ -98,6 +99,64 @@ class Embedder:
             logger.error(f"Error generating batch embeddings: {e}")
             raise
     
+    async def aembed_text(self, text: str) -> List[float]:
+        """
+        Asynchronous variant of embed_text().
+        
+        Args:
+            text: The text to embed
+            
+        Returns:
+            List of float values representing the embedding vector
+        """
+        if not text or not text.strip():
+            logger.warning("Empty text provided for embedding")
+            return []
+        
+        try:
+            response = await get_async_openai_client(self.api_key).embeddings.create(
+                input=text,
+                model=self.model
+            )
+            embedding = response.data[0].embedding
+            logger.debug(f"Generated embedding for text (length: {len(text)} chars)")
+            return embedding
+        
+        except Exception as e:
+            logger.error(f"Error generating embedding: {e}")
+            raise
+    
+    async def aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Asynchronous variant of embed_batch().
+        
+        Args:
+            texts: List of texts to embed
+            
+        Returns:
+            List of embedding vectors (empty texts are skipped)
+        """
+        valid_texts = [t for t in texts if t and t.strip()]
+        
+        if not valid_texts:
+            logger.warning("All texts in batch are empty")
+            return []
+        
+        try:
+            logger.info(f"Generating embeddings for {len(valid_texts)} texts")
+            response = await get_async_openai_client(self.api_key).embeddings.create(
+                input=valid_texts,
+                model=self.model
+            )
+            
+            embeddings = [item.embedding for item in response.data]
+            logger.info(f"Successfully generated {len(embeddings)} embeddings")
+            return embeddings
+        
+        except Exception as e:
+            logger.error(f"Error generating batch embeddings: {e}")
+            raise
+    
     def get_embedding_dimension(self) -> int:
         """
         Get the dimension of embeddings produced by the current model.
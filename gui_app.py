@@ -14,6 +14,7 @@ from PySide6.QtGui import QFont, QTextCursor
 
 from embeddings.embedder import Embedder
 from rag.retriever import Retriever
+from rag.cache import QueryCache
 from rag.generator import RAGGenerator
 from utils.chunker import TextChunker
 
@@ -38,6 +39,27 @@ class WorkerThread(QThread):
             self.error.emit(str(e))
 
 
+class StreamWorkerThread(QThread):
+    """Поток, который передаёт элементы итератора по мере их появления"""
+    item = Signal(object)
+    finished = Signal()
+    error = Signal(str)
+    
+    def __init__(self, func, *args, **kwargs):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+    
+    def run(self):
+        try:
+            for item in self.func(*self.args, **self.kwargs):
+                self.item.emit(item)
+            self.finished.emit()
+        except Exception as e:
+            self.error.emit(str(e))
+
+
 class RAGApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -116,7 +138,7 @@ class RAGApp(QMainWindow):
         db_layout = QHBoxLayout()
         db_layout.addWidget(QLabel("Векторная БД:"))
         self.db_combo = QComboBox()
-        self.db_combo.addItems(["pinecone", "weaviate"])
+        self.db_combo.addItems(["pinecone", "weaviate", "local", "ivf", "pinecone + weaviate"])
         db_layout.addWidget(self.db_combo)
         db_layout.addStretch()
         add_layout.addLayout(db_layout)
@@ -164,7 +186,7 @@ class RAGApp(QMainWindow):
         
         settings_layout.addWidget(QLabel("Векторная БД:"))
         self.search_db_combo = QComboBox()
-        self.search_db_combo.addItems(["pinecone", "weaviate"])
+        self.search_db_combo.addItems(["pinecone", "weaviate", "local", "ivf", "pinecone + weaviate (RRF)"])
         settings_layout.addWidget(self.search_db_combo)
         
         settings_layout.addWidget(QLabel("Количество результатов:"))
@@ -261,7 +283,7 @@ class RAGApp(QMainWindow):
         try:
             self.statusBar().showMessage("Инициализация RAG системы...")
             self.embedder = Embedder()
-            self.retriever = Retriever(self.embedder)
+            self.retriever = Retriever(self.embedder, cache=QueryCache())
             self.generator = RAGGenerator()
             self.statusBar().showMessage("RAG система готова к работе")
         except Exception as e:
@@ -327,14 +349,23 @@ class RAGApp(QMainWindow):
             # Разбиваем на чанки (меньший размер для более точного поиска)
             chunker = TextChunker(chunk_size=200, chunk_overlap=20)
             chunks = chunker.chunk_text(text)
+            metadata = [{"doc_id": len(self.documents), "chunk_id": i} for i in range(len(chunks))]
             
-            # Добавляем чанки
-            self.retriever.add_documents(
-                texts=chunks,
-                store_type=store_type,
-                metadata=[{"doc_id": len(self.documents), "chunk_id": i} for i in range(len(chunks))]
-            )
-            return (text, len(chunks))
+            # Добавляем чанки (в несколько БД - с одним расчётом эмбеддингов)
+            if store_type == "pinecone + weaviate":
+                report = self.retriever.add_documents(
+                    texts=chunks,
+                    stores=["pinecone", "weaviate"],
+                    metadata=metadata
+                )
+            else:
+                self.retriever.add_documents(
+                    texts=chunks,
+                    store_type=store_type,
+                    metadata=metadata
+                )
+                report = {store_type: {"success": True, "count": len(chunks), "error": None}}
+            return (text, len(chunks), report)
         
         thread = WorkerThread(add_doc)
         thread.finished.connect(self.on_document_added)
@@ -344,18 +375,34 @@ class RAGApp(QMainWindow):
     
     def on_document_added(self, result):
         """Обработка успешного добавления документа"""
-        text, num_chunks = result
-        store_type = self.db_combo.currentText()
-        self.documents.append((text, store_type))
-        preview = text[:100] + "..." if len(text) > 100 else text
-        self.doc_list.addItem(f"[{len(self.documents)}] [{store_type}] {preview} ({num_chunks} чанков)")
-        self.doc_input.clear()
-        
+        text, num_chunks, report = result
         self.btn_add_doc.setEnabled(True)
         self.progress_bar.setVisible(False)
-        self.statusBar().showMessage(f"Документ разбит на {num_chunks} чанков и добавлен в {store_type}")
         
-        QMessageBox.information(self, "Успех", f"Документ разбит на {num_chunks} чанков и добавлен в {store_type}")
+        added = [store for store, status in report.items() if status["success"]]
+        failed = {store: status["error"] for store, status in report.items() if not status["success"]}
+        
+        if added:
+            store_label = ", ".join(added)
+            self.documents.append((text, store_label))
+            preview = text[:100] + "..." if len(text) > 100 else text
+            self.doc_list.addItem(f"[{len(self.documents)}] [{store_label}] {preview} ({num_chunks} чанков)")
+            self.doc_input.clear()
+        
+        if failed:
+            errors = "\n".join(f"{store}: {error}" for store, error in failed.items())
+            self.statusBar().showMessage(f"Ошибка добавления в {', '.join(failed)}")
+            QMessageBox.warning(
+                self,
+                "Частичная ошибка" if added else "Ошибка",
+                f"Добавлено в: {', '.join(added) or '-'}\n\nНе удалось добавить:\n{errors}"
+            )
+            return
+        
+        store_label = ", ".join(added)
+        self.statusBar().showMessage(f"Документ разбит на {num_chunks} чанков и добавлен в {store_label}")
+        
+        QMessageBox.information(self, "Успех", f"Документ разбит на {num_chunks} чанков и добавлен в {store_label}")
     
     def clear_documents(self):
         """Очистка списка документов"""
@@ -389,7 +436,11 @@ class RAGApp(QMainWindow):
         
         # Создаем поток
         def do_search():
-            results = self.retriever.retrieve(query, store_type, top_k)
+            if store_type == "pinecone + weaviate (RRF)":
+                # Слияние результатов обеих БД по рангу (scores несопоставимы)
+                results = self.retriever.retrieve_fused(query, top_k, ["pinecone", "weaviate"])
+            else:
+                results = self.retriever.retrieve(query, store_type, top_k)
             print(f"[DEBUG] Retrieved {len(results)} results for top_k={top_k}")
             return results
         
@@ -449,45 +500,44 @@ class RAGApp(QMainWindow):
         # Отключаем кнопку
         self.btn_compare.setEnabled(False)
         self.statusBar().showMessage("Сравнение векторных БД...")
-        self.compare_output.clear()
-        self.compare_output.append("Выполняется сравнение...\n")
-        
-        # Создаем поток
-        def do_compare():
-            results = {}
-            for store in ["pinecone", "weaviate"]:
-                try:
-                    results[store] = self.retriever.retrieve(query, store, top_k)
-                except Exception as e:
-                    results[store] = f"Error: {e}"
-            return results
         
-        thread = WorkerThread(do_compare)
-        thread.finished.connect(lambda results: self.on_compare_complete(results, query))
+        # Потоковый вывод: каждая БД отображается, как только ответит
+        thread = StreamWorkerThread(
+            self.retriever.iter_retrieve_all,
+            query,
+            top_k,
+            ["pinecone", "weaviate"]
+        )
+        thread.item.connect(self.on_compare_store_result)
+        thread.finished.connect(self.on_compare_complete)
         thread.error.connect(self.on_error)
-        thread.start()
-        self.current_thread = thread
-    
-    def on_compare_complete(self, results, query):
-        """Обработка результатов сравнения"""
-        self.compare_output.clear()
         
+        self.compare_output.clear()
         self.compare_output.append(f"Запрос: {query}\n")
         self.compare_output.append("=" * 80 + "\n\n")
         
-        for store, store_results in results.items():
-            self.compare_output.append(f"=== {store.upper()} ===\n")
-            
-            if isinstance(store_results, str):
-                self.compare_output.append(f"{store_results}\n\n")
-            elif not store_results:
-                self.compare_output.append("Результаты не найдены\n\n")
-            else:
-                for i, result in enumerate(store_results, 1):
-                    self.compare_output.append(f"{i}. [Score: {result['score']:.4f}]")
-                    self.compare_output.append(f"   {result['text'][:100]}...\n")
-                self.compare_output.append("\n")
-        
+        thread.start()
+        self.current_thread = thread
+    
+    def on_compare_store_result(self, item):
+        """Отображение результатов одной БД по мере поступления"""
+        store, store_results, error = item
+        self.compare_output.append(f"=== {store.upper()} ===\n")
+        
+        if isinstance(error, TimeoutError):
+            self.compare_output.append(f"Превышено время ожидания ({error})\n\n")
+        elif error is not None:
+            self.compare_output.append(f"Error: {error}\n\n")
+        elif not store_results:
+            self.compare_output.append("Результаты не найдены\n\n")
+        else:
+            for i, result in enumerate(store_results, 1):
+                self.compare_output.append(f"{i}. [Score: {result['score']:.4f}]")
+                self.compare_output.append(f"   {result['text'][:100]}...\n")
+            self.compare_output.append("\n")
+    
+    def on_compare_complete(self):
+        """Завершение сравнения"""
         self.btn_compare.setEnabled(True)
         self.statusBar().showMessage("Сравнение завершено")
     
@@ -500,21 +550,31 @@ class RAGApp(QMainWindow):
         self.btn_generate.setEnabled(False)
         self.statusBar().showMessage("Генерация ответа через LLM...")
         
-        def do_generate():
-            return self.generator.generate_answer(self.last_search_query, self.last_search_results)
-        
-        thread = WorkerThread(do_generate)
+        # Потоковый вывод: текст ответа появляется по мере генерации
+        thread = StreamWorkerThread(
+            self.generator.stream_answer,
+            self.last_search_query,
+            self.last_search_results
+        )
+        thread.item.connect(self.on_answer_delta)
         thread.finished.connect(self.on_answer_generated)
         thread.error.connect(self.on_error)
-        thread.start()
-        self.current_thread = thread
-    
-    def on_answer_generated(self, answer):
-        """Обработка сгенерированного ответа"""
+        
         self.results_output.append("\n" + "=" * 80 + "\n")
         self.results_output.append("ОТВЕТ LLM:\n")
         self.results_output.append("=" * 80 + "\n\n")
-        self.results_output.append(answer)
+        
+        thread.start()
+        self.current_thread = thread
+    
+    def on_answer_delta(self, delta):
+        """Дописывание очередного фрагмента ответа"""
+        self.results_output.moveCursor(QTextCursor.End)
+        self.results_output.insertPlainText(delta)
+        self.results_output.ensureCursorVisible()
+    
+    def on_answer_generated(self):
+        """Завершение генерации ответа"""
         self.results_output.append("\n\n" + "=" * 80 + "\n")
         
         self.btn_generate.setEnabled(True)
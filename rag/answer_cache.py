@@ -0,0 +1,163 @@
+"""
+Persistent cache of generated answers.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from loguru import logger
+
+from config.settings import settings
+from rag.fusion import content_hash
+
+
+class AnswerCache:
+    """
+    SQLite cache of LLM answers with a TTL.
+    
+    An answer is reused only for the same normalized question, the same
+    context chunks in the same order, the same model and the same prompt
+    template version; any change in the index that changes the retrieved
+    context therefore misses the cache.
+    """
+    
+    def __init__(self, path: str = None, ttl: float = None):
+        """
+        Open (or create) the cache.
+        
+        Args:
+            path: SQLite file path (default: settings.ANSWER_CACHE_PATH)
+            ttl: Time to live of an answer in seconds
+                (default: settings.ANSWER_CACHE_TTL)
+        """
+        self.path = Path(path or settings.ANSWER_CACHE_PATH)
+        self.ttl = ttl if ttl is not None else settings.ANSWER_CACHE_TTL
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, answer TEXT NOT NULL, model TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+        
+        self.hits = 0
+        self.misses = 0
+        
+        logger.info(f"Initialized AnswerCache at {self.path} (ttl={self.ttl}s)")
+    
+    @staticmethod
+    def make_key(
+        query: str,
+        documents: List[Dict[str, Any]],
+        model: str,
+        prompt_version: str
+    ) -> str:
+        """
+        Build the cache key of a generation request.
+        
+        Args:
+            query: User question
+            documents: Context documents in prompt order
+            model: Chat model name
+            prompt_version: Version of the prompt template
+        
+        Returns:
+            Hex digest identifying the request
+        """
+        payload = json.dumps([
+            " ".join(query.split()).lower(),
+            [content_hash(doc.get("text", "")) for doc in documents],
+            model,
+            prompt_version
+        ], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached answer.
+        
+        Args:
+            key: Key from make_key()
+        
+        Returns:
+            The answer, or None if missing or expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer, created FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row is not None and time.time() - row[1] > self.ttl:
+                with self._conn:
+                    self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                row = None
+            
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+    
+    def put(self, key: str, answer: str, model: str = "") -> None:
+        """
+        Store an answer.
+        
+        Args:
+            key: Key from make_key()
+            answer: Generated answer
+            model: Model that produced it (used by invalidate())
+        """
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO answers (key, answer, model, created) VALUES (?, ?, ?, ?)",
+                    (key, answer, model, time.time())
+                )
+        except Exception as e:
+            logger.error(f"Error caching answer: {e}")
+            raise
+    
+    def invalidate(self, model: Optional[str] = None) -> int:
+        """
+        Drop cached answers.
+        
+        Args:
+            model: Only drop answers of this model (default: all)
+        
+        Returns:
+            Number of removed answers
+        """
+        with self._lock, self._conn:
+            if model is None:
+                cursor = self._conn.execute("DELETE FROM answers")
+            else:
+                cursor = self._conn.execute("DELETE FROM answers WHERE model = ?", (model,))
+        
+        logger.info(f"Invalidated {cursor.rowcount} cached answers")
+        return cursor.rowcount
+    
+    def purge_expired(self) -> int:
+        """
+        Remove answers older than the TTL.
+        
+        Returns:
+            Number of removed answers
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM answers WHERE created < ?", (time.time() - self.ttl,)
+            )
+        return cursor.rowcount
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,260 @@
+"""
+In-process cache of retrieval results.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+CacheKey = Tuple[str, str, int, str]
+
+
+class QueryCache:
+    """
+    LRU + TTL cache of retrieval results keyed by query, store, top_k and filter.
+    
+    In semantic mode a miss on the exact key falls back to the cached entry
+    (same store, top_k and filter) whose query embedding is closest to the
+    new one, provided the cosine similarity reaches the threshold.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        semantic_threshold: Optional[float] = None
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_entries: Maximum number of cached queries (LRU eviction)
+            ttl: Time to live of an entry in seconds
+            semantic_threshold: Cosine similarity for near-hit matching;
+                None disables semantic mode
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold
+        
+        self._entries: "OrderedDict[CacheKey, Dict[str, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        
+        logger.info(
+            f"Initialized QueryCache (max_entries={max_entries}, ttl={ttl}s, "
+            f"semantic_threshold={semantic_threshold})"
+        )
+    
+    @property
+    def semantic(self) -> bool:
+        """Whether semantic near-hit matching is enabled."""
+        return self.semantic_threshold is not None
+    
+    @staticmethod
+    def make_key(
+        query: str,
+        store_type: str,
+        top_k: int,
+        filter_dict: Optional[Dict[str, Any]] = None
+    ) -> CacheKey:
+        """
+        Build a cache key from the retrieval parameters.
+        
+        Args:
+            query: Query text (whitespace and case are normalized)
+            store_type: Store queried
+            top_k: Number of results requested
+            filter_dict: Optional metadata filter
+            
+        Returns:
+            Hashable cache key
+        """
+        normalized = " ".join(query.split()).lower()
+        filter_key = json.dumps(filter_dict, sort_keys=True, default=str) if filter_dict else ""
+        return (normalized, store_type, top_k, filter_key)
+    
+    def generation(self, store_type: str) -> int:
+        """
+        Get the write generation of a store.
+        
+        Take it before querying and pass it to put(), so results computed
+        while the store was being written to are not cached.
+        
+        Args:
+            store_type: Store type
+            
+        Returns:
+            Current generation counter
+        """
+        with self._lock:
+            return self._generation(store_type)
+    
+    def get(self, key: CacheKey) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up results by exact key.
+        
+        Args:
+            key: Cache key from make_key()
+            
+        Returns:
+            A copy of the cached results, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry):
+                if entry is not None:
+                    del self._entries[key]
+                # In semantic mode the miss is counted by get_similar()
+                if not self.semantic:
+                    self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._copy(entry["results"])
+    
+    def get_similar(
+        self,
+        key: CacheKey,
+        query_embedding: List[float]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up results of a semantically close query.
+        
+        Args:
+            key: Cache key of the new query
+            query_embedding: Embedding of the new query
+            
+        Returns:
+            A copy of the closest cached results, or None if nothing is
+            within the threshold (counted as a miss)
+        """
+        if not self.semantic or not query_embedding:
+            return None
+        
+        query_vector = self._normalize(query_embedding)
+        _, store_type, top_k, filter_key = key
+        
+        with self._lock:
+            candidates = [
+                (candidate_key, entry)
+                for candidate_key, entry in self._entries.items()
+                if entry["embedding"] is not None
+                and candidate_key[1:] == (store_type, top_k, filter_key)
+                and not self._expired(entry)
+            ]
+            
+            if candidates:
+                matrix = np.stack([entry["embedding"] for _, entry in candidates])
+                similarities = matrix @ query_vector
+                best = int(np.argmax(similarities))
+                
+                if similarities[best] >= self.semantic_threshold:
+                    best_key, entry = candidates[best]
+                    self._entries.move_to_end(best_key)
+                    self.semantic_hits += 1
+                    return self._copy(entry["results"])
+            
+            self.misses += 1
+            return None
+    
+    def put(
+        self,
+        key: CacheKey,
+        results: List[Dict[str, Any]],
+        query_embedding: Optional[List[float]] = None,
+        generation: Optional[int] = None
+    ) -> None:
+        """
+        Store results for a key.
+        
+        Args:
+            key: Cache key from make_key()
+            results: Retrieval results to cache
+            query_embedding: Query embedding (enables semantic matching)
+            generation: Store generation taken before the query; stale
+                results are dropped
+        """
+        embedding = self._normalize(query_embedding) if self.semantic and query_embedding else None
+        
+        with self._lock:
+            if generation is not None and generation != self._generation(key[1]):
+                return
+            
+            self._entries[key] = {
+                "results": self._copy(results),
+                "embedding": embedding,
+                "expires_at": time.monotonic() + self.ttl
+            }
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, store_type: Optional[str] = None) -> None:
+        """
+        Drop cached results of a store (or of all stores).
+        
+        Args:
+            store_type: Store whose contents changed; None clears everything
+        """
+        with self._lock:
+            if store_type is None:
+                self._entries.clear()
+                self._epoch += 1
+                return
+            
+            self._generations[store_type] = self._generations.get(store_type, 0) + 1
+            for key in [k for k in self._entries if k[1] == store_type]:
+                del self._entries[key]
+        
+        logger.debug(f"Invalidated query cache for {store_type}")
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+        
+        Returns:
+            Dictionary with hits, semantic_hits, misses and size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "size": len(self._entries)
+            }
+    
+    def _generation(self, store_type: str) -> int:
+        """Generation of a store; the caller holds the lock."""
+        # Both counters only grow, so their sum changes on every invalidation
+        return self._epoch + self._generations.get(store_type, 0)
+    
+    @staticmethod
+    def _expired(entry: Dict[str, Any]) -> bool:
+        """Whether an entry has outlived its TTL."""
+        return entry["expires_at"] <= time.monotonic()
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """Unit-length float32 copy of an embedding."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    @staticmethod
+    def _copy(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Shallow copies of the result dicts."""
+        # Callers annotate results in place; never hand out the cached dicts
+        return [dict(result) for result in results]
@@ -0,0 +1,154 @@
+"""
+Extractive compression of retrieved context.
+
+Chunks are split into sentences, every sentence is scored by cosine
+similarity to the query, and only the best sentences (up to a token budget)
+are kept, in their original order.
+"""
+
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+import tiktoken
+from loguru import logger
+
+from config.settings import settings
+from embeddings.embedder import Embedder
+
+# Sentence ends (., !, ?, … with optional closing quotes/brackets) or line breaks
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"'»)\]])\s+|\n+")
+
+# Texts per embedding request
+EMBED_BATCH_SIZE = 512
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences.
+    
+    Args:
+        text: Text to split
+    
+    Returns:
+        Non-empty sentences in order
+    """
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+
+class ContextCompressor:
+    """
+    Keeps the sentences of retrieved documents that are closest to the query.
+    """
+    
+    def __init__(
+        self,
+        embedder: Embedder = None,
+        max_tokens: int = None,
+        min_similarity: float = 0.0,
+        encoding_name: str = "cl100k_base"
+    ):
+        """
+        Initialize the compressor.
+        
+        Args:
+            embedder: Embedder for sentences (and the query if no vector is given)
+            max_tokens: Token budget of all kept sentences
+                (default: settings.COMPRESSION_MAX_TOKENS)
+            min_similarity: Sentences below this cosine similarity are dropped
+            encoding_name: Tiktoken encoding used to count tokens
+        """
+        self.embedder = embedder or Embedder()
+        self.max_tokens = max_tokens or settings.COMPRESSION_MAX_TOKENS
+        self.min_similarity = min_similarity
+        self.encoding_name = encoding_name
+        self._encoding = None
+    
+    @property
+    def encoding(self):
+        """Tiktoken encoding, loaded on first use."""
+        if self._encoding is None:
+            self._encoding = tiktoken.get_encoding(self.encoding_name)
+        return self._encoding
+    
+    def compress(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Reduce documents to their most query-relevant sentences.
+        
+        Args:
+            query: Query text
+            documents: Retrieved documents with "text"
+            query_embedding: Query vector if the caller already has it
+        
+        Returns:
+            Copies of the documents (in input order) whose text is the kept
+            sentences in their original order; documents with no kept
+            sentence are left out
+        """
+        sentences: List[Tuple[int, int, str]] = []
+        for doc_idx, doc in enumerate(documents):
+            for sent_idx, sentence in enumerate(split_sentences(doc.get("text", ""))):
+                sentences.append((doc_idx, sent_idx, sentence))
+        
+        if not sentences:
+            return []
+        
+        if query_embedding is None:
+            query_embedding = self.embedder.embed_text(query)
+        
+        vectors = []
+        for start in range(0, len(sentences), EMBED_BATCH_SIZE):
+            batch = sentences[start:start + EMBED_BATCH_SIZE]
+            vectors.extend(self.embedder.embed_batch([sentence for _, _, sentence in batch]))
+        
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        q = np.asarray(query_embedding, dtype=np.float32)
+        scores = matrix @ (q / max(float(np.linalg.norm(q)), 1e-12))
+        
+        # Best sentences first until the budget is spent; a sentence
+        # repeated in several documents is kept once
+        kept = set()
+        seen = set()
+        remaining = self.max_tokens
+        for idx in np.argsort(-scores, kind="stable"):
+            if scores[idx] < self.min_similarity:
+                break
+            normalized = " ".join(sentences[idx][2].split()).lower()
+            if normalized in seen:
+                continue
+            tokens = len(self.encoding.encode(sentences[idx][2], disallowed_special=()))
+            if tokens > remaining:
+                continue
+            kept.add(int(idx))
+            seen.add(normalized)
+            remaining -= tokens
+        
+        by_document: Dict[int, List[str]] = {}
+        best_score: Dict[int, float] = {}
+        for idx in sorted(kept):
+            doc_idx, _, sentence = sentences[idx]
+            by_document.setdefault(doc_idx, []).append(sentence)
+            best_score[doc_idx] = max(best_score.get(doc_idx, -1.0), float(scores[idx]))
+        
+        compressed = []
+        for doc_idx, doc in enumerate(documents):
+            if doc_idx not in by_document:
+                continue
+            result = dict(doc)
+            result["text"] = " ".join(by_document[doc_idx])
+            result["sentence_score"] = best_score[doc_idx]
+            compressed.append(result)
+        
+        original = sum(len(doc.get("text", "")) for doc in documents)
+        logger.info(
+            f"Compressed context from {original} to "
+            f"{sum(len(doc['text']) for doc in compressed)} characters "
+            f"({len(kept)} of {len(sentences)} sentences kept)"
+        )
+        return compressed
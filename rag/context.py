@@ -0,0 +1,266 @@
+"""
+Token-budgeted assembly of the context passed to the generator.
+
+Retrieved chunks are merged when they are neighbours in the same document
+(chunks made with an overlap repeat text), duplicates are dropped, and the
+remaining chunks fill a token budget in score order.
+"""
+
+import re
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import tiktoken
+from loguru import logger
+
+from config.settings import settings
+from rag.fusion import content_hash
+
+# Tokens of the "Документ N:" header and separator around each chunk
+DOCUMENT_OVERHEAD_TOKENS = 16
+
+# Shortest text overlap accepted when joining neighbouring chunks
+MIN_OVERLAP_CHARS = 16
+
+# Chunks are not cut to fit the budget into pieces shorter than this
+MIN_TRUNCATED_TOKENS = 64
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class ContextPacker:
+    """
+    Builds the list of context documents that fits a prompt token budget.
+    """
+    
+    def __init__(
+        self,
+        max_tokens: int = None,
+        near_duplicate_threshold: float = 0.9,
+        encoding_name: str = "cl100k_base"
+    ):
+        """
+        Initialize the packer.
+        
+        Args:
+            max_tokens: Token budget of all documents together
+                (default: settings.CONTEXT_MAX_TOKENS)
+            near_duplicate_threshold: Jaccard similarity of word trigrams at
+                which the lower-scored of two chunks is dropped
+            encoding_name: Tiktoken encoding used to count tokens
+        """
+        self.max_tokens = max_tokens or settings.CONTEXT_MAX_TOKENS
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.encoding_name = encoding_name
+        self._encoding = None
+    
+    @property
+    def encoding(self):
+        """Tiktoken encoding, loaded on first use."""
+        if self._encoding is None:
+            self._encoding = tiktoken.get_encoding(self.encoding_name)
+        return self._encoding
+    
+    def count_tokens(self, text: str) -> int:
+        """
+        Count the tokens of a text.
+        
+        Args:
+            text: Text to count
+        
+        Returns:
+            Number of tokens
+        """
+        return len(self.encoding.encode(text, disallowed_special=()))
+    
+    def pack(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge, deduplicate and budget retrieved documents.
+        
+        Args:
+            documents: Retrieved documents with "text", "score" and optional
+                "metadata" (doc_id/parent_id, chunk_id, start/end)
+        
+        Returns:
+            Documents to put into the prompt, best score first; merged
+            documents carry the joined text and their best score
+        """
+        merged = self._merge_neighbours(documents)
+        unique = self._deduplicate(merged)
+        packed = self._fill_budget(unique)
+        
+        logger.debug(
+            f"Packed {len(documents)} documents into {len(packed)} "
+            f"({len(merged)} after merging, {len(unique)} after deduplication)"
+        )
+        return packed
+    
+    def _merge_neighbours(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Join chunks that overlap or follow each other in the same document."""
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        result: List[Dict[str, Any]] = []
+        
+        for doc in documents:
+            key = _document_key(doc)
+            if key is None:
+                result.append(doc)
+            else:
+                groups.setdefault(key, []).append(doc)
+        
+        for docs in groups.values():
+            docs = sorted(docs, key=_position)
+            current = previous = docs[0]
+            
+            for doc in docs[1:]:
+                joined = _join(current, previous, doc)
+                if joined is None:
+                    result.append(current)
+                    current = doc
+                else:
+                    current = joined
+                previous = doc
+            result.append(current)
+        
+        return result
+    
+    def _deduplicate(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop exact and near duplicates, keeping the best-scored copy."""
+        kept: List[Dict[str, Any]] = []
+        hashes: Set[str] = set()
+        shingles: List[Set[Tuple[str, ...]]] = []
+        
+        for doc in sorted(documents, key=_score, reverse=True):
+            text = doc.get("text", "")
+            if not text.strip():
+                continue
+            
+            digest = content_hash(text)
+            if digest in hashes:
+                continue
+            
+            doc_shingles = _shingles(text)
+            if any(
+                _jaccard(doc_shingles, other) >= self.near_duplicate_threshold
+                or _normalize(text) in _normalize(kept_doc.get("text", ""))
+                for kept_doc, other in zip(kept, shingles)
+            ):
+                continue
+            
+            kept.append(doc)
+            hashes.add(digest)
+            shingles.append(doc_shingles)
+        
+        return kept
+    
+    def _fill_budget(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Take documents by score while they fit the token budget."""
+        packed: List[Dict[str, Any]] = []
+        remaining = self.max_tokens
+        
+        for doc in documents:
+            tokens = self.count_tokens(doc["text"]) + DOCUMENT_OVERHEAD_TOKENS
+            if tokens <= remaining:
+                packed.append(doc)
+                remaining -= tokens
+                continue
+            
+            # A document that does not fit is cut if a useful part of it
+            # still does; otherwise smaller ones further down may fit
+            room = remaining - DOCUMENT_OVERHEAD_TOKENS
+            if room >= MIN_TRUNCATED_TOKENS:
+                truncated = dict(doc)
+                truncated["text"] = self.encoding.decode(
+                    self.encoding.encode(doc["text"], disallowed_special=())[:room]
+                )
+                packed.append(truncated)
+                remaining = 0
+            
+            if remaining < MIN_TRUNCATED_TOKENS:
+                break
+        
+        return packed
+
+
+def _score(doc: Dict[str, Any]) -> float:
+    return float(doc.get("score", 0) or 0)
+
+
+def _document_key(doc: Dict[str, Any]) -> Optional[Tuple[str, str, Any]]:
+    """Identity of the source document of a chunk, if the chunk records one."""
+    metadata = doc.get("metadata") or {}
+    for field in ("parent_id", "doc_id"):
+        if metadata.get(field) is not None:
+            return doc.get("store", ""), field, metadata[field]
+    return None
+
+
+def _position(doc: Dict[str, Any]) -> Tuple[float, float]:
+    metadata = doc.get("metadata") or {}
+    return float(metadata.get("start", -1) or 0), float(metadata.get("chunk_id", 0) or 0)
+
+
+def _join(
+    first: Dict[str, Any],
+    previous: Dict[str, Any],
+    second: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    Join a chunk onto a (possibly already merged) chunk of the same document.
+    
+    Character offsets are used when both chunks have them; otherwise the
+    chunk must directly follow ``previous``, the last chunk merged into
+    ``first``, and the two are joined on their common text.
+    """
+    a, b = first.get("metadata") or {}, second.get("metadata") or {}
+    text_a, text_b = first.get("text", ""), second.get("text", "")
+    
+    if None not in (a.get("start"), a.get("end"), b.get("start"), b.get("end")):
+        a_start, a_end, b_start, b_end = (int(a["start"]), int(a["end"]), int(b["start"]), int(b["end"]))
+        if b_start > a_end:
+            return None
+        text = text_a + text_b[max(0, a_end - b_start):] if b_end > a_end else text_a
+        metadata = {**a, "start": a_start, "end": max(a_end, b_end)}
+    else:
+        last_chunk_id = (previous.get("metadata") or {}).get("chunk_id")
+        if last_chunk_id is None or b.get("chunk_id") is None:
+            return None
+        if int(b["chunk_id"]) - int(last_chunk_id) != 1:
+            return None
+        text = text_a + text_b[_overlap(text_a, text_b):]
+        metadata = a
+    
+    joined = dict(first)
+    joined["text"] = text
+    joined["score"] = max(_score(first), _score(second))
+    joined["metadata"] = metadata
+    return joined
+
+
+def _overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of a that is a prefix of b (0 if short)."""
+    if len(b) < MIN_OVERLAP_CHARS:
+        return 0
+    
+    probe = b[:MIN_OVERLAP_CHARS]
+    idx = a.find(probe, max(0, len(a) - len(b)))
+    while idx != -1:
+        if b.startswith(a[idx:]):
+            return len(a) - idx
+        idx = a.find(probe, idx + 1)
+    return 0
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def _shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = _WORD.findall(text.lower())
+    if len(words) < 3:
+        return {tuple(words)}
+    return {tuple(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def _jaccard(a: Set[Tuple[str, ...]], b: Set[Tuple[str, ...]]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
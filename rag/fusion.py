@@ -0,0 +1,110 @@
+"""
+Fusion of result lists coming from several vector stores.
+
+Raw scores are not comparable across stores (Weaviate reports
+``1 - distance``, Pinecone the raw cosine), so results are merged either by
+rank (reciprocal-rank fusion) or by per-store min-max normalized scores.
+"""
+
+import hashlib
+from typing import List, Dict, Any, Literal
+
+FusionMethod = Literal["rrf", "minmax"]
+
+
+def content_hash(text: str) -> str:
+    """
+    Hash chunk text for deduplication across stores.
+    
+    Whitespace and case are normalized so that the same chunk stored in two
+    backends hashes identically.
+    
+    Args:
+        text: Chunk text
+        
+    Returns:
+        Hex digest identifying the content
+    """
+    normalized = " ".join(text.split()).lower()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _minmax(results: List[Dict[str, Any]]) -> List[float]:
+    """
+    Min-max normalize the scores of one result list to [0, 1].
+    
+    Args:
+        results: Results of a single store
+        
+    Returns:
+        Normalized scores in the same order
+    """
+    scores = [float(r.get("score", 0) or 0) for r in results]
+    if not scores:
+        return []
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0] * len(scores)
+    return [(score - low) / (high - low) for score in scores]
+
+
+def fuse_results(
+    results_by_store: Dict[str, List[Dict[str, Any]]],
+    top_k: int = 5,
+    method: FusionMethod = "rrf",
+    rrf_k: int = 60
+) -> List[Dict[str, Any]]:
+    """
+    Merge per-store result lists into one ranked, deduplicated list.
+    
+    Args:
+        results_by_store: Mapping of store type to its ranked results
+        top_k: Number of fused results to return
+        method: "rrf" (reciprocal-rank fusion) or "minmax" (sum of
+            min-max normalized scores)
+        rrf_k: Rank offset of reciprocal-rank fusion
+        
+    Returns:
+        Fused results; each keeps the fields of its best-ranked hit, with
+        ``score`` replaced by the fused score, the original per-store scores
+        in ``store_scores`` and all contributing stores in ``stores``
+    """
+    if method not in ("rrf", "minmax"):
+        raise ValueError(f"Unknown fusion method: {method}")
+    
+    fused: Dict[str, Dict[str, Any]] = {}
+    
+    for store_type, results in results_by_store.items():
+        if not results:
+            continue
+        
+        normalized = _minmax(results) if method == "minmax" else None
+        seen = set()
+        
+        for rank, result in enumerate(results):
+            key = content_hash(result.get("text", ""))
+            
+            # A store that returns the same chunk twice only votes once
+            if key in seen:
+                continue
+            seen.add(key)
+            
+            if method == "rrf":
+                contribution = 1.0 / (rrf_k + rank + 1)
+            else:
+                contribution = normalized[rank]
+            
+            entry = fused.get(key)
+            if entry is None:
+                entry = dict(result)
+                entry["score"] = 0.0
+                entry["stores"] = []
+                entry["store_scores"] = {}
+                fused[key] = entry
+            
+            entry["score"] += contribution
+            entry["stores"].append(store_type)
+            entry["store_scores"][store_type] = result.get("score", 0)
+    
+    ranked = sorted(fused.values(), key=lambda r: r["score"], reverse=True)
+    return ranked[:top_k]
@@ -2,32 +2,98 @@
 RAG Generator - генерация ответов на основе найденных документов
 """
 
-from typing import List, Dict, Any
-from openai import OpenAI
+import asyncio
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional, Tuple, Iterable
+from openai import OpenAI, AsyncOpenAI
 from loguru import logger
 
 from config.settings import settings
+from rag.answer_cache import AnswerCache
+from rag.compression import ContextCompressor
+from rag.context import ContextPacker
+from rag.fusion import content_hash
+from rag.rate_limit import RateLimiter, get_shared_limiter
+from utils.openai_client import get_openai_client, get_async_openai_client
+
+NO_CONTEXT_ANSWER = "Извините, я не нашел релевантной информации в базе знаний для ответа на ваш вопрос."
+
+# Версия шаблона промпта; меняйте при изменении промптов, чтобы кэш ответов
+# не возвращал ответы, полученные по старому шаблону
+PROMPT_VERSION = "2"
+
+# Максимальная длина ответа в токенах
+MAX_ANSWER_TOKENS = 500
+
+# Провайдер кэширует совпадающее начало промпта, поэтому всё неизменное
+# (правила и инструкция) стоит первым и одинаково побайтно во всех
+# запросах, затем контекст в детерминированном порядке, вопрос - последним
+SYSTEM_PROMPT = """You are a helpful assistant that answers questions ONLY based on provided context.
+
+CRITICAL RULES:
+1. You MUST answer ONLY in RUSSIAN language (русский язык)
+2. Use ONLY information from provided documents
+3. If documents don't have the answer, say so honestly in Russian
+4. DO NOT make up information not in documents
+5. Give specific and accurate answers
+6. Reference documents when answering (e.g., "Согласно документу...")
+7. NEVER answer in English - ALWAYS use Russian language
+8. Even if the question is in English, answer in Russian
+
+ОТВЕТЬ НА РУССКОМ ЯЗЫКЕ, используя ТОЛЬКО информацию из предоставленного контекста. Твой ответ должен быть полностью на русском языке."""
 
 
 class RAGGenerator:
     """Генератор ответов на основе контекста из векторной БД"""
     
-    def __init__(self, model: str = "gpt-4o-mini"):
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        context_packer: Optional[ContextPacker] = None,
+        answer_cache: Optional[AnswerCache] = None,
+        compressor: Optional[ContextCompressor] = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
         """
         Инициализация генератора
         
         Args:
             model: Модель OpenAI для генерации ответов
+            context_packer: Сборщик контекста с бюджетом токенов
+                (по умолчанию ContextPacker с settings.CONTEXT_MAX_TOKENS)
+            answer_cache: Кэш готовых ответов (по умолчанию создаётся,
+                если ANSWER_CACHE_ENABLED)
+            compressor: Необязательное извлечение релевантных вопросу
+                предложений из документов контекста
+            rate_limiter: Ограничение запросов/токенов в минуту. Интерактивные
+                вызовы по умолчанию не ограничиваются; пакетная генерация
+                использует его или общий лимитер процесса (OPENAI_RPM /
+                OPENAI_TPM)
         """
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client: OpenAI = get_openai_client()
         self.model = model
+        self.context_packer = context_packer or ContextPacker()
+        
+        if answer_cache is None and settings.ANSWER_CACHE_ENABLED:
+            answer_cache = AnswerCache()
+        self.answer_cache = answer_cache
+        self.compressor = compressor
+        self.rate_limiter = rate_limiter
+        
+        # Статистика кэширования промптов на стороне провайдера
+        self.usage = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        self._usage_lock = threading.Lock()
         logger.info(f"Initialized RAGGenerator with model: {model}")
     
     def generate_answer(
         self,
         query: str,
         context_documents: List[Dict[str, Any]],
-        language: str = "russian"
+        language: str = "russian",
+        query_embedding: Optional[List[float]] = None
     ) -> str:
         """
         Генерация ответа на основе найденных документов
@@ -36,66 +102,499 @@ class RAGGenerator:
             query: Вопрос пользователя
             context_documents: Список найденных документов с текстом и score
             language: Язык ответа (russian/english)
+            query_embedding: Вектор вопроса, если он уже вычислен
+                (ретривером); иначе сжатие контекста получит его заново
             
         Returns:
             Сгенерированный ответ
         """
         if not context_documents:
-            return "Извините, я не нашел релевантной информации в базе знаний для ответа на ваш вопрос."
+            return NO_CONTEXT_ANSWER
         
-        # Формируем контекст из найденных документов
-        context = "\n\n".join([
-            f"Документ {i+1} (релевантность: {doc['score']:.2f}):\n{doc['text']}"
-            for i, doc in enumerate(context_documents)
-        ])
+        documents, cache_key = self._pack(query, context_documents)
+        cached = self._cached_answer(cache_key)
+        if cached is not None:
+            return cached
         
-        # Системный промпт
-        system_prompt = """You are a helpful assistant that answers questions ONLY based on provided context.
-
-CRITICAL RULES:
-1. You MUST answer ONLY in RUSSIAN language (русский язык)
-2. Use ONLY information from provided documents
-3. If documents don't have the answer, say so honestly in Russian
-4. DO NOT make up information not in documents
-5. Give specific and accurate answers
-6. Reference documents when answering (e.g., "Согласно документу...")
-7. NEVER answer in English - ALWAYS use Russian language
-8. Even if the question is in English, answer in Russian"""
-
-        # Пользовательский промпт
-        user_prompt = f"""Контекст из базы знаний:
-{context}
-
-Вопрос пользователя: {query}
-
-ОТВЕТЬ НА РУССКОМ ЯЗЫКЕ, используя ТОЛЬКО информацию из предоставленного контекста. Твой ответ должен быть полностью на русском языке."""
-
         try:
+            messages = self._prepare(query, documents, query_embedding)
             logger.info(f"Generating answer for query: '{query[:50]}...'")
             
+            estimated = self._estimate_tokens(messages)
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(estimated)
+            
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=messages,
                 temperature=0.3,  # Низкая температура для точности
-                max_tokens=500
+                max_tokens=MAX_ANSWER_TOKENS
             )
+            self._record_usage(estimated, response.usage, self.rate_limiter)
             
             answer = response.choices[0].message.content
             logger.info("Answer generated successfully")
             
+            self._cache_answer(cache_key, answer)
             return answer
             
         except Exception as e:
             logger.error(f"Error generating answer: {e}")
             return f"Ошибка при генерации ответа: {e}"
     
-    def generate_answer_with_sources(
+    def stream_answer(
+        self,
+        query: str,
+        context_documents: List[Dict[str, Any]],
+        query_embedding: Optional[List[float]] = None
+    ) -> Iterator[str]:
+        """
+        Потоковая генерация ответа: фрагменты текста отдаются по мере появления
+        
+        Args:
+            query: Вопрос пользователя
+            context_documents: Список найденных документов с текстом и score
+            query_embedding: Вектор вопроса, если он уже вычислен
+                (ретривером); иначе сжатие контекста получит его заново
+            
+        Yields:
+            Фрагменты ответа; их конкатенация - полный ответ
+        """
+        if not context_documents:
+            yield NO_CONTEXT_ANSWER
+            return
+        
+        documents, cache_key = self._pack(query, context_documents)
+        cached = self._cached_answer(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        try:
+            messages = self._prepare(query, documents, query_embedding)
+            logger.info(f"Streaming answer for query: '{query[:50]}...'")
+            
+            estimated = self._estimate_tokens(messages)
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(estimated)
+            
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.3,
+                max_tokens=MAX_ANSWER_TOKENS,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            
+            parts = []
+            usage = None
+            for chunk in stream:
+                # Последний фрагмент без choices несёт расход токенов
+                usage = getattr(chunk, "usage", None) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            self._record_usage(estimated, usage, self.rate_limiter)
+            
+            logger.info("Answer streamed successfully")
+            self._cache_answer(cache_key, "".join(parts))
+            
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            yield f"Ошибка при генерации ответа: {e}"
+    
+    async def astream_answer(
+        self,
+        query: str,
+        context_documents: List[Dict[str, Any]],
+        query_embedding: Optional[List[float]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Асинхронный вариант stream_answer()
+        
+        Args:
+            query: Вопрос пользователя
+            context_documents: Список найденных документов с текстом и score
+            query_embedding: Вектор вопроса, если он уже вычислен
+                (ретривером); иначе сжатие контекста получит его заново
+            
+        Yields:
+            Фрагменты ответа; их конкатенация - полный ответ
+        """
+        if not context_documents:
+            yield NO_CONTEXT_ANSWER
+            return
+        
+        documents, cache_key = self._pack(query, context_documents)
+        cached = self._cached_answer(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        try:
+            # Сжатие контекста обращается к API эмбеддингов синхронно
+            messages = await asyncio.to_thread(self._prepare, query, documents, query_embedding)
+            logger.info(f"Streaming answer for query: '{query[:50]}...'")
+            
+            estimated = self._estimate_tokens(messages)
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire(estimated)
+            
+            stream = await self._get_async_client().chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.3,
+                max_tokens=MAX_ANSWER_TOKENS,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            
+            parts = []
+            usage = None
+            async for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            self._record_usage(estimated, usage, self.rate_limiter)
+            
+            logger.info("Answer streamed successfully")
+            self._cache_answer(cache_key, "".join(parts))
+            
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            yield f"Ошибка при генерации ответа: {e}"
+    
+    def generate_many(
+        self,
+        items: Iterable[Tuple[str, List[Dict[str, Any]]]],
+        output_path: str,
+        checkpoint_path: Optional[str] = None,
+        max_concurrency: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Пакетная генерация ответов для офлайн-задач
+        
+        Синхронная обёртка над agenerate_many(); из асинхронного кода
+        вызывайте agenerate_many() напрямую.
+        
+        Args:
+            items: Пары (вопрос, документы контекста)
+            output_path: JSONL-файл с результатами (дописывается)
+            checkpoint_path: Файл контрольных точек (по умолчанию
+                output_path + ".checkpoint")
+            max_concurrency: Число одновременных запросов
+                (по умолчанию settings.GENERATE_CONCURRENCY)
+            
+        Returns:
+            Статистика: total, skipped, succeeded, failed
+        """
+        return asyncio.run(self.agenerate_many(items, output_path, checkpoint_path, max_concurrency))
+    
+    async def agenerate_many(
+        self,
+        items: Iterable[Tuple[str, List[Dict[str, Any]]]],
+        output_path: str,
+        checkpoint_path: Optional[str] = None,
+        max_concurrency: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Асинхронная пакетная генерация с ограничением параллелизма
+        
+        Запросы идут параллельно (не более max_concurrency) в пределах общих
+        лимитов RPM/TPM. Каждый результат сразу дописывается в output_path
+        строкой JSON {"index", "query", "answer", "error"} (в порядке
+        завершения), а его номер - в файл контрольных точек. При повторном
+        запуске с теми же входными данными уже выполненные пары
+        пропускаются; пары с ошибкой выполняются заново.
+        
+        Args:
+            items: Пары (вопрос, документы контекста)
+            output_path: JSONL-файл с результатами (дописывается)
+            checkpoint_path: Файл контрольных точек (по умолчанию
+                output_path + ".checkpoint")
+            max_concurrency: Число одновременных запросов
+                (по умолчанию settings.GENERATE_CONCURRENCY)
+            
+        Returns:
+            Статистика: total, skipped, succeeded, failed
+        """
+        items = list(items)
+        output = Path(output_path)
+        checkpoint = Path(checkpoint_path) if checkpoint_path else output.with_name(output.name + ".checkpoint")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        
+        done = _read_checkpoint(checkpoint)
+        pending = [
+            (index, query, documents)
+            for index, (query, documents) in enumerate(items)
+            if _item_key(index, query) not in done
+        ]
+        stats = {"total": len(items), "skipped": len(items) - len(pending), "succeeded": 0, "failed": 0}
+        logger.info(f"Generating {len(pending)} answers ({stats['skipped']} already done)")
+        
+        semaphore = asyncio.Semaphore(max_concurrency or settings.GENERATE_CONCURRENCY)
+        limiter = self.rate_limiter or get_shared_limiter()
+        
+        with open(output, "a", encoding="utf-8") as out, open(checkpoint, "a", encoding="utf-8") as ckpt:
+            async def run(index: int, query: str, documents: List[Dict[str, Any]]) -> None:
+                async with semaphore:
+                    try:
+                        answer, error = await self._agenerate(query, documents, None, limiter), None
+                    except Exception as e:
+                        answer, error = None, str(e)
+                
+                # Результат записывается до контрольной точки: после сбоя
+                # пара либо уже в output, либо будет выполнена заново
+                out.write(json.dumps(
+                    {"index": index, "query": query, "answer": answer, "error": error},
+                    ensure_ascii=False
+                ) + "\n")
+                out.flush()
+                
+                if error is None:
+                    ckpt.write(json.dumps({"key": _item_key(index, query)}) + "\n")
+                    ckpt.flush()
+                    stats["succeeded"] += 1
+                else:
+                    logger.error(f"Failed to generate answer #{index}: {error}")
+                    stats["failed"] += 1
+            
+            await asyncio.gather(*(run(*item) for item in pending))
+        
+        logger.info(
+            f"Batch generation finished: {stats['succeeded']} succeeded, "
+            f"{stats['failed']} failed, {stats['skipped']} skipped"
+        )
+        return stats
+    
+    async def agenerate_answer(
+        self,
+        query: str,
+        context_documents: List[Dict[str, Any]],
+        query_embedding: Optional[List[float]] = None
+    ) -> str:
+        """
+        Асинхронная генерация ответа (ошибки API пробрасываются)
+        
+        Args:
+            query: Вопрос пользователя
+            context_documents: Список найденных документов с текстом и score
+            query_embedding: Вектор вопроса, если он уже вычислен
+                (ретривером); иначе сжатие контекста получит его заново
+            
+        Returns:
+            Сгенерированный ответ
+        """
+        return await self._agenerate(query, context_documents, query_embedding, self.rate_limiter)
+    
+    async def _agenerate(
+        self,
+        query: str,
+        context_documents: List[Dict[str, Any]],
+        query_embedding: Optional[List[float]],
+        limiter: Optional[RateLimiter]
+    ) -> str:
+        """agenerate_answer() с явно заданным лимитером (None - без ограничения)."""
+        if not context_documents:
+            return NO_CONTEXT_ANSWER
+        
+        documents, cache_key = self._pack(query, context_documents)
+        cached = self._cached_answer(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Сжатие контекста обращается к API эмбеддингов синхронно
+        messages = await asyncio.to_thread(self._prepare, query, documents, query_embedding)
+        estimated = self._estimate_tokens(messages)
+        if limiter is not None:
+            await limiter.aacquire(estimated)
+        
+        response = await self._get_async_client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.3,
+            max_tokens=MAX_ANSWER_TOKENS
+        )
+        self._record_usage(estimated, response.usage, limiter)
+        
+        answer = response.choices[0].message.content
+        self._cache_answer(cache_key, answer)
+        return answer
+    
+    def _get_async_client(self) -> AsyncOpenAI:
+        """Асинхронный клиент OpenAI: общий пул соединений текущего цикла событий."""
+        return get_async_openai_client()
+    
+    def _record_usage(self, estimated: int, usage: Any, limiter: Optional[RateLimiter] = None) -> None:
+        """
+        Учёт расхода токенов запроса: поправка лимитера и статистика кэша
+        
+        Args:
+            estimated: Оценка токенов, переданная лимитеру
+            usage: Поле usage ответа API (None, если провайдер его не вернул)
+            limiter: Лимитер, у которого были получены токены запроса
+        """
+        if usage is None:
+            return
+        
+        if limiter is not None:
+            limiter.record(estimated, getattr(usage, "total_tokens", None))
+        
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        
+        with self._usage_lock:
+            self.usage["requests"] += 1
+            self.usage["prompt_tokens"] += prompt_tokens
+            self.usage["cached_tokens"] += cached_tokens
+        
+        logger.debug(f"Prompt tokens: {prompt_tokens} ({cached_tokens} cached)")
+    
+    @property
+    def prompt_cache_hit_rate(self) -> float:
+        """Доля токенов промптов, взятых из кэша провайдера."""
+        with self._usage_lock:
+            if not self.usage["prompt_tokens"]:
+                return 0.0
+            return self.usage["cached_tokens"] / self.usage["prompt_tokens"]
+    
+    def _estimate_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Оценка токенов запроса для лимитера: промпт + максимум ответа."""
+        return sum(self.context_packer.count_tokens(m["content"]) for m in messages) + MAX_ANSWER_TOKENS
+    
+    def _pack(
         self,
         query: str,
         context_documents: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Упаковка контекста и ключ кэша ответов
+        
+        Ключ строится по упакованным документам, до сжатия: сжатие
+        детерминировано для данного вопроса и настроек компрессора, поэтому
+        при попадании в кэш обращение к API эмбеддингов не нужно.
+        
+        Args:
+            query: Вопрос пользователя
+            context_documents: Список найденных документов с текстом и score
+            
+        Returns:
+            Кортеж (упакованные документы, ключ кэша или None без кэша)
+        """
+        # Соседние чанки склеиваются, дубликаты отбрасываются, лучшие по
+        # score документы заполняют бюджет токенов
+        documents = self.context_packer.pack(context_documents)
+        
+        cache_key = None
+        if self.answer_cache is not None:
+            prompt_version = PROMPT_VERSION
+            if self.compressor is not None:
+                prompt_version += f"+compress:{self.compressor.max_tokens}:{self.compressor.min_similarity}"
+            cache_key = self.answer_cache.make_key(
+                query, sorted(documents, key=_prompt_order), self.model, prompt_version
+            )
+        
+        return documents, cache_key
+    
+    def _prepare(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Сжатие упакованного контекста и сборка сообщений
+        
+        Args:
+            query: Вопрос пользователя
+            documents: Документы после _pack()
+            query_embedding: Вектор вопроса для сжатия, если уже вычислен
+            
+        Returns:
+            Сообщения для модели
+        """
+        # Из оставшихся документов берутся только близкие к вопросу предложения
+        if self.compressor is not None:
+            documents = self.compressor.compress(query, documents, query_embedding) or documents
+        
+        # Порядок в промпте не зависит от score: один и тот же набор
+        # документов даёт одинаковый префикс для разных вопросов
+        documents = sorted(documents, key=_prompt_order)
+        
+        return self._build_messages(query, documents)
+    
+    def _cached_answer(self, cache_key: Optional[str]) -> Optional[str]:
+        """Готовый ответ из кэша, если он есть (ошибка кэша - промах)."""
+        if cache_key is None:
+            return None
+        
+        try:
+            answer = self.answer_cache.get(cache_key)
+        except Exception as e:
+            logger.error(f"Error reading answer cache: {e}")
+            return None
+        
+        if answer is not None:
+            logger.info("Answer served from cache")
+        return answer
+    
+    def _cache_answer(self, cache_key: Optional[str], answer: str) -> None:
+        """
+        Сохранение полученного ответа в кэш
+        
+        Ошибка записи (например, "database is locked" или нет места на
+        диске) только логируется: ответ уже получен и оплачен.
+        """
+        if cache_key is None or not answer:
+            return
+        
+        try:
+            self.answer_cache.put(cache_key, answer, self.model)
+        except Exception as e:
+            logger.error(f"Error caching answer: {e}")
+    
+    def _build_messages(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]]
+    ) -> List[Dict[str, str]]:
+        """
+        Сборка сообщений для модели из вопроса и документов контекста
+        
+        Args:
+            query: Вопрос пользователя
+            documents: Документы контекста (после ContextPacker)
+            
+        Returns:
+            Список сообщений (system + user)
+        """
+        # Заголовок без score, чтобы текст контекста не зависел от вопроса
+        context = "\n\n".join([
+            f"Документ {i+1}:\n{doc['text']}"
+            for i, doc in enumerate(documents)
+        ])
+        
+        # Вопрос - в самом конце, после неизменной части и контекста
+        user_prompt = f"""Контекст из базы знаний:
+{context}
+
+Вопрос пользователя: {query}"""
+
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def generate_answer_with_sources(
+        self,
+        query: str,
+        context_documents: List[Dict[str, Any]],
+        query_embedding: Optional[List[float]] = None
     ) -> Dict[str, Any]:
         """
         Генерация ответа с указанием источников
@@ -103,20 +602,79 @@ CRITICAL RULES:
         Args:
             query: Вопрос пользователя
             context_documents: Список найденных документов
+            query_embedding: Вектор вопроса, если он уже вычислен
+            
+        Returns:
+            Словарь с ответом и источниками
+        """
+        answer = self.generate_answer(query, context_documents, query_embedding=query_embedding)
+        
+        return _with_sources(answer, context_documents)
+    
+    async def agenerate_answer_with_sources(
+        self,
+        query: str,
+        context_documents: List[Dict[str, Any]],
+        query_embedding: Optional[List[float]] = None
+    ) -> Dict[str, Any]:
+        """
+        Асинхронный вариант generate_answer_with_sources()
+        
+        Args:
+            query: Вопрос пользователя
+            context_documents: Список найденных документов
+            query_embedding: Вектор вопроса, если он уже вычислен
             
         Returns:
             Словарь с ответом и источниками
         """
-        answer = self.generate_answer(query, context_documents)
-        
-        return {
-            "answer": answer,
-            "sources": [
-                {
-                    "text": doc["text"][:200] + "...",
-                    "score": doc["score"]
-                }
-                for doc in context_documents
-            ],
-            "num_sources": len(context_documents)
-        }
+        answer = await self.agenerate_answer(query, context_documents, query_embedding)
+        return _with_sources(answer, context_documents)
+
+
+def _with_sources(answer: str, context_documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Ответ вместе с кратким списком источников."""
+    return {
+        "answer": answer,
+        "sources": [
+            {
+                "text": doc["text"][:200] + "...",
+                "score": doc["score"]
+            }
+            for doc in context_documents
+        ],
+        "num_sources": len(context_documents)
+    }
+
+
+def _prompt_order(doc: Dict[str, Any]) -> Tuple[str, str, float, float, str]:
+    """Детерминированный порядок документов: источник, позиция, содержимое."""
+    metadata = doc.get("metadata") or {}
+    source = metadata.get("parent_id", metadata.get("doc_id"))
+    return (
+        str(doc.get("store", "")),
+        "" if source is None else str(source),
+        float(metadata.get("start", 0) or 0),
+        float(metadata.get("chunk_id", 0) or 0),
+        content_hash(doc.get("text", ""))
+    )
+
+
+def _item_key(index: int, query: str) -> str:
+    """Ключ пары в файле контрольных точек: номер и хэш вопроса."""
+    return f"{index}:{hashlib.sha1(query.encode('utf-8')).hexdigest()[:12]}"
+
+
+def _read_checkpoint(path: Path) -> set:
+    """Ключи выполненных пар; оборванная последняя строка игнорируется."""
+    done = set()
+    if not path.exists():
+        return done
+    
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["key"])
+            except (json.JSONDecodeError, KeyError):
+                continue
+    return done
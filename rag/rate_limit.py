@@ -0,0 +1,146 @@
+"""
+Request and token rate limiting for calls to the OpenAI API.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Optional, Tuple
+
+from loguru import logger
+
+from config.settings import settings
+
+
+class RateLimiter:
+    """
+    Token buckets for requests per minute and tokens per minute.
+    
+    One limiter is meant to be shared by everything that calls the same
+    API key, from threads (acquire) and from event loops (aacquire) alike.
+    Token costs are estimated up front and corrected with record() once the
+    real usage is known.
+    """
+    
+    def __init__(self, requests_per_minute: int = None, tokens_per_minute: int = None):
+        """
+        Initialize the limiter with full buckets.
+        
+        Args:
+            requests_per_minute: Request budget (default: settings.OPENAI_RPM;
+                0 = unlimited)
+            tokens_per_minute: Token budget (default: settings.OPENAI_TPM;
+                0 = unlimited)
+        """
+        self.requests_per_minute = settings.OPENAI_RPM if requests_per_minute is None else requests_per_minute
+        self.tokens_per_minute = settings.OPENAI_TPM if tokens_per_minute is None else tokens_per_minute
+        
+        self._requests = float(self.requests_per_minute)
+        self._tokens = float(self.tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _try_acquire(self, tokens: int) -> float:
+        """
+        Take one request and ``tokens`` tokens if available.
+        
+        Returns:
+            0 on success, otherwise the seconds to wait before retrying
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            
+            if self.requests_per_minute:
+                self._requests = min(
+                    float(self.requests_per_minute),
+                    self._requests + elapsed * self.requests_per_minute / 60
+                )
+            if self.tokens_per_minute:
+                self._tokens = min(
+                    float(self.tokens_per_minute),
+                    self._tokens + elapsed * self.tokens_per_minute / 60
+                )
+                # A request larger than the whole budget waits for a full bucket
+                tokens = min(tokens, self.tokens_per_minute)
+            
+            wait = 0.0
+            if self.requests_per_minute and self._requests < 1:
+                wait = max(wait, (1 - self._requests) * 60 / self.requests_per_minute)
+            if self.tokens_per_minute and self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+            if wait > 0:
+                return wait
+            
+            if self.requests_per_minute:
+                self._requests -= 1
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+            return 0.0
+    
+    def acquire(self, tokens: int = 0) -> None:
+        """
+        Block until a request of ``tokens`` estimated tokens may be sent.
+        
+        Args:
+            tokens: Estimated prompt + completion tokens
+        """
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait == 0:
+                return
+            logger.debug(f"Rate limit reached, waiting {wait:.2f}s")
+            time.sleep(wait)
+    
+    async def aacquire(self, tokens: int = 0) -> None:
+        """
+        Asynchronous variant of acquire().
+        
+        Args:
+            tokens: Estimated prompt + completion tokens
+        """
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait == 0:
+                return
+            logger.debug(f"Rate limit reached, waiting {wait:.2f}s")
+            await asyncio.sleep(wait)
+    
+    def record(self, estimated: int, actual: Optional[int]) -> None:
+        """
+        Correct the token bucket once the real usage of a request is known.
+        
+        Args:
+            estimated: Tokens passed to acquire()
+            actual: Tokens reported by the API (None: keep the estimate)
+        """
+        if actual is None or not self.tokens_per_minute:
+            return
+        with self._lock:
+            self._tokens -= actual - estimated
+    
+    @property
+    def available(self) -> Tuple[float, float]:
+        """Currently available (requests, tokens), before refill."""
+        with self._lock:
+            return self._requests, self._tokens
+
+
+_shared: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter() -> RateLimiter:
+    """
+    Process-wide limiter used by default by batch generation.
+    
+    Returns:
+        The shared RateLimiter
+    """
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = RateLimiter()
+    return _shared
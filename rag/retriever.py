@@ -2,12 +2,23 @@
 RAG Retriever that can switch between different vector stores.
 """
 
-from typing import List, Dict, Any, Optional, Literal
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Literal, Iterator, Tuple
 from loguru import logger
 
+from config.settings import settings
 from embeddings.embedder import Embedder
-from stores.pinecone_store import PineconeStore
-from stores.weaviate_store import WeaviateStore
+from rag.cache import QueryCache
+from rag.fusion import fuse_results, FusionMethod
+from rag.generator import RAGGenerator
+from rag.singleflight import SingleFlight, AsyncSingleFlight
+from stores.docstore import DocStore
+from utils.chunker import TextChunker
+from utils.openai_client import aclose_clients
 
 # Relevance AI is optional (may have installation issues on Windows)
 try:
@@ -18,7 +29,29 @@ except ImportError:
     logger.warning("Relevance AI not available - install separately if needed")
 
 
-StoreType = Literal["pinecone", "weaviate", "relevance"]
+StoreType = Literal["pinecone", "weaviate", "relevance", "local", "ivf"]
+
+
+class MultiStoreResults(dict):
+    """
+    Per-store results of a multi-store retrieval.
+    
+    Behaves like a plain ``{store_type: results}`` dict and additionally
+    records which stores failed or timed out.
+    """
+    
+    def __init__(self, *args, errors: Dict[str, str] = None, timed_out: List[str] = None):
+        super().__init__(*args)
+        self.errors: Dict[str, str] = dict(errors or {})
+        self.timed_out: List[str] = list(timed_out or [])
+
+
+def _parent_span(result: Dict[str, Any]) -> Optional[Tuple[str, int, int]]:
+    """(parent_id, start, end) of a chunk hit, or None if it has no parent."""
+    metadata = result.get("metadata") or {}
+    if metadata.get("parent_id") is None or metadata.get("start") is None or metadata.get("end") is None:
+        return None
+    return str(metadata["parent_id"]), int(metadata["start"]), int(metadata["end"])
 
 
 class Retriever:
@@ -26,17 +59,45 @@ class Retriever:
     Unified retriever that can work with multiple vector stores.
     """
     
-    def __init__(self, embedder: Embedder = None):
+    def __init__(
+        self,
+        embedder: Embedder = None,
+        max_workers: int = 8,
+        cache: Optional[QueryCache] = None,
+        coalesce: bool = True,
+        docstore: Optional[DocStore] = None
+    ):
         """
         Initialize the Retriever.
         
         Args:
             embedder: Embedder instance (shared across all stores)
+            max_workers: Size of the thread pool for concurrent store queries
+            cache: Optional result cache; invalidated per store on writes
+            coalesce: Share one in-flight computation between identical
+                concurrent retrievals
+            docstore: Optional store for chunk texts; stores then keep only
+                ids, vectors and metadata (default: one at
+                settings.DOCSTORE_PATH if DOCSTORE_ENABLED)
         """
         self.embedder = embedder or Embedder()
+        self.max_workers = max_workers
+        self.cache = cache
+        self.singleflight = SingleFlight() if coalesce else None
+        self.async_singleflight = AsyncSingleFlight() if coalesce else None
+        
+        if docstore is None and settings.DOCSTORE_ENABLED:
+            docstore = DocStore()
+        self.docstore = docstore
         
-        # Initialize stores lazily
+        # Initialize stores lazily; each store type has its own lock so that
+        # a slow connection does not hold up the other stores
         self._stores: Dict[str, Any] = {}
+        self._store_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._abandoned: Dict[str, int] = {}
+        self._generator: Optional[RAGGenerator] = None
         
         logger.info("Initialized Retriever with multi-store support")
     
@@ -44,66 +105,407 @@ class Retriever:
         """
         Get or initialize a vector store.
         
+        Safe to call from many threads: each store is built exactly once
+        (double-checked under a per-store lock), and later calls take no lock.
+        
         Args:
             store_type: Type of store to get
             
         Returns:
             The vector store instance
         """
-        if store_type not in self._stores:
-            logger.info(f"Initializing {store_type} store")
-            
-            if store_type == "pinecone":
-                self._stores[store_type] = PineconeStore(embedder=self.embedder)
-            elif store_type == "weaviate":
-                self._stores[store_type] = WeaviateStore(embedder=self.embedder)
-            elif store_type == "relevance":
-                if not RELEVANCE_AVAILABLE:
-                    raise ImportError(
-                        "Relevance AI is not installed. "
-                        "It may have dependency conflicts on Windows. "
-                        "Use Pinecone or Weaviate instead."
-                    )
-                self._stores[store_type] = RelevanceStore(embedder=self.embedder)
-            else:
-                raise ValueError(f"Unknown store type: {store_type}")
+        store = self._stores.get(store_type)
+        if store is not None:
+            return store
+        
+        with self._lock:
+            store_lock = self._store_locks.setdefault(store_type, threading.Lock())
+        
+        with store_lock:
+            store = self._stores.get(store_type)
+            if store is None:
+                store = self._create_store(store_type)
+                self._stores[store_type] = store
+        return store
+    
+    def _create_store(self, store_type: StoreType):
+        """
+        Build a new vector store instance.
+        
+        Args:
+            store_type: Type of store to build
+            
+        Returns:
+            The vector store instance
+        """
+        logger.info(f"Initializing {store_type} store")
+        
+        # Backends are imported on first use, so that the SDKs of stores
+        # that are never queried need not be installed
+        if store_type == "pinecone":
+            from stores.pinecone_store import PineconeStore
+            return PineconeStore(embedder=self.embedder)
+        elif store_type == "weaviate":
+            from stores.weaviate_store import WeaviateStore
+            return WeaviateStore(embedder=self.embedder)
+        elif store_type == "local":
+            from stores.local_store import LocalStore
+            return LocalStore(embedder=self.embedder)
+        elif store_type == "ivf":
+            from stores.ivf_store import IVFStore
+            return IVFStore(embedder=self.embedder)
+        elif store_type == "relevance":
+            if not RELEVANCE_AVAILABLE:
+                raise ImportError(
+                    "Relevance AI is not installed. "
+                    "It may have dependency conflicts on Windows. "
+                    "Use Pinecone or Weaviate instead."
+                )
+            return RelevanceStore(embedder=self.embedder)
+        else:
+            raise ValueError(f"Unknown store type: {store_type}")
+    
+    def _prepare_store(self, store_type: StoreType):
+        """
+        Get a store and make sure its index/collection exists.
+        
+        Args:
+            store_type: Type of store to prepare
+            
+        Returns:
+            The vector store instance
+        """
+        store = self._get_store(store_type)
+        
+        if store_type in ("pinecone", "local", "ivf"):
+            store.create_index()
+        elif store_type == "weaviate":
+            store.create_schema()
+        elif store_type == "relevance":
+            store.create_collection()
         
-        return self._stores[store_type]
+        return store
     
     def add_documents(
         self,
         texts: List[str],
-        store_type: StoreType,
-        metadata: List[Dict[str, Any]] = None
-    ) -> None:
+        store_type: Optional[StoreType] = None,
+        metadata: List[Dict[str, Any]] = None,
+        stores: Optional[List[StoreType]] = None
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
         """
-        Add documents to a specific vector store.
+        Add documents to a specific vector store, or fan them out to several.
+        
+        With ``stores`` the texts are embedded once and the same vectors are
+        upserted into every target store in parallel.
         
         Args:
             texts: List of document texts
             store_type: Which store to use
             metadata: Optional metadata for each document
+            stores: Optional list of stores to write to instead of store_type
+            
+        Returns:
+            None for a single store; with ``stores``, a dict mapping each store
+            type to {"success": bool, "count": int, "error": Optional[str]}
         """
-        try:
-            store = self._get_store(store_type)
+        return self._add_documents(texts, store_type, metadata, stores)
+    
+    def _add_documents(
+        self,
+        texts: List[str],
+        store_type: Optional[StoreType] = None,
+        metadata: List[Dict[str, Any]] = None,
+        stores: Optional[List[StoreType]] = None,
+        text_args: Optional[Dict[str, Any]] = None,
+        embeddings: Optional[List[List[float]]] = None
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Write documents as add_documents() does.
+        
+        Args:
+            texts: List of document texts
+            store_type: Which store to use
+            metadata: Optional metadata for each document
+            stores: Optional list of stores to write to instead of store_type
+            text_args: Extra add_texts() arguments (default: from _store_texts())
+            embeddings: Optional precomputed vectors of non-empty texts
             
-            # Initialize store/index if needed
-            if store_type == "pinecone":
-                store.create_index()
-            elif store_type == "weaviate":
-                store.create_schema()
-            elif store_type == "relevance":
-                store.create_collection()
+        Returns:
+            See add_documents()
+        """
+        if stores:
+            return self._add_documents_fan_out(texts, stores, metadata, text_args, embeddings)
+        
+        if store_type is None:
+            raise ValueError("Either store_type or stores must be provided")
+        
+        try:
+            store = self._prepare_store(store_type)
+            if text_args is None:
+                text_args = self._store_texts(texts)
             
             # Add texts
             logger.info(f"Adding {len(texts)} documents to {store_type}")
-            store.add_texts(texts, metadata)
+            try:
+                store.add_texts(texts, metadata, embeddings=embeddings, **text_args)
+            finally:
+                self._invalidate_cache(store_type)
             logger.info(f"Successfully added documents to {store_type}")
         
         except Exception as e:
             logger.error(f"Error adding documents to {store_type}: {e}")
             raise
     
+    def _add_documents_fan_out(
+        self,
+        texts: List[str],
+        stores: List[StoreType],
+        metadata: List[Dict[str, Any]] = None,
+        text_args: Optional[Dict[str, Any]] = None,
+        embeddings: Optional[List[List[float]]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Embed texts once and upsert the vectors into several stores in parallel.
+        
+        Args:
+            texts: List of document texts
+            stores: Stores to write to
+            metadata: Optional metadata for each document
+            text_args: Extra add_texts() arguments for texts that are all
+                non-empty (default: from _store_texts())
+            embeddings: Optional precomputed vectors for texts that are all
+                non-empty (embedded here if omitted)
+            
+        Returns:
+            Dictionary mapping store type to its write report
+        """
+        # Drop empty texts up front so texts, metadata and vectors stay aligned
+        # (embed_batch silently skips them)
+        keep = [i for i, t in enumerate(texts) if t and t.strip()]
+        texts = [texts[i] for i in keep]
+        if metadata:
+            metadata = [metadata[i] if i < len(metadata) else {} for i in keep]
+        
+        report: Dict[str, Dict[str, Any]] = {}
+        if not texts:
+            logger.warning("No texts provided to add")
+            for store_type in stores:
+                report[store_type] = {"success": True, "count": 0, "error": None}
+            return report
+        
+        if embeddings is None:
+            logger.info(f"Embedding {len(texts)} documents once for stores: {', '.join(stores)}")
+            embeddings = self.embedder.embed_batch(texts)
+        
+        # All stores share the same ids, so the docstore holds each text once
+        if text_args is None:
+            text_args = self._store_texts(texts)
+        
+        def write(store_type: StoreType) -> None:
+            store = self._prepare_store(store_type)
+            try:
+                store.add_texts(texts, metadata, embeddings=embeddings, **text_args)
+            finally:
+                self._invalidate_cache(store_type)
+        
+        with ThreadPoolExecutor(max_workers=len(stores)) as executor:
+            futures = {
+                store_type: executor.submit(write, store_type)
+                for store_type in stores
+            }
+            
+            for store_type, future in futures.items():
+                try:
+                    future.result()
+                    report[store_type] = {"success": True, "count": len(texts), "error": None}
+                    logger.info(f"Successfully added {len(texts)} documents to {store_type}")
+                except Exception as e:
+                    report[store_type] = {"success": False, "count": 0, "error": str(e)}
+                    logger.error(f"Error adding documents to {store_type}: {e}")
+        
+        return report
+    
+    def add_parent_documents(
+        self,
+        documents: List[str],
+        store_type: Optional[StoreType] = None,
+        metadata: List[Dict[str, Any]] = None,
+        stores: Optional[List[StoreType]] = None,
+        chunker: Optional[TextChunker] = None
+    ) -> List[str]:
+        """
+        Index small chunks of documents whose full text is kept once.
+        
+        Each document goes to the docstore as a parent; its chunks are
+        written to the vector stores with ``parent_id``, ``chunk_id`` and
+        the character offsets ``start``/``end``, and without text of their
+        own (it is cut out of the parent on retrieval). Use
+        expand_to_parents() or retrieve_expanded() to widen hits into
+        parent windows.
+        
+        Args:
+            documents: Full document texts
+            store_type: Which store to use
+            metadata: Optional metadata for each document (copied to its chunks)
+            stores: Optional list of stores to write to instead of store_type
+            chunker: Chunker to use (default: TextChunker(chunk_size=200, chunk_overlap=20))
+            
+        Returns:
+            Parent document ids, one per input document
+        """
+        if self.docstore is None:
+            raise ValueError("Parent documents need a docstore (set DOCSTORE_ENABLED or pass docstore=)")
+        
+        chunker = chunker or TextChunker(chunk_size=200, chunk_overlap=20)
+        parent_ids = [str(uuid.uuid4()) for _ in documents]
+        
+        texts: List[str] = []
+        chunk_metadata: List[Dict[str, Any]] = []
+        for i, (parent_id, document) in enumerate(zip(parent_ids, documents)):
+            base = dict(metadata[i]) if metadata and i < len(metadata) else {}
+            chunks = [c for c in chunker.chunk_with_offsets(document) if c["text"].strip()]
+            
+            for chunk_id, chunk in enumerate(chunks):
+                texts.append(chunk["text"])
+                chunk_metadata.append({
+                    **base,
+                    "parent_id": parent_id,
+                    "chunk_id": chunk_id,
+                    "start": chunk["start"],
+                    "end": chunk["end"]
+                })
+        
+        self.docstore.put_parents(parent_ids, documents)
+        logger.info(f"Stored {len(documents)} parent documents, indexing {len(texts)} chunks")
+        
+        text_args = {"ids": [str(uuid.uuid4()) for _ in texts], "store_text": False}
+        self._add_documents(texts, store_type, chunk_metadata, stores, text_args)
+        return parent_ids
+    
+    def _store_texts(self, texts: List[str]) -> Dict[str, Any]:
+        """
+        Put texts into the docstore under fresh vector ids.
+        
+        Args:
+            texts: Document texts about to be written
+            
+        Returns:
+            Extra add_texts() arguments: the ids, and store_text=False so
+            that stores keep no copy of the text ({} without a docstore)
+        """
+        if self.docstore is None:
+            return {}
+        
+        ids = [str(uuid.uuid4()) for _ in texts]
+        self.docstore.put(ids, texts)
+        return {"ids": ids, "store_text": False}
+    
+    def _hydrate(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Fill in texts of ranked results from the docstore in one lookup.
+        
+        Args:
+            results: Store results, possibly without texts
+            
+        Returns:
+            The same results, with texts where the docstore has them
+        """
+        if self.docstore is None:
+            return results
+        
+        missing = [result["id"] for result in results if not result.get("text")]
+        if not missing:
+            return results
+        
+        texts = self.docstore.get_many(missing)
+        for result in results:
+            if not result.get("text") and result["id"] in texts:
+                result["text"] = texts[result["id"]]
+        
+        # Chunks of parent documents are cut out of the parent text
+        spans = [_parent_span(result) for result in results if not result.get("text")]
+        spans = [span for span in spans if span is not None]
+        if spans:
+            parents = self.docstore.get_parents([parent_id for parent_id, _, _ in spans])
+            for result in results:
+                span = None if result.get("text") else _parent_span(result)
+                if span is not None and span[0] in parents:
+                    result["text"] = parents[span[0]][span[1]:span[2]]
+        return results
+    
+    def expand_to_parents(
+        self,
+        results: List[Dict[str, Any]],
+        window: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Widen chunk hits into windows of their parent documents.
+        
+        Every hit is extended by ``window`` characters on both sides;
+        overlapping or touching windows of the same parent are merged, so no
+        text appears twice. Hits that are not parent chunks pass through.
+        
+        Args:
+            results: Ranked results (e.g. from retrieve() or retrieve_fused())
+            window: Characters of context added on each side
+                (default: settings.PARENT_WINDOW_CHARS)
+            
+        Returns:
+            Windows and pass-through hits, ordered by best score; a window has
+            the parent text span as ``text``, the best hit's score and id
+            fields, ``start``/``end`` in its metadata and the merged hit ids
+            in ``chunk_ids``
+        """
+        if self.docstore is None:
+            raise ValueError("Parent expansion needs a docstore (set DOCSTORE_ENABLED or pass docstore=)")
+        if window is None:
+            window = settings.PARENT_WINDOW_CHARS
+        
+        spans = {id(result): _parent_span(result) for result in results}
+        parents = self.docstore.get_parents([span[0] for span in spans.values() if span is not None])
+        
+        expanded: List[Dict[str, Any]] = []
+        hits_by_parent: Dict[str, List[Tuple[int, int, Dict[str, Any]]]] = {}
+        for result in results:
+            span = spans[id(result)]
+            if span is None or span[0] not in parents:
+                expanded.append(result)
+                continue
+            
+            parent_id, start, end = span
+            hits_by_parent.setdefault(parent_id, []).append(
+                (max(0, start - window), min(len(parents[parent_id]), end + window), result)
+            )
+        
+        for parent_id, hits in hits_by_parent.items():
+            hits.sort(key=lambda hit: hit[0])
+            
+            groups: List[List[Tuple[int, int, Dict[str, Any]]]] = [[hits[0]]]
+            group_end = hits[0][1]
+            for hit in hits[1:]:
+                if hit[0] <= group_end:
+                    groups[-1].append(hit)
+                    group_end = max(group_end, hit[1])
+                else:
+                    groups.append([hit])
+                    group_end = hit[1]
+            
+            for group in groups:
+                start = group[0][0]
+                end = max(hit[1] for hit in group)
+                best = max((hit[2] for hit in group), key=lambda r: r.get("score", 0))
+                
+                merged = dict(best)
+                merged["text"] = parents[parent_id][start:end]
+                merged["metadata"] = {**best.get("metadata", {}), "start": start, "end": end}
+                merged["chunk_ids"] = [hit[2]["id"] for hit in group]
+                expanded.append(merged)
+        
+        expanded.sort(key=lambda r: r.get("score", 0), reverse=True)
+        logger.debug(f"Expanded {len(results)} hits into {len(expanded)} parent windows")
+        return expanded
+    
     def retrieve(
         self,
         query: str,
@@ -120,6 +522,131 @@ class Retriever:
             top_k: Number of results to return
             filter_dict: Optional metadata filter
             
+        Returns:
+            List of matching documents with scores
+        """
+        return self._retrieve_coalesced(query, store_type, top_k, filter_dict)
+    
+    def _retrieve_coalesced(
+        self,
+        query: str,
+        store_type: StoreType,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
+        exact_lookup: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve, sharing the work with identical requests already in flight.
+        
+        Args:
+            query: Query text
+            store_type: Which store to query
+            top_k: Number of results to return
+            filter_dict: Optional metadata filter
+            query_embedding: Optional precomputed query vector
+            exact_lookup: Whether to check the exact cache key
+            
+        Returns:
+            List of matching documents with scores
+        """
+        if self.singleflight is None:
+            return self._retrieve_cached(
+                query, store_type, top_k, filter_dict, query_embedding, exact_lookup
+            )
+        
+        key = QueryCache.make_key(query, store_type, top_k, filter_dict)
+        results, shared = self.singleflight.do(
+            key,
+            self._retrieve_cached,
+            query,
+            store_type,
+            top_k,
+            filter_dict,
+            query_embedding,
+            exact_lookup
+        )
+        
+        # Followers get their own copies of the leader's result dicts
+        if shared:
+            results = [dict(result) for result in results]
+        return results
+    
+    def _invalidate_cache(self, store_type: StoreType) -> None:
+        """
+        Drop cached results of a store after its contents changed.
+        
+        Args:
+            store_type: Store that was written to
+        """
+        if self.cache is not None:
+            self.cache.invalidate(store_type)
+    
+    def _retrieve_cached(
+        self,
+        query: str,
+        store_type: StoreType,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
+        exact_lookup: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Query a store through the result cache, if one is configured.
+        
+        Args:
+            query: Query text
+            store_type: Which store to query
+            top_k: Number of results to return
+            filter_dict: Optional metadata filter
+            query_embedding: Optional precomputed query vector
+            exact_lookup: Whether to check the exact key (False when the
+                caller already missed on it)
+            
+        Returns:
+            List of matching documents with scores
+        """
+        if self.cache is None:
+            return self._query_store(query, store_type, top_k, filter_dict, query_embedding)
+        
+        key = self.cache.make_key(query, store_type, top_k, filter_dict)
+        generation = self.cache.generation(store_type)
+        
+        cached = self.cache.get(key) if exact_lookup else None
+        if cached is not None:
+            logger.debug(f"Query cache hit for {store_type}: '{query[:50]}...'")
+            return cached
+        
+        if self.cache.semantic:
+            if query_embedding is None:
+                query_embedding = self.embedder.embed_text(query)
+            cached = self.cache.get_similar(key, query_embedding)
+            if cached is not None:
+                logger.debug(f"Semantic query cache hit for {store_type}: '{query[:50]}...'")
+                return cached
+        
+        results = self._query_store(query, store_type, top_k, filter_dict, query_embedding)
+        self.cache.put(key, results, query_embedding, generation)
+        return results
+    
+    def _query_store(
+        self,
+        query: str,
+        store_type: StoreType,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Query a single store, optionally with a precomputed query vector.
+        
+        Args:
+            query: Query text
+            store_type: Which store to query
+            top_k: Number of results to return
+            filter_dict: Optional metadata filter
+            query_embedding: Optional precomputed query vector
+            
         Returns:
             List of matching documents with scores
         """
@@ -127,49 +654,382 @@ class Retriever:
             store = self._get_store(store_type)
             
             logger.info(f"Retrieving from {store_type}: '{query[:50]}...'")
-            results = store.query(query, top_k, filter_dict)
+            results = store.query(
+                query,
+                top_k=top_k,
+                filter_dict=filter_dict,
+                query_embedding=query_embedding
+            )
             
             # Add store type to results
             for result in results:
                 result["store"] = store_type
             
-            return results
+            return self._hydrate(results)
         
         except Exception as e:
             logger.error(f"Error retrieving from {store_type}: {e}")
             raise
     
+    def retrieve_expanded(
+        self,
+        query: str,
+        store_type: StoreType,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        window: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve small chunks and return merged parent windows around them.
+        
+        Args:
+            query: Query text
+            store_type: Which store to query
+            top_k: Number of chunk hits to expand
+            filter_dict: Optional metadata filter
+            window: Characters of context added on each side of a hit
+            
+        Returns:
+            Parent windows, see expand_to_parents()
+        """
+        return self.expand_to_parents(self.retrieve(query, store_type, top_k, filter_dict), window)
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """
+        Get the shared thread pool used for concurrent store queries.
+        
+        The pool outlives single calls so that a store that misses its
+        deadline never blocks the caller on executor shutdown.
+        
+        Returns:
+            The thread pool executor
+        """
+        executor = self._executor
+        if executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="retriever"
+                    )
+                executor = self._executor
+        return executor
+    
+    def iter_retrieve_all(
+        self,
+        query: str,
+        top_k: int = 5,
+        stores: Optional[List[StoreType]] = None,
+        store_timeout: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]], Optional[Exception]]]:
+        """
+        Query stores concurrently and yield each store's results as they land.
+        
+        The query is embedded once and shared by all stores. Stores that fail
+        are yielded with empty results and the exception; stores that miss
+        their deadline get a TimeoutError.
+        
+        A store call cannot be interrupted once it runs: a timed-out query
+        is abandoned, not cancelled, and keeps its pool thread until the
+        store returns. So that a hanging store cannot fill the shared pool,
+        a store with RETRIEVE_MAX_ABANDONED such queries still running is
+        not queried again (it gets a TimeoutError right away) until one of
+        them returns.
+        
+        Args:
+            query: Query text
+            top_k: Number of results per store
+            stores: List of stores to query (default: all)
+            store_timeout: Deadline of each store query in seconds, counted
+                from its submission (default: settings)
+            timeout: Deadline of the whole call in seconds, including the
+                query embedding (default: settings)
+            
+        Yields:
+            Tuples of (store_type, results, error); error is None on success
+        """
+        if stores is None:
+            stores = ["pinecone", "weaviate", "relevance"]
+        if store_timeout is None:
+            store_timeout = settings.RETRIEVE_STORE_TIMEOUT
+        if timeout is None:
+            timeout = settings.RETRIEVE_TOTAL_TIMEOUT
+        
+        start = time.monotonic()
+        overall_deadline = start + timeout
+        
+        # Exact cache hits need neither an embedding nor a store round trip
+        if self.cache is not None:
+            remaining_stores = []
+            for store_type in stores:
+                cached = self.cache.get(self.cache.make_key(query, store_type, top_k))
+                if cached is not None:
+                    yield store_type, cached, None
+                else:
+                    remaining_stores.append(store_type)
+            stores = remaining_stores
+        
+        # Stores whose earlier queries are still hanging are not queried again
+        with self._lock:
+            abandoned = {s: self._abandoned.get(s, 0) for s in stores}
+        busy = [s for s in stores if abandoned[s] >= settings.RETRIEVE_MAX_ABANDONED]
+        for store_type in busy:
+            logger.warning(f"{store_type} skipped: {abandoned[store_type]} timed-out queries still running")
+            yield store_type, [], TimeoutError(f"skipped, {abandoned[store_type]} timed-out queries still running")
+        stores = [s for s in stores if s not in busy]
+        
+        if not stores:
+            return
+        
+        try:
+            query_embedding = self.embedder.embed_text(query)
+        except Exception as e:
+            logger.error(f"Failed to embed query: {e}")
+            for store_type in stores:
+                yield store_type, [], e
+            return
+        
+        executor = self._get_executor()
+        pending = {
+            executor.submit(
+                self._retrieve_coalesced,
+                query,
+                store_type,
+                top_k,
+                None,
+                query_embedding,
+                False
+            ): store_type
+            for store_type in stores
+        }
+        
+        # All stores are submitted together, so they share one deadline
+        store_deadline = min(time.monotonic() + store_timeout, overall_deadline)
+        
+        while pending:
+            remaining = store_deadline - time.monotonic()
+            done, _ = wait(
+                list(pending),
+                timeout=max(remaining, 0),
+                return_when=FIRST_COMPLETED
+            )
+            
+            for future in done:
+                store_type = pending.pop(future)
+                try:
+                    yield store_type, future.result(), None
+                except Exception as e:
+                    logger.error(f"Failed to retrieve from {store_type}: {e}")
+                    yield store_type, [], e
+            
+            if pending and time.monotonic() >= store_deadline:
+                elapsed = time.monotonic() - start
+                for future, store_type in list(pending.items()):
+                    if not future.cancel():
+                        self._abandon(store_type, future)
+                    logger.warning(f"{store_type} timed out after {elapsed:.1f}s")
+                    yield store_type, [], TimeoutError(f"timed out after {elapsed:.1f}s")
+                pending.clear()
+    
+    def _abandon(self, store_type: StoreType, future: Future) -> None:
+        """
+        Count a timed-out store query until it returns.
+        
+        Args:
+            store_type: Store being queried
+            future: The running query
+        """
+        with self._lock:
+            self._abandoned[store_type] = self._abandoned.get(store_type, 0) + 1
+        
+        def release(_: Future) -> None:
+            with self._lock:
+                self._abandoned[store_type] -= 1
+        
+        future.add_done_callback(release)
+    
     def retrieve_all(
         self,
         query: str,
         top_k: int = 5,
-        stores: Optional[List[StoreType]] = None
-    ) -> Dict[str, List[Dict[str, Any]]]:
+        stores: Optional[List[StoreType]] = None,
+        store_timeout: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> "MultiStoreResults":
         """
-        Retrieve documents from all specified stores.
+        Retrieve documents from all specified stores concurrently.
         
         Args:
             query: Query text
             top_k: Number of results per store
             stores: List of stores to query (default: all)
+            store_timeout: Per-store deadline in seconds (default: settings)
+            timeout: Overall deadline in seconds (default: settings)
             
         Returns:
-            Dictionary mapping store type to results
+            Dictionary mapping store type to results; stores that failed or
+            missed their deadline map to [] and are listed in ``errors`` /
+            ``timed_out``
         """
         if stores is None:
             stores = ["pinecone", "weaviate", "relevance"]
         
-        results = {}
+        results = MultiStoreResults()
         
-        for store_type in stores:
-            try:
-                results[store_type] = self.retrieve(query, store_type, top_k)
-            except Exception as e:
-                logger.error(f"Failed to retrieve from {store_type}: {e}")
-                results[store_type] = []
+        for store_type, store_results, error in self.iter_retrieve_all(
+            query, top_k, stores, store_timeout, timeout
+        ):
+            results[store_type] = store_results
+            if error is not None:
+                results.errors[store_type] = str(error)
+                if isinstance(error, TimeoutError):
+                    results.timed_out.append(store_type)
+        
+        # Keep the caller's store order
+        return MultiStoreResults(
+            ((store_type, results[store_type]) for store_type in stores),
+            errors=results.errors,
+            timed_out=results.timed_out
+        )
+    
+    def retrieve_many(
+        self,
+        queries: List[str],
+        store_type: StoreType,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        batch_size: int = 256,
+        max_concurrency: int = 16
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve documents for many queries at once.
+        
+        Queries are embedded with a few embed_batch calls and the store
+        queries run concurrently with bounded parallelism; store queries of
+        one batch overlap with embedding the next.
+        
+        Args:
+            queries: Query texts
+            store_type: Which store to query
+            top_k: Number of results per query
+            filter_dict: Optional metadata filter applied to every query
+            batch_size: Number of queries per embedding request
+            max_concurrency: Maximum number of store queries in flight
+            
+        Returns:
+            One result list per query, aligned with the input order
+        """
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        
+        # Exact cache hits skip embedding; empty queries have no results
+        pending: List[int] = []
+        for i, query in enumerate(queries):
+            if not query or not query.strip():
+                continue
+            if self.cache is not None:
+                cached = self.cache.get(self.cache.make_key(query, store_type, top_k, filter_dict))
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            pending.append(i)
+        
+        logger.info(
+            f"Retrieving {len(queries)} queries from {store_type} "
+            f"({len(queries) - len(pending)} answered without a store query)"
+        )
+        
+        store = self._get_store(store_type)
+        batch_store = store if hasattr(store, "query_batch") else None
         
+        with ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="retrieve-many"
+        ) as executor:
+            futures = {}
+            
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                embeddings = self.embedder.embed_batch([queries[i] for i in batch])
+                
+                # In-process stores answer a whole batch with one matrix product
+                if batch_store is not None:
+                    generation = self.cache.generation(store_type) if self.cache else None
+                    batch_matches = batch_store.query_batch(embeddings, top_k, filter_dict)
+                    self._hydrate([match for matches in batch_matches for match in matches])
+                    
+                    for i, embedding, matches in zip(batch, embeddings, batch_matches):
+                        for match in matches:
+                            match["store"] = store_type
+                        results[i] = matches
+                        if self.cache is not None:
+                            key = self.cache.make_key(queries[i], store_type, top_k, filter_dict)
+                            self.cache.put(key, matches, embedding, generation)
+                    continue
+                
+                for i, embedding in zip(batch, embeddings):
+                    futures[i] = executor.submit(
+                        self._retrieve_coalesced,
+                        queries[i],
+                        store_type,
+                        top_k,
+                        filter_dict,
+                        embedding,
+                        False
+                    )
+                
+                logger.debug(f"Embedded {min(start + batch_size, len(pending))}/{len(pending)} queries")
+            
+            for i, future in futures.items():
+                results[i] = future.result()
+        
+        logger.info(f"Retrieved results for {len(queries)} queries from {store_type}")
         return results
     
+    def retrieve_fused(
+        self,
+        query: str,
+        top_k: int = 5,
+        stores: Optional[List[StoreType]] = None,
+        per_store_top_k: Optional[int] = None,
+        method: FusionMethod = "rrf",
+        store_timeout: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve from several stores and fuse the results into one ranking.
+        
+        Scores from different stores are not comparable, so lists are merged
+        by reciprocal rank (or min-max normalized score) and deduplicated by
+        content hash. Redundant stores then act as a recall booster.
+        
+        Args:
+            query: Query text
+            top_k: Number of fused results to return
+            stores: List of stores to query (default: all)
+            per_store_top_k: Results to fetch from each store (default: top_k)
+            method: Fusion method, "rrf" or "minmax"
+            store_timeout: Per-store deadline in seconds (default: settings)
+            timeout: Overall deadline in seconds (default: settings)
+            
+        Returns:
+            Fused list of matching documents
+        """
+        results_by_store = self.retrieve_all(
+            query,
+            per_store_top_k or top_k,
+            stores,
+            store_timeout,
+            timeout
+        )
+        
+        fused = fuse_results(results_by_store, top_k=top_k, method=method)
+        logger.info(
+            f"Fused {sum(len(r) for r in results_by_store.values())} results "
+            f"from {len(results_by_store)} stores into {len(fused)}"
+        )
+        return fused
+    
     def compare_stores(
         self,
         query: str,
@@ -195,6 +1055,10 @@ class Retriever:
             print(f"📊 {store_type.upper()} RESULTS")
             print(f"{'─' * 80}")
             
+            if store_type in all_results.errors:
+                print(f"  ❌ {all_results.errors[store_type]}")
+                continue
+            
             if not results:
                 print("  ⚠️  No results found")
                 continue
@@ -209,13 +1073,381 @@ class Retriever:
         
         print("\n" + "=" * 80 + "\n")
     
+    async def aretrieve(
+        self,
+        query: str,
+        store_type: StoreType,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Asynchronous variant of retrieve().
+        
+        The query is embedded with the async OpenAI client; Pinecone and
+        Weaviate are queried with their async clients, other stores in a
+        worker thread, so one event loop can serve many requests at once.
+        
+        Args:
+            query: Query text
+            store_type: Which store to query
+            top_k: Number of results to return
+            filter_dict: Optional metadata filter
+            
+        Returns:
+            List of matching documents with scores
+        """
+        return await self._aretrieve_coalesced(query, store_type, top_k, filter_dict)
+    
+    async def _aretrieve_coalesced(
+        self,
+        query: str,
+        store_type: StoreType,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
+        exact_lookup: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Asynchronous variant of _retrieve_coalesced().
+        
+        Args:
+            query: Query text
+            store_type: Which store to query
+            top_k: Number of results to return
+            filter_dict: Optional metadata filter
+            query_embedding: Optional precomputed query vector
+            exact_lookup: Whether to check the exact cache key
+            
+        Returns:
+            List of matching documents with scores
+        """
+        if self.async_singleflight is None:
+            return await self._aretrieve_cached(
+                query, store_type, top_k, filter_dict, query_embedding, exact_lookup
+            )
+        
+        key = QueryCache.make_key(query, store_type, top_k, filter_dict)
+        results, shared = await self.async_singleflight.do(
+            key,
+            self._aretrieve_cached,
+            query,
+            store_type,
+            top_k,
+            filter_dict,
+            query_embedding,
+            exact_lookup
+        )
+        
+        if shared:
+            results = [dict(result) for result in results]
+        return results
+    
+    async def _aretrieve_cached(
+        self,
+        query: str,
+        store_type: StoreType,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
+        exact_lookup: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Asynchronous variant of _retrieve_cached().
+        
+        Args:
+            query: Query text
+            store_type: Which store to query
+            top_k: Number of results to return
+            filter_dict: Optional metadata filter
+            query_embedding: Optional precomputed query vector
+            exact_lookup: Whether to check the exact key
+            
+        Returns:
+            List of matching documents with scores
+        """
+        if self.cache is None:
+            return await self._aquery_store(query, store_type, top_k, filter_dict, query_embedding)
+        
+        key = self.cache.make_key(query, store_type, top_k, filter_dict)
+        generation = self.cache.generation(store_type)
+        
+        cached = self.cache.get(key) if exact_lookup else None
+        if cached is not None:
+            logger.debug(f"Query cache hit for {store_type}: '{query[:50]}...'")
+            return cached
+        
+        if self.cache.semantic:
+            if query_embedding is None:
+                query_embedding = await self.embedder.aembed_text(query)
+            cached = self.cache.get_similar(key, query_embedding)
+            if cached is not None:
+                logger.debug(f"Semantic query cache hit for {store_type}: '{query[:50]}...'")
+                return cached
+        
+        results = await self._aquery_store(query, store_type, top_k, filter_dict, query_embedding)
+        self.cache.put(key, results, query_embedding, generation)
+        return results
+    
+    async def _aquery_store(
+        self,
+        query: str,
+        store_type: StoreType,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Asynchronous variant of _query_store().
+        
+        Stores with an ``aquery`` coroutine are awaited directly; the others,
+        and the docstore lookup, run in a worker thread.
+        
+        Args:
+            query: Query text
+            store_type: Which store to query
+            top_k: Number of results to return
+            filter_dict: Optional metadata filter
+            query_embedding: Optional precomputed query vector
+            
+        Returns:
+            List of matching documents with scores
+        """
+        try:
+            # Store construction may connect over the network
+            store = self._stores.get(store_type)
+            if store is None:
+                store = await asyncio.to_thread(self._get_store, store_type)
+            
+            logger.info(f"Retrieving from {store_type}: '{query[:50]}...'")
+            if hasattr(store, "aquery"):
+                if query_embedding is None:
+                    query_embedding = await self.embedder.aembed_text(query)
+                results = await store.aquery(
+                    query,
+                    top_k=top_k,
+                    filter_dict=filter_dict,
+                    query_embedding=query_embedding
+                )
+            else:
+                results = await asyncio.to_thread(
+                    store.query,
+                    query,
+                    top_k=top_k,
+                    filter_dict=filter_dict,
+                    query_embedding=query_embedding
+                )
+            
+            for result in results:
+                result["store"] = store_type
+            
+            if self.docstore is None:
+                return results
+            return await asyncio.to_thread(self._hydrate, results)
+        
+        except Exception as e:
+            logger.error(f"Error retrieving from {store_type}: {e}")
+            raise
+    
+    async def aretrieve_all(
+        self,
+        query: str,
+        top_k: int = 5,
+        stores: Optional[List[StoreType]] = None,
+        store_timeout: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> "MultiStoreResults":
+        """
+        Asynchronous variant of retrieve_all().
+        
+        Args:
+            query: Query text
+            top_k: Number of results per store
+            stores: List of stores to query (default: all)
+            store_timeout: Per-store deadline in seconds (default: settings)
+            timeout: Overall deadline in seconds (default: settings)
+            
+        Returns:
+            Dictionary mapping store type to results; stores that failed or
+            missed their deadline map to [] and are listed in ``errors`` /
+            ``timed_out``
+        """
+        if stores is None:
+            stores = ["pinecone", "weaviate", "relevance"]
+        if store_timeout is None:
+            store_timeout = settings.RETRIEVE_STORE_TIMEOUT
+        if timeout is None:
+            timeout = settings.RETRIEVE_TOTAL_TIMEOUT
+        
+        start = time.monotonic()
+        results = MultiStoreResults()
+        query_embedding = None
+        
+        # Exact cache hits need neither an embedding nor a store round trip
+        remaining_stores = []
+        for store_type in stores:
+            cached = self.cache.get(self.cache.make_key(query, store_type, top_k)) if self.cache else None
+            if cached is not None:
+                results[store_type] = cached
+            else:
+                remaining_stores.append(store_type)
+        
+        if remaining_stores:
+            try:
+                query_embedding = await asyncio.wait_for(
+                    self.embedder.aembed_text(query), timeout=min(store_timeout, timeout)
+                )
+            except Exception as e:
+                logger.error(f"Failed to embed query: {e}")
+                for store_type in remaining_stores:
+                    results[store_type] = []
+                    results.errors[store_type] = str(e) or type(e).__name__
+                    if isinstance(e, asyncio.TimeoutError):
+                        results.timed_out.append(store_type)
+                remaining_stores = []
+        
+        tasks = {
+            asyncio.ensure_future(self._aretrieve_coalesced(
+                query, store_type, top_k, None, query_embedding, False
+            )): store_type
+            for store_type in remaining_stores
+        }
+        
+        if tasks:
+            remaining = min(start + store_timeout, start + timeout) - time.monotonic()
+            done, pending = await asyncio.wait(list(tasks), timeout=max(remaining, 0))
+            
+            for task in done:
+                store_type = tasks[task]
+                try:
+                    results[store_type] = task.result()
+                except Exception as e:
+                    logger.error(f"Failed to retrieve from {store_type}: {e}")
+                    results[store_type] = []
+                    results.errors[store_type] = str(e)
+            
+            elapsed = time.monotonic() - start
+            for task in pending:
+                store_type = tasks[task]
+                task.cancel()
+                logger.warning(f"{store_type} timed out after {elapsed:.1f}s")
+                results[store_type] = []
+                results.errors[store_type] = f"timed out after {elapsed:.1f}s"
+                results.timed_out.append(store_type)
+        
+        # Keep the caller's store order
+        return MultiStoreResults(
+            ((store_type, results[store_type]) for store_type in stores),
+            errors=results.errors,
+            timed_out=results.timed_out
+        )
+    
+    async def aadd_documents(
+        self,
+        texts: List[str],
+        store_type: Optional[StoreType] = None,
+        metadata: List[Dict[str, Any]] = None,
+        stores: Optional[List[StoreType]] = None
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Asynchronous variant of add_documents().
+        
+        Texts are embedded with the async OpenAI client; the store writes
+        (batched upserts) then run in a worker thread.
+        
+        Args:
+            texts: List of document texts
+            store_type: Which store to use
+            metadata: Optional metadata for each document
+            stores: Optional list of stores to write to instead of store_type
+            
+        Returns:
+            See add_documents()
+        """
+        if not stores and store_type is None:
+            raise ValueError("Either store_type or stores must be provided")
+        
+        # Empty texts are not embedded; drop them so everything stays aligned
+        keep = [i for i, t in enumerate(texts) if t and t.strip()]
+        texts = [texts[i] for i in keep]
+        if metadata:
+            metadata = [metadata[i] if i < len(metadata) else {} for i in keep]
+        
+        embeddings = await self.embedder.aembed_batch(texts) if texts else []
+        
+        return await asyncio.to_thread(
+            self._add_documents, texts, store_type, metadata, stores, None, embeddings
+        )
+    
+    async def agenerate(
+        self,
+        query: str,
+        store_type: StoreType,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        generator: Optional[RAGGenerator] = None
+    ) -> Dict[str, Any]:
+        """
+        Retrieve context and generate an answer without blocking the event loop.
+        
+        Args:
+            query: Query text
+            store_type: Which store to query
+            top_k: Number of context documents
+            filter_dict: Optional metadata filter
+            generator: Generator to use (default: one shared by this retriever)
+            
+        Returns:
+            Dictionary with answer, sources and num_sources, as
+            RAGGenerator.generate_answer_with_sources()
+        """
+        if generator is None:
+            if self._generator is None:
+                self._generator = RAGGenerator()
+            generator = self._generator
+        
+        # Context compression scores sentences against the query vector;
+        # embed the query once and use it for retrieval and compression
+        query_embedding = None
+        if generator.compressor is not None:
+            query_embedding = await self.embedder.aembed_text(query)
+        
+        results = await self._aretrieve_coalesced(query, store_type, top_k, filter_dict, query_embedding)
+        return await generator.agenerate_answer_with_sources(query, results, query_embedding)
+    
+    async def acleanup(self) -> None:
+        """
+        Close the async connections opened on the running event loop.
+        
+        Covers the stores' async clients and the shared async OpenAI pool
+        of the loop.
+        """
+        for store_type, store in list(self._stores.items()):
+            try:
+                if hasattr(store, "aclose"):
+                    await store.aclose()
+            except Exception as e:
+                logger.error(f"Error closing async connections of {store_type}: {e}")
+        
+        await aclose_clients()
+    
     def cleanup(self) -> None:
         """Clean up all store connections."""
-        for store_type, store in self._stores.items():
+        with self._lock:
+            executor, self._executor = self._executor, None
+            stores = list(self._stores.items())
+            self._stores.clear()
+        
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        for store_type, store in stores:
             try:
-                if store_type == "weaviate" and hasattr(store, 'close'):
+                if hasattr(store, 'close'):
                     store.close()
                 logger.info(f"Cleaned up {store_type} store")
             except Exception as e:
                 logger.error(f"Error cleaning up {store_type}: {e}")
+        
+        if self.docstore is not None:
+            self.docstore.close()
 
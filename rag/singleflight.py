@@ -0,0 +1,166 @@
+"""
+Coalescing of identical concurrent calls ("singleflight").
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from loguru import logger
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time and share its outcome.
+    
+    The first caller for a key (the leader) executes the function; callers
+    that arrive with the same key while it is running (followers) wait on
+    the leader's future and receive the same result or exception.
+    """
+    
+    def __init__(self):
+        """Initialize an empty in-flight registry."""
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+    
+    def do(
+        self,
+        key: Hashable,
+        func: Callable[..., Any],
+        *args,
+        **kwargs
+    ) -> Tuple[Any, bool]:
+        """
+        Execute func for key, or join an identical call already in flight.
+        
+        Args:
+            key: Identity of the call
+            func: Function to execute if no call for key is in flight
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+        
+        Returns:
+            Tuple of (result, shared); shared is True for followers, whose
+            result object is the same one handed to the leader
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._in_flight[key] = future
+                self.executions += 1
+                leader = True
+        
+        if not leader:
+            logger.debug(f"Joining in-flight call for key {key!r}")
+            return future.result(), True
+        
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        
+        with self._lock:
+            del self._in_flight[key]
+        future.set_result(result)
+        return result, False
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get coalescing counters.
+        
+        Returns:
+            Dictionary with calls, executions, coalesced and in_flight
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._in_flight)
+            }
+
+
+class AsyncSingleFlight:
+    """
+    Coroutine counterpart of SingleFlight.
+    
+    Followers await the leader's task instead of blocking a thread. Calls
+    are only coalesced within one event loop.
+    """
+    
+    def __init__(self):
+        """Initialize an empty in-flight registry."""
+        self._in_flight: Dict[Tuple[int, Hashable], "asyncio.Future"] = {}
+        
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+    
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[..., Awaitable[Any]],
+        *args,
+        **kwargs
+    ) -> Tuple[Any, bool]:
+        """
+        Await func for key, or join an identical call already in flight.
+        
+        Args:
+            key: Identity of the call
+            func: Coroutine function to run if no call for key is in flight
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+        
+        Returns:
+            Tuple of (result, shared); shared is True for followers
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        self.calls += 1
+        
+        task = self._in_flight.get(flight_key)
+        if task is not None:
+            self.coalesced += 1
+            logger.debug(f"Joining in-flight call for key {key!r}")
+            # A cancelled follower must not cancel the leader's task
+            return await asyncio.shield(task), True
+        
+        task = loop.create_task(func(*args, **kwargs))
+        self._in_flight[flight_key] = task
+        self.executions += 1
+        try:
+            return await asyncio.shield(task), False
+        finally:
+            if task.done():
+                self._in_flight.pop(flight_key, None)
+            else:
+                task.add_done_callback(lambda _: self._in_flight.pop(flight_key, None))
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get coalescing counters.
+        
+        Returns:
+            Dictionary with calls, executions, coalesced and in_flight
+        """
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight)
+        }
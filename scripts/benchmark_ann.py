@@ -0,0 +1,162 @@
+"""
+Recall@k benchmark of the IVF index and quantized tiers against exact search.
+Runs offline on synthetic clustered vectors (no API keys needed).
+
+The quantized tiers are measured through LocalStore.query_batch(), i.e. the
+same code-scan and rescoring path the store uses for real queries.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from embeddings.embedder import Embedder
+from stores.ivf_index import IVFIndex
+from stores.local_store import LocalStore
+
+
+def make_dataset(n: int, dimension: int, n_queries: int, seed: int = 0):
+    """
+    Generate normalized vectors drawn around random cluster centres.
+    
+    Args:
+        n: Number of corpus vectors
+        dimension: Vector dimension
+        n_queries: Number of query vectors
+        seed: Random seed
+    
+    Returns:
+        Tuple of (corpus, queries)
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(n // 100, 1), dimension)).astype(np.float32)
+    
+    def sample(count):
+        points = centres[rng.integers(len(centres), size=count)]
+        points = points + 1.0 * rng.standard_normal((count, dimension)).astype(np.float32)
+        return points / np.linalg.norm(points, axis=1, keepdims=True)
+    
+    return sample(n), sample(n_queries)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force top-k rows for each query."""
+    scores = queries @ corpus.T
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return part
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Average fraction of the true top-k found."""
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def build_local_store(path: Path, kind: str, corpus: np.ndarray) -> LocalStore:
+    """
+    Load the corpus into a quantized LocalStore flushed to one disk segment.
+    
+    Args:
+        path: Directory for the store files
+        kind: Quantization ("int8" or "binary")
+        corpus: Normalized corpus vectors; row i gets id "i"
+    
+    Returns:
+        The store (vectors are passed in, so the embedder is never called)
+    """
+    store = LocalStore(
+        path=str(path),
+        embedder=Embedder(api_key="offline-benchmark"),
+        quantization=kind,
+        flush_rows=len(corpus) + 1,
+        background=False,
+        search_workers=1
+    )
+    ids = [str(i) for i in range(len(corpus))]
+    store.add_texts(ids, embeddings=corpus, ids=ids)
+    store.flush()
+    return store
+
+
+def store_top_k(store: LocalStore, queries: np.ndarray, k: int) -> np.ndarray:
+    """Top-k corpus rows of each query, as returned by the store."""
+    return np.array([
+        [int(match["id"]) for match in matches]
+        for matches in store.query_batch(list(queries), k)
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF and quantized recall@k vs exact search")
+    parser.add_argument("--n", type=int, default=100_000, help="corpus size")
+    parser.add_argument("--dim", type=int, default=256, help="vector dimension")
+    parser.add_argument("--queries", type=int, default=200, help="number of queries")
+    parser.add_argument("--k", type=int, default=10, help="neighbours per query")
+    parser.add_argument("--nlist", type=int, default=None, help="inverted lists (default: 4*sqrt(n))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 4, 16], help="quantized rescore factors")
+    args = parser.parse_args()
+    
+    nlist = args.nlist or int(4 * np.sqrt(args.n))
+    
+    print("\n" + "=" * 60)
+    print("  ANN Benchmark (IVF and quantized codes)")
+    print("=" * 60)
+    print(f"  corpus={args.n} dim={args.dim} queries={args.queries} k={args.k} nlist={nlist}\n")
+    
+    corpus, queries = make_dataset(args.n, args.dim, args.queries)
+    
+    start = time.perf_counter()
+    truth = exact_top_k(corpus, queries, args.k)
+    exact_time = time.perf_counter() - start
+    print(f"  Exact search: {args.queries / exact_time:,.0f} QPS (batched matmul)")
+    
+    start = time.perf_counter()
+    index = IVFIndex(args.dim, nlist=nlist, train_size=args.n)
+    index.add(corpus)
+    print(f"  Build time:   {time.perf_counter() - start:.1f}s\n")
+    
+    print(f"  {'nprobe':>6} | {'recall@' + str(args.k):>9} | {'QPS':>8}")
+    print("  " + "-" * 30)
+    
+    for nprobe in args.nprobe:
+        start = time.perf_counter()
+        _, rows = index.search(queries, args.k, nprobe=nprobe)
+        elapsed = time.perf_counter() - start
+        
+        print(f"  {nprobe:>6} | {recall_at_k(rows, truth):>9.3f} | {args.queries / elapsed:>8,.0f}")
+    
+    print(f"\n  {'codes':>6} | {'rescore':>7} | {'recall@' + str(args.k):>9} | {'QPS':>8} | {'bytes/vec':>9}")
+    print("  " + "-" * 52)
+    
+    for kind in ("int8", "binary"):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = build_local_store(Path(tmp), kind, corpus)
+            code_bytes = store._segments[0].codes.shape[1]
+            
+            for rescore_factor in args.rescore:
+                store.rescore_factor = rescore_factor
+                
+                start = time.perf_counter()
+                rows = store_top_k(store, queries, args.k)
+                elapsed = time.perf_counter() - start
+                
+                print(
+                    f"  {kind:>6} | {rescore_factor:>7} | {recall_at_k(rows, truth):>9.3f} | "
+                    f"{args.queries / elapsed:>8,.0f} | {code_bytes:>9}"
+                )
+            
+            store.close()
+    
+    print("\n" + "=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
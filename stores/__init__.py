@@ -1,12 +1,26 @@
 """Vector store implementations for RAG system."""
 
-from .pinecone_store import PineconeStore
-from .weaviate_store import WeaviateStore
+import importlib
 
-# Relevance AI is optional (may have installation issues on Windows)
-try:
-    from .relevance_store import RelevanceStore
-    __all__ = ["PineconeStore", "WeaviateStore", "RelevanceStore"]
-except ImportError:
-    __all__ = ["PineconeStore", "WeaviateStore"]
+# Stores are imported on first access, so that using one store (or a
+# helper module such as stores.shard_search in a worker process) does not
+# load the SDKs of all the others
+_STORES = {
+    "PineconeStore": "pinecone_store",
+    "WeaviateStore": "weaviate_store",
+    "LocalStore": "local_store",
+    "IVFStore": "ivf_store",
+    # Relevance AI is optional (may have installation issues on Windows)
+    "RelevanceStore": "relevance_store",
+}
 
+__all__ = list(_STORES)
+
+
+def __getattr__(name: str):
+    if name not in _STORES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    store = getattr(importlib.import_module(f".{_STORES[name]}", __name__), name)
+    globals()[name] = store
+    return store
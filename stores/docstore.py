@@ -0,0 +1,154 @@
+"""
+Compressed document store that keeps chunk texts out of the vector stores.
+"""
+
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from loguru import logger
+
+from config.settings import settings
+
+# SQLite limits the number of bound parameters per statement
+MAX_VARIABLES = 900
+
+
+class DocStore:
+    """
+    Chunk texts in a local SQLite file, zlib-compressed and keyed by vector id.
+    
+    Vector stores then only hold ids, vectors and small metadata fields;
+    the retriever looks the texts of a ranked result list up in one query.
+    Whole parent documents are kept in a second table, so that chunks can
+    be widened to their surrounding text.
+    """
+    
+    def __init__(self, path: str = None, compression_level: int = 6):
+        """
+        Open (or create) the document store.
+        
+        Args:
+            path: SQLite file path (default: settings.DOCSTORE_PATH)
+            compression_level: zlib level, 1 (fast) to 9 (small)
+        """
+        self.path = Path(path or settings.DOCSTORE_PATH)
+        self.compression_level = compression_level
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for table in ("docs", "parents"):
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, text BLOB NOT NULL)")
+        self._conn.commit()
+        
+        logger.info(f"Initialized DocStore at {self.path} ({self.count()} documents)")
+    
+    def put(self, ids: List[str], texts: List[str]) -> None:
+        """
+        Store texts, replacing existing ids.
+        
+        Args:
+            ids: Vector ids
+            texts: Texts, one per id
+        """
+        self._put("docs", ids, texts)
+    
+    def put_parents(self, parent_ids: List[str], texts: List[str]) -> None:
+        """
+        Store parent documents, replacing existing ids.
+        
+        Args:
+            parent_ids: Parent document ids
+            texts: Full document texts, one per id
+        """
+        self._put("parents", parent_ids, texts)
+    
+    def _put(self, table: str, ids: List[str], texts: List[str]) -> None:
+        rows = [
+            (vector_id, zlib.compress(text.encode("utf-8"), self.compression_level))
+            for vector_id, text in zip(ids, texts)
+        ]
+        
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(f"INSERT OR REPLACE INTO {table} (id, text) VALUES (?, ?)", rows)
+            logger.debug(f"Stored {len(rows)} rows in DocStore table {table}")
+        except Exception as e:
+            logger.error(f"Error storing documents: {e}")
+            raise
+    
+    def get_many(self, ids: List[str]) -> Dict[str, str]:
+        """
+        Look up the texts of many ids.
+        
+        Args:
+            ids: Vector ids
+        
+        Returns:
+            Dictionary mapping each known id to its text
+        """
+        return self._get_many("docs", ids)
+    
+    def get_parents(self, parent_ids: List[str]) -> Dict[str, str]:
+        """
+        Look up parent documents.
+        
+        Args:
+            parent_ids: Parent document ids
+        
+        Returns:
+            Dictionary mapping each known id to the document text
+        """
+        return self._get_many("parents", parent_ids)
+    
+    def _get_many(self, table: str, ids: List[str]) -> Dict[str, str]:
+        unique = list(dict.fromkeys(ids))
+        found: Dict[str, str] = {}
+        
+        with self._lock:
+            for start in range(0, len(unique), MAX_VARIABLES):
+                batch = unique[start:start + MAX_VARIABLES]
+                placeholders = ",".join("?" * len(batch))
+                for vector_id, blob in self._conn.execute(
+                    f"SELECT id, text FROM {table} WHERE id IN ({placeholders})", batch
+                ):
+                    found[vector_id] = zlib.decompress(blob).decode("utf-8")
+        
+        return found
+    
+    def get(self, vector_id: str) -> Optional[str]:
+        """
+        Look up the text of one id.
+        
+        Args:
+            vector_id: Vector id
+        
+        Returns:
+            The text, or None if the id is unknown
+        """
+        return self.get_many([vector_id]).get(vector_id)
+    
+    def delete(self, ids: List[str]) -> None:
+        """
+        Remove texts.
+        
+        Args:
+            ids: Vector ids to remove
+        """
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM docs WHERE id = ?", [(vector_id,) for vector_id in ids])
+    
+    def count(self) -> int:
+        """Number of stored documents."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,526 @@
+"""
+Inverted-file (IVF) approximate nearest neighbour index in pure NumPy.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple, NamedTuple
+
+import numpy as np
+from loguru import logger
+
+# Tail chunks a list may collect before they are merged into one
+MAX_LIST_CHUNKS = 8
+
+# The append log is folded into the list-ordered base files once it holds
+# more than this fraction of the base rows (and at least LOG_MIN_ROWS)
+LOG_MAX_FRACTION = 0.25
+LOG_MIN_ROWS = 10_000
+
+# (vectors, rows) pieces of one inverted list
+Chunks = Tuple[Tuple[np.ndarray, np.ndarray], ...]
+
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    n_iter: int = 20,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Cluster unit vectors by cosine similarity (k-means on the sphere).
+    
+    Args:
+        vectors: L2-normalized float32 matrix (n x d)
+        n_clusters: Number of centroids
+        n_iter: Number of Lloyd iterations
+        seed: Random seed for the initial centroids
+    
+    Returns:
+        L2-normalized centroid matrix (n_clusters x d)
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    
+    for _ in range(n_iter):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        
+        # Re-seed empty clusters with random points
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            sums[empty] = vectors[rng.choice(len(vectors), empty.size, replace=False)]
+        
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    
+    return centroids
+
+
+def _concat(chunks: Chunks, dimension: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Join the (vectors, rows) chunks of a list."""
+    if not chunks:
+        return np.empty((0, dimension), dtype=np.float32), np.empty(0, dtype=np.int64)
+    if len(chunks) == 1:
+        return chunks[0]
+    return np.concatenate([v for v, _ in chunks]), np.concatenate([r for _, r in chunks])
+
+
+def _groups(keys: np.ndarray):
+    """Yield (key, positions) for each distinct key, positions ascending."""
+    order = np.argsort(keys, kind="stable")
+    bounds = np.flatnonzero(np.diff(keys[order])) + 1
+    for positions in np.split(order, bounds):
+        if positions.size:
+            yield int(keys[positions[0]]), positions
+
+
+class _State(NamedTuple):
+    """What a search reads, published as one object so it is never torn."""
+    centroids: Optional[np.ndarray]
+    lists: Tuple[Chunks, ...]
+    pending: Chunks
+    ntotal: int
+
+
+class IVFIndex:
+    """
+    IVF-flat index over L2-normalized vectors (inner product = cosine).
+    
+    A k-means coarse quantizer splits the vectors into ``nlist`` inverted
+    lists; a query scans only the ``nprobe`` lists whose centroids are
+    closest to it. Until ``train_size`` vectors have arrived the index is
+    untrained and searched exactly. Vectors are addressed by their
+    insertion row number.
+    
+    add() and train() publish a new state instead of changing the current
+    one, so searches need no lock; writers must still be serialized by the
+    caller.
+    
+    On disk the lists are kept list by list in base files that load()
+    memory-maps. Vectors added afterwards are appended to a log, which is
+    folded into new base files only once it outgrows ``LOG_MAX_FRACTION``
+    of the base, so saving after every add costs O(added vectors).
+    """
+    
+    PARAMS = "ivf_params.json"
+    
+    def __init__(
+        self,
+        dimension: int,
+        nlist: int = 1024,
+        nprobe: int = 16,
+        kmeans_iters: int = 20,
+        train_size: Optional[int] = None,
+        seed: int = 0
+    ):
+        """
+        Initialize an empty, untrained index.
+        
+        Args:
+            dimension: Vector dimension
+            nlist: Number of inverted lists (build-time parameter)
+            nprobe: Number of lists scanned per query (search-time parameter)
+            kmeans_iters: k-means iterations used for training
+            train_size: Vectors to collect before training automatically
+                (default: 39 * nlist)
+            seed: Random seed for training
+        """
+        self.dimension = dimension
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.kmeans_iters = kmeans_iters
+        self.train_size = train_size or 39 * nlist
+        self.seed = seed
+        
+        self._state = _State(centroids=None, lists=(), pending=(), ntotal=0)
+        
+        # Where and how the index was last saved
+        self._path: Optional[Path] = None
+        self._files: Dict[str, str] = {}
+        self._generation = 0
+        self._base_rows = 0
+        self._log_rows = 0
+        self._unsaved: List[np.ndarray] = []
+        self._rewrite = False
+    
+    @property
+    def centroids(self) -> Optional[np.ndarray]:
+        """Centroids of the coarse quantizer (None until trained)."""
+        return self._state.centroids
+    
+    @property
+    def ntotal(self) -> int:
+        """Number of vectors in the index."""
+        return self._state.ntotal
+    
+    @property
+    def is_trained(self) -> bool:
+        """Whether the coarse quantizer has been trained."""
+        return self._state.centroids is not None
+    
+    def train(self, vectors: Optional[np.ndarray] = None) -> None:
+        """
+        Train the coarse quantizer and move buffered vectors into lists.
+        
+        Args:
+            vectors: L2-normalized training sample (n x d); defaults to the
+                vectors buffered so far
+        """
+        state = self._state
+        pending_vectors, pending_rows = _concat(state.pending, self.dimension)
+        sample = pending_vectors if vectors is None else vectors
+        
+        if len(sample) == 0:
+            raise ValueError("Cannot train an IVF index without vectors")
+        
+        nlist = min(self.nlist, len(sample))
+        logger.info(f"Training IVF quantizer: {nlist} lists on {len(sample)} vectors")
+        
+        centroids = spherical_kmeans(np.asarray(sample), nlist, self.kmeans_iters, self.seed)
+        self.nlist = len(centroids)
+        
+        lists = tuple(() for _ in range(self.nlist))
+        if len(pending_rows):
+            lists = self._assign(lists, centroids, np.asarray(pending_vectors), pending_rows)
+        self._state = state._replace(centroids=centroids, lists=lists, pending=())
+        
+        # The base files are stored list by list, so they must be rebuilt
+        self._rewrite = True
+    
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Add vectors to their nearest inverted lists.
+        
+        An untrained index buffers the vectors and trains itself once
+        train_size of them have arrived.
+        
+        Args:
+            vectors: L2-normalized vectors (n x d)
+        
+        Returns:
+            Row numbers assigned to the vectors
+        """
+        state = self._state
+        ntotal = state.ntotal + len(vectors)
+        rows = np.arange(state.ntotal, ntotal, dtype=np.int64)
+        self._unsaved.append(vectors)
+        
+        if state.centroids is not None:
+            lists = self._assign(state.lists, state.centroids, vectors, rows)
+            self._state = state._replace(lists=lists, ntotal=ntotal)
+            return rows
+        
+        pending = self._append_chunk(state.pending, vectors, rows)
+        self._state = state._replace(pending=pending, ntotal=ntotal)
+        if ntotal >= self.train_size:
+            self.train()
+        return rows
+    
+    def _assign(
+        self,
+        lists: Tuple[Chunks, ...],
+        centroids: np.ndarray,
+        vectors: np.ndarray,
+        rows: np.ndarray
+    ) -> Tuple[Chunks, ...]:
+        """Return lists with the vectors appended to their nearest centroids' lists."""
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        
+        lists = list(lists)
+        for list_id, positions in _groups(assignments):
+            lists[list_id] = self._append_chunk(lists[list_id], vectors[positions], rows[positions])
+        return tuple(lists)
+    
+    def _append_chunk(self, chunks: Chunks, vectors: np.ndarray, rows: np.ndarray) -> Chunks:
+        """Append a chunk, merging the chunks after the first once there are too many."""
+        chunks = chunks + ((vectors, rows),)
+        if len(chunks) > MAX_LIST_CHUNKS:
+            chunks = (chunks[0], _concat(chunks[1:], self.dimension))
+        return chunks
+    
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        nprobe: Optional[int] = None,
+        row_mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximate top_k neighbours of each query.
+        
+        Queries are grouped by inverted list, so each probed list is scored
+        in place with one matrix product for all queries probing it; the
+        per-list top-k candidates are then merged per query.
+        
+        Args:
+            queries: L2-normalized query matrix (m x d)
+            top_k: Number of neighbours per query
+            nprobe: Lists to scan (default: the index setting)
+            row_mask: Optional boolean mask over rows; False rows are skipped
+        
+        Returns:
+            Tuple of (scores, rows), each m x top_k, best first; missing
+            neighbours have row -1 and score -inf
+        """
+        state = self._state
+        scores_out = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        rows_out = np.full((len(queries), top_k), -1, dtype=np.int64)
+        
+        if state.ntotal == 0 or top_k <= 0:
+            return scores_out, rows_out
+        
+        if row_mask is not None and len(row_mask) < state.ntotal:
+            # Rows added after the mask was built cannot match it
+            row_mask = np.concatenate([row_mask, np.zeros(state.ntotal - len(row_mask), dtype=bool)])
+        
+        if state.centroids is None:
+            # Exact search over the buffer until the quantizer is trained
+            work = [(np.arange(len(queries)), state.pending)]
+        else:
+            nprobe = max(1, min(nprobe or self.nprobe, len(state.centroids)))
+            probe = np.argpartition(-(queries @ state.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+            work = [
+                (positions // nprobe, state.lists[list_id])
+                for list_id, positions in _groups(probe.ravel())
+            ]
+        
+        candidate_scores = [[] for _ in range(len(queries))]
+        candidate_rows = [[] for _ in range(len(queries))]
+        
+        for query_ids, chunks in work:
+            group = queries[query_ids]
+            for vectors, rows in chunks:
+                if rows.size == 0:
+                    continue
+                
+                scores = group @ vectors.T
+                if row_mask is not None:
+                    keep = row_mask[rows]
+                    if not keep.any():
+                        continue
+                    scores[:, ~keep] = -np.inf
+                
+                if top_k < rows.size:
+                    best = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+                    scores = np.take_along_axis(scores, best, axis=1)
+                    best_rows = rows[best]
+                else:
+                    best_rows = np.broadcast_to(rows, scores.shape)
+                
+                for i, q in enumerate(query_ids):
+                    candidate_scores[q].append(scores[i])
+                    candidate_rows[q].append(best_rows[i])
+        
+        for q in range(len(queries)):
+            if not candidate_scores[q]:
+                continue
+            
+            scores = np.concatenate(candidate_scores[q])
+            rows = np.concatenate(candidate_rows[q])
+            found = scores > -np.inf
+            scores, rows = scores[found], rows[found]
+            
+            k = min(top_k, rows.size)
+            if k == 0:
+                continue
+            best = np.argpartition(-scores, k - 1)[:k] if k < rows.size else np.arange(rows.size)
+            best = best[np.argsort(-scores[best])]
+            
+            scores_out[q, :k] = scores[best]
+            rows_out[q, :k] = rows[best]
+        
+        return scores_out, rows_out
+    
+    def save(self, path: Path) -> None:
+        """
+        Save the index to a directory.
+        
+        Vectors added since the last save to the same directory are
+        appended to the log; the base files are rewritten only after
+        training, when saving elsewhere, or when the log has grown too big.
+        
+        Args:
+            path: Target directory (created if missing)
+        """
+        path.mkdir(parents=True, exist_ok=True)
+        
+        log_rows = self._log_rows + sum(len(v) for v in self._unsaved)
+        fold = self.is_trained and log_rows > max(LOG_MIN_ROWS, LOG_MAX_FRACTION * self._base_rows)
+        
+        if self._rewrite or fold or path != self._path:
+            self._write_base(path)
+        else:
+            self._append_log(path)
+    
+    def _write_base(self, path: Path) -> None:
+        """Write a new generation of base files holding every vector."""
+        state = self._state
+        generation = self._generation + 1
+        prefix = f"ivf_{generation:06d}"
+        files = {"log": f"{prefix}.log"}
+        
+        if state.centroids is not None:
+            files.update(
+                centroids=f"{prefix}_centroids.npy",
+                vectors=f"{prefix}_vectors.npy",
+                rows=f"{prefix}_rows.npy",
+                offsets=f"{prefix}_offsets.npy"
+            )
+            vectors = np.lib.format.open_memmap(
+                path / files["vectors"], mode="w+", dtype=np.float32, shape=(state.ntotal, self.dimension)
+            )
+            rows = np.empty(state.ntotal, dtype=np.int64)
+            offsets = np.zeros(len(state.lists) + 1, dtype=np.int64)
+            
+            start = 0
+            for list_id, chunks in enumerate(state.lists):
+                for list_vectors, list_rows in chunks:
+                    end = start + len(list_rows)
+                    vectors[start:end] = list_vectors
+                    rows[start:end] = list_rows
+                    start = end
+                offsets[list_id + 1] = start
+            vectors.flush()
+            del vectors
+            
+            np.save(path / files["centroids"], state.centroids)
+            np.save(path / files["rows"], rows)
+            np.save(path / files["offsets"], offsets)
+            base_rows, log_vectors = state.ntotal, []
+        else:
+            # An untrained index keeps everything in the log
+            base_rows, log_vectors = 0, [v for v, _ in state.pending]
+        
+        with open(path / files["log"], "wb") as f:
+            for vectors in log_vectors:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        
+        self._path, self._files, self._generation = path, files, generation
+        self._base_rows, self._log_rows = base_rows, state.ntotal - base_rows
+        self._unsaved, self._rewrite = [], False
+        self._write_params()
+        self._remove_unused_files()
+        
+        if state.centroids is not None:
+            # Serve the lists from the mapped files instead of memory
+            self._state = state._replace(lists=self._map_base(path, files))
+    
+    def _append_log(self, path: Path) -> None:
+        """Append the vectors added since the last save to the log."""
+        if not self._unsaved:
+            return
+        
+        with open(path / self._files["log"], "ab") as f:
+            for vectors in self._unsaved:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        
+        self._log_rows += sum(len(v) for v in self._unsaved)
+        self._unsaved = []
+        self._write_params()
+    
+    def _write_params(self) -> None:
+        """Atomically record the parameters and the current files."""
+        params = {
+            "dimension": self.dimension,
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "kmeans_iters": self.kmeans_iters,
+            "train_size": self.train_size,
+            "seed": self.seed,
+            "ntotal": self._base_rows + self._log_rows,
+            "base_rows": self._base_rows,
+            "generation": self._generation,
+            "files": self._files
+        }
+        params_tmp = self._path / (self.PARAMS + ".tmp")
+        params_tmp.write_text(json.dumps(params), encoding="utf-8")
+        os.replace(params_tmp, self._path / self.PARAMS)
+    
+    def _remove_unused_files(self) -> None:
+        """Delete files of earlier generations."""
+        used = set(self._files.values())
+        
+        # Files may still be mapped by readers (and cannot be removed on
+        # Windows while they are); try, and retry after the next rewrite
+        for file in self._path.glob("ivf_[0-9]*"):
+            if file.name not in used:
+                try:
+                    file.unlink()
+                except OSError:
+                    pass
+    
+    @staticmethod
+    def _map_base(path: Path, files: Dict[str, str]) -> Tuple[Chunks, ...]:
+        """Memory-map the base vectors and cut them into lists."""
+        vectors = np.load(path / files["vectors"], mmap_mode="r")
+        rows = np.load(path / files["rows"])
+        offsets = np.load(path / files["offsets"])
+        return tuple(
+            ((vectors[start:end], rows[start:end]),) if end > start else ()
+            for start, end in zip(offsets[:-1], offsets[1:])
+        )
+    
+    def _open_log(self, log_path: Path) -> np.ndarray:
+        """Memory-map the complete rows of the log, dropping a torn last row."""
+        row_bytes = 4 * self.dimension
+        size = log_path.stat().st_size if log_path.exists() else 0
+        count = size // row_bytes
+        
+        if size != count * row_bytes:
+            # A write was cut short; later appends must start on a row boundary
+            with open(log_path, "r+b") as f:
+                f.truncate(count * row_bytes)
+        
+        if count == 0:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.memmap(log_path, dtype=np.float32, mode="r", shape=(count, self.dimension))
+    
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        """
+        Load an index saved with save().
+        
+        Args:
+            path: Directory containing the index files
+        
+        Returns:
+            The loaded index
+        """
+        params = json.loads((path / cls.PARAMS).read_text(encoding="utf-8"))
+        index = cls(
+            params["dimension"],
+            nlist=params["nlist"],
+            nprobe=params["nprobe"],
+            kmeans_iters=params["kmeans_iters"],
+            train_size=params["train_size"],
+            seed=params["seed"]
+        )
+        
+        files = params["files"]
+        base_rows = params["base_rows"]
+        
+        centroids, lists = None, ()
+        if "centroids" in files:
+            centroids = np.load(path / files["centroids"])
+            lists = index._map_base(path, files)
+        
+        log_vectors = index._open_log(path / files["log"])
+        log_rows = np.arange(base_rows, base_rows + len(log_vectors), dtype=np.int64)
+        
+        pending = ()
+        if centroids is not None and len(log_rows):
+            lists = index._assign(lists, centroids, np.asarray(log_vectors), log_rows)
+        elif len(log_rows):
+            pending = ((log_vectors, log_rows),)
+        
+        index._state = _State(centroids, lists, pending, base_rows + len(log_rows))
+        index._path, index._files, index._generation = path, files, params["generation"]
+        index._base_rows, index._log_rows = base_rows, len(log_rows)
+        return index
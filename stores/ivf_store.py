@@ -0,0 +1,358 @@
+"""
+Self-hosted approximate-nearest-neighbour vector store (IVF) for large corpora.
+"""
+
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+from loguru import logger
+
+from config.settings import settings
+from embeddings.embedder import Embedder
+from stores.ivf_index import IVFIndex
+from stores.metadata_index import MetadataIndex
+
+
+class IVFStore:
+    """
+    Vector store backed by an in-process IVF index saved on local disk.
+    
+    Trades a little recall for sub-linear search: only ``nprobe`` of the
+    ``nlist`` inverted lists are scanned per query. Both are tunable, and
+    nprobe can be overridden per query.
+    
+    Inserts are serialized by a lock; queries search the index's published
+    state without taking it. Records are appended before their vectors, so
+    every row a query can find already has its record.
+    """
+    
+    RECORDS = "records.jsonl"
+    
+    def __init__(
+        self,
+        path: str = None,
+        embedder: Embedder = None,
+        nlist: int = None,
+        nprobe: int = None,
+        train_size: int = None,
+        autosave: bool = True
+    ):
+        """
+        Initialize the IVF store, loading a saved index if present.
+        
+        Args:
+            path: Directory holding the index files
+            embedder: Embedder instance for generating vectors
+            nlist: Number of inverted lists (build-time parameter)
+            nprobe: Lists scanned per query (search-time parameter)
+            train_size: Vectors buffered before the quantizer is trained
+            autosave: Save the index after every add_texts call
+        """
+        self.path = Path(path or settings.IVF_STORE_PATH)
+        self.embedder = embedder or Embedder()
+        self.nlist = nlist or settings.IVF_NLIST
+        self.nprobe = nprobe or settings.IVF_NPROBE
+        self.train_size = train_size
+        self.autosave = autosave
+        
+        self.index: Optional[IVFIndex] = None
+        self._records: List[Dict[str, Any]] = []
+        self._metadata_index: Optional[MetadataIndex] = None
+        self._lock = threading.Lock()
+        
+        if (self.path / "ivf_params.json").exists():
+            self.load()
+        
+        logger.info(f"Initialized IVFStore at {self.path} ({len(self._records)} vectors)")
+    
+    def create_index(self, dimension: int = None) -> None:
+        """
+        Create an empty IVF index if none is loaded.
+        
+        Args:
+            dimension: Dimension of the vectors
+        """
+        if self.index is not None:
+            return
+        
+        dimension = dimension or self.embedder.get_embedding_dimension()
+        self.index = IVFIndex(
+            dimension,
+            nlist=self.nlist,
+            nprobe=self.nprobe,
+            train_size=self.train_size
+        )
+        logger.info(f"Created IVF index (nlist={self.nlist}, nprobe={self.nprobe}, dimension={dimension})")
+    
+    def count(self) -> int:
+        """
+        Get the number of stored vectors.
+        
+        Returns:
+            Number of vectors in the index
+        """
+        return len(self._records)
+    
+    def add_texts(
+        self,
+        texts: List[str],
+        metadata: List[Dict[str, Any]] = None,
+        embeddings: Optional[List[List[float]]] = None,
+        ids: Optional[List[str]] = None,
+        store_text: bool = True
+    ) -> List[str]:
+        """
+        Insert texts into the index incrementally.
+        
+        Args:
+            texts: List of texts to add
+            metadata: Optional list of metadata dicts for each text
+            embeddings: Optional precomputed vectors (one per text); if omitted,
+                texts are embedded with the store's embedder
+            ids: Optional vector ids (generated if omitted)
+            store_text: Keep the text with the vector (False when a
+                DocStore holds it)
+        
+        Returns:
+            Ids of the added vectors (empty texts are skipped)
+        """
+        if embeddings is not None and len(embeddings) != len(texts):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(texts)} texts")
+        
+        # embed_batch() drops empty texts; drop them here together with
+        # their metadata, ids and vectors so that everything stays aligned
+        keep = [i for i, text in enumerate(texts) if text and text.strip()]
+        if len(keep) < len(texts):
+            logger.warning(f"Skipping {len(texts) - len(keep)} empty texts")
+            texts = [texts[i] for i in keep]
+            if metadata:
+                metadata = [metadata[i] if i < len(metadata) else {} for i in keep]
+            if ids:
+                ids = [ids[i] for i in keep]
+            if embeddings is not None:
+                embeddings = [embeddings[i] for i in keep]
+        
+        if not texts:
+            logger.warning("No texts provided to add")
+            return []
+        
+        try:
+            if embeddings is None:
+                logger.info(f"Generating embeddings for {len(texts)} texts")
+                embeddings = self.embedder.embed_batch(texts)
+                if len(embeddings) != len(texts):
+                    raise ValueError(f"Embedder returned {len(embeddings)} vectors for {len(texts)} texts")
+            
+            vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+            self.create_index(vectors.shape[1])
+            
+            ids = ids or [uuid.uuid4().hex for _ in texts]
+            records = [
+                {
+                    "id": vector_id,
+                    "text": text if store_text else "",
+                    "metadata": dict(metadata[i]) if metadata and i < len(metadata) else {}
+                }
+                for i, (vector_id, text) in enumerate(zip(ids, texts))
+            ]
+            
+            with self._lock:
+                self._records.extend(records)
+                self._metadata_index = None
+                try:
+                    self.index.add(vectors)
+                except Exception:
+                    del self._records[len(self._records) - len(records):]
+                    raise
+                
+                if self.autosave:
+                    self.save(new_records=records)
+            
+            logger.info(f"Successfully added {len(texts)} texts to IVFStore")
+            return ids
+        
+        except Exception as e:
+            logger.error(f"Error adding texts to IVFStore: {e}")
+            raise
+    
+    def query(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Query the IVF index.
+        
+        Args:
+            query_text: The query text
+            top_k: Number of results to return
+            filter_dict: Optional metadata filter
+            query_embedding: Optional precomputed query vector
+            nprobe: Lists to scan for this query (default: store setting)
+        
+        Returns:
+            List of matching documents with scores
+        """
+        if query_embedding is None:
+            query_embedding = self.embedder.embed_text(query_text)
+        
+        return self.query_batch([query_embedding], top_k, filter_dict, nprobe)[0]
+    
+    def query_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        nprobe: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Query the IVF index with several vectors.
+        
+        Args:
+            query_embeddings: Query vectors
+            top_k: Number of results per query
+            filter_dict: Optional metadata filter
+            nprobe: Lists to scan (default: store setting)
+        
+        Returns:
+            One list of matching documents per query vector
+        """
+        if self.index is None or not self._records or not query_embeddings:
+            return [[] for _ in query_embeddings]
+        
+        try:
+            queries = self._normalize(np.asarray(query_embeddings, dtype=np.float32))
+            index, records = self.index, self._records
+            
+            row_mask = None
+            if filter_dict:
+                row_mask = self._get_metadata_index().mask(filter_dict)
+            scores, rows = index.search(queries, top_k, nprobe, row_mask)
+            
+            results = []
+            for q in range(len(queries)):
+                matches = []
+                for score, row in zip(scores[q], rows[q]):
+                    if row < 0:
+                        break
+                    record = records[int(row)]
+                    matches.append({
+                        "id": record["id"],
+                        "score": float(score),
+                        "text": record["text"],
+                        "metadata": record["metadata"]
+                    })
+                results.append(matches)
+            
+            return results
+        
+        except Exception as e:
+            logger.error(f"Error querying IVFStore: {e}")
+            raise
+    
+    def _get_metadata_index(self) -> MetadataIndex:
+        """Get the metadata index of the current records, building it if needed."""
+        metadata_index = self._metadata_index
+        if metadata_index is None:
+            with self._lock:
+                if self._metadata_index is None:
+                    self._metadata_index = MetadataIndex(self._records)
+                metadata_index = self._metadata_index
+        return metadata_index
+    
+    def save(self, new_records: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Save the records and the index to disk.
+        
+        Records go first: load() drops records beyond the saved vectors,
+        so an interrupted save never leaves vectors without records.
+        
+        Args:
+            new_records: Records appended since the last save; if omitted
+                the whole records file is rewritten
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        
+        records_path = self.path / self.RECORDS
+        if new_records is not None and records_path.exists():
+            with open(records_path, "a", encoding="utf-8") as f:
+                for record in new_records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            self._write_records(self._records)
+        
+        self.index.save(self.path)
+        logger.debug(f"Saved IVF index to {self.path}")
+    
+    def load(self) -> None:
+        """
+        Load the index and records from disk.
+        
+        Records past the saved vectors (left by an interrupted save) and a
+        torn last line are dropped from the records file as well, so that
+        later appends stay aligned with the index rows.
+        """
+        self.index = IVFIndex.load(self.path)
+        self.index.nprobe = self.nprobe
+        ntotal = self.index.ntotal
+        
+        with open(self.path / self.RECORDS, "r", encoding="utf-8") as f:
+            lines = f.read().split("\n")
+        
+        # A complete file ends with a newline, leaving an empty last item
+        tail = lines.pop()
+        records = [json.loads(line) for line in lines]
+        if tail:
+            try:
+                records.append(json.loads(tail))
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring truncated last record in {self.RECORDS}")
+        
+        if len(records) < ntotal:
+            raise ValueError(f"{self.RECORDS} has {len(records)} records for {ntotal} vectors")
+        
+        self._records = records[:ntotal]
+        self._metadata_index = None
+        
+        if tail or len(records) > ntotal:
+            logger.warning(f"Truncating {self.RECORDS} to the {ntotal} saved vectors")
+            self._write_records(self._records)
+    
+    def _write_records(self, records: List[Dict[str, Any]]) -> None:
+        """Atomically replace the records file."""
+        records_tmp = self.path / (self.RECORDS + ".tmp")
+        with open(records_tmp, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(records_tmp, self.path / self.RECORDS)
+    
+    def delete_index(self) -> None:
+        """Delete the index files."""
+        with self._lock:
+            self.index = None
+            self._records = []
+            self._metadata_index = None
+            
+            if self.path.exists():
+                for file in self.path.iterdir():
+                    if file.is_file():
+                        file.unlink()
+                self.path.rmdir()
+        
+        logger.info(f"Deleted IVF index at {self.path}")
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype(np.float32, copy=False)
@@ -0,0 +1,1103 @@
+"""
+In-process vector store backed by NumPy and memory-mapped files.
+"""
+
+import json
+import math
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple
+
+import numpy as np
+from loguru import logger
+
+from config.settings import settings
+from embeddings.embedder import Embedder
+from stores.quantization import make_quantizer, load_quantizer
+from stores.projection import Projection
+from stores.segment import Segment, WriteAheadLog
+from stores.shard_search import search_shard, search_vectors
+
+# Vectors used to fit a quantizer, and rows encoded per block on load
+QUANTIZER_SAMPLE = 100_000
+
+# Live vectors needed before a quantizer is fitted (smaller indexes are
+# searched exactly), and the growth of the index that triggers a refit
+QUANTIZER_MIN_SAMPLE = 1_000
+QUANTIZER_REFIT_GROWTH = 4
+
+# Segments with more than this fraction of deleted rows are rewritten
+COMPACT_DELETED_FRACTION = 0.2
+
+# Small segments are merged in size tiers: a tier holds segments within a
+# factor of COMPACT_TIER_FACTOR of each other and is merged once it has
+# COMPACT_MIN_SEGMENTS of them, at most COMPACT_MAX_SEGMENTS per pass, so
+# a row is rewritten about log(compact_rows / flush size) times in all
+COMPACT_TIER_FACTOR = 4
+COMPACT_MIN_SEGMENTS = 4
+COMPACT_MAX_SEGMENTS = 8
+
+
+class _View(NamedTuple):
+    """What a query needs, published as one object so it is never torn."""
+    segments: Tuple[Segment, ...]
+    projection: Optional[Projection]
+    quantizer: Any
+
+
+class LocalStore:
+    """
+    Vector store kept on local disk and searched in-process.
+    
+    Vectors are L2-normalized float32 rows, so cosine similarity is a single
+    BLAS matrix product followed by an ``argpartition`` top-k.
+    
+    The index is a set of immutable segments. Inserts are appended to a
+    write-ahead log and kept in small in-memory segments; a background
+    thread flushes them into a memory-mapped disk segment (every
+    ``flush_interval`` seconds or ``flush_rows`` rows) and compacts small or
+    heavily deleted segments. Deletes are tombstones. Queries search a
+    snapshot of the segment list and merge the per-segment top-k, so they
+    never wait for ingestion or compaction.
+    
+    Once the disk segments hold at least ``LOCAL_PARALLEL_MIN_ROWS`` rows,
+    they are cut into ``search_workers`` row-range shards that a process
+    pool searches in parallel; the workers map the same segment files, so
+    the page cache is shared and only queries and top-k lists are copied.
+    
+    With ``quantization`` set, compact int8 or binary codes are held in
+    memory and searched first; the best ``top_k * rescore_factor``
+    candidates are then rescored against the full-precision vectors, which
+    stay on disk and are only paged in for those rows. The quantizer is
+    fitted once the index holds ``QUANTIZER_MIN_SAMPLE`` vectors (smaller
+    indexes are searched exactly) and refitted as the index grows.
+    
+    fit_projection() shrinks the index with a PCA (or random) projection
+    fitted on the stored vectors; it is saved next to the index, versioned
+    in the manifest and applied to every later insert and query.
+    """
+    
+    MANIFEST = "manifest.json"
+    QUANTIZER = "quantizer.npz"
+    PROJECTION = "projection.npz"
+    
+    def __init__(
+        self,
+        path: str = None,
+        embedder: Embedder = None,
+        quantization: Optional[str] = None,
+        rescore_factor: int = None,
+        flush_rows: int = None,
+        flush_interval: float = None,
+        compact_rows: int = None,
+        background: bool = True,
+        search_workers: int = None
+    ):
+        """
+        Initialize the local store.
+        
+        Args:
+            path: Directory holding the index files
+            embedder: Embedder instance for generating vectors
+            quantization: "int8", "binary" or "none" (default: settings)
+            rescore_factor: Candidates rescored per requested result; higher
+                values trade speed for recall (default: settings)
+            flush_rows: In-memory rows that trigger a flush (default: settings)
+            flush_interval: Seconds between periodic flushes (default: settings)
+            compact_rows: Disk segments smaller than this are merged by
+                tiered compaction (default: settings)
+            background: Run flushes and compaction in a background thread;
+                if False, call flush() and compact() yourself
+            search_workers: Processes for parallel shard search; 1 disables
+                it (default: settings, or the number of CPUs)
+        """
+        self.path = Path(path or settings.LOCAL_STORE_PATH)
+        self.embedder = embedder or Embedder()
+        self.quantization = quantization or settings.LOCAL_QUANTIZATION
+        self.rescore_factor = rescore_factor or settings.LOCAL_RESCORE_FACTOR
+        self.flush_rows = flush_rows or settings.LOCAL_FLUSH_ROWS
+        self.flush_interval = flush_interval or settings.LOCAL_FLUSH_INTERVAL
+        self.compact_rows = compact_rows or settings.LOCAL_COMPACT_ROWS
+        self.background = background
+        self.search_workers = search_workers or settings.LOCAL_SEARCH_WORKERS or os.cpu_count() or 1
+        
+        self.dimension: Optional[int] = None
+        self._view = _View((), None, make_quantizer(self.quantization))
+        self._wal: Optional[WriteAheadLog] = None
+        self._wal_seq = 0
+        self._next_segment = 0
+        self._quantizer_rows = 0
+        self._last_flush = time.monotonic()
+        
+        # _lock guards the segment list and the log and is only held for
+        # short swaps; _maintenance_lock serializes flushes and compactions
+        self._lock = threading.Lock()
+        self._maintenance_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        
+        if (self.path / self.MANIFEST).exists():
+            self._load()
+        
+        logger.info(f"Initialized LocalStore at {self.path} ({self.count()} vectors)")
+    
+    @property
+    def _segments(self) -> Tuple[Segment, ...]:
+        return self._view.segments
+    
+    @property
+    def _projection(self) -> Optional[Projection]:
+        return self._view.projection
+    
+    @property
+    def _quantizer(self):
+        return self._view.quantizer
+    
+    def _publish(self, **changes) -> None:
+        """Replace parts of the query view in one assignment (caller holds _lock)."""
+        self._view = self._view._replace(**changes)
+    
+    def create_index(self, dimension: int = None) -> None:
+        """
+        Create the index directory if it does not exist yet.
+        
+        Args:
+            dimension: Dimension of the vectors
+        """
+        if self.dimension is not None:
+            return
+        
+        self.dimension = dimension or self.embedder.get_embedding_dimension()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._wal = WriteAheadLog(self.path, sync=settings.LOCAL_WAL_FSYNC)
+        self._wal_seq = self._wal.seq
+        self._write_manifest()
+        self._start_worker()
+        logger.info(f"Created local index at {self.path} with dimension {self.dimension}")
+    
+    def count(self) -> int:
+        """
+        Get the number of stored vectors.
+        
+        Returns:
+            Number of live (not deleted) vectors in the index
+        """
+        return sum(segment.live_count for segment in self._segments)
+    
+    def add_texts(
+        self,
+        texts: List[str],
+        metadata: List[Dict[str, Any]] = None,
+        embeddings: Optional[List[List[float]]] = None,
+        ids: Optional[List[str]] = None,
+        store_text: bool = True
+    ) -> List[str]:
+        """
+        Add texts to the local index.
+        
+        The batch is logged and becomes searchable immediately; it is
+        written to a disk segment by the next flush. Existing ids are
+        replaced.
+        
+        Args:
+            texts: List of texts to add
+            metadata: Optional list of metadata dicts for each text
+            embeddings: Optional precomputed vectors (one per text); if omitted,
+                texts are embedded with the store's embedder
+            ids: Optional vector ids (generated if omitted)
+            store_text: Keep the text with the vector (False when a
+                DocStore holds it)
+        
+        Returns:
+            Ids of the added vectors (empty texts are skipped)
+        """
+        if embeddings is not None and len(embeddings) != len(texts):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(texts)} texts")
+        
+        # embed_batch() drops empty texts; drop them here together with
+        # their metadata, ids and vectors so that everything stays aligned
+        keep = [i for i, text in enumerate(texts) if text and text.strip()]
+        if len(keep) < len(texts):
+            logger.warning(f"Skipping {len(texts) - len(keep)} empty texts")
+            texts = [texts[i] for i in keep]
+            if metadata:
+                metadata = [metadata[i] if i < len(metadata) else {} for i in keep]
+            if ids:
+                ids = [ids[i] for i in keep]
+            if embeddings is not None:
+                embeddings = [embeddings[i] for i in keep]
+        
+        if not texts:
+            logger.warning("No texts provided to add")
+            return []
+        
+        try:
+            if embeddings is None:
+                logger.info(f"Generating embeddings for {len(texts)} texts")
+                embeddings = self.embedder.embed_batch(texts)
+                if len(embeddings) != len(texts):
+                    raise ValueError(f"Embedder returned {len(embeddings)} vectors for {len(texts)} texts")
+            
+            new_vectors = self._prepare(embeddings)
+            self.create_index(new_vectors.shape[1])
+            
+            if new_vectors.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Vector dimension {new_vectors.shape[1]} does not match "
+                    f"index dimension {self.dimension}"
+                )
+            
+            ids = ids or [uuid.uuid4().hex for _ in texts]
+            records = [
+                {
+                    "id": vector_id,
+                    "text": text if store_text else "",
+                    "metadata": dict(metadata[i]) if metadata and i < len(metadata) else {}
+                }
+                for i, (vector_id, text) in enumerate(zip(ids, texts))
+            ]
+            
+            with self._lock:
+                self._wal.append_add(records, new_vectors)
+                self._apply_add(records, new_vectors)
+                pending = self._memory_rows()
+            
+            if pending >= self.flush_rows:
+                if self.background:
+                    self._wakeup.set()
+                else:
+                    self.flush()
+            
+            logger.info(f"Successfully added {len(texts)} texts to LocalStore")
+            return ids
+        
+        except Exception as e:
+            logger.error(f"Error adding texts to LocalStore: {e}")
+            raise
+    
+    def delete(self, ids: List[str]) -> int:
+        """
+        Delete vectors by id (tombstones; space is reclaimed by compaction).
+        
+        Args:
+            ids: Vector ids to delete
+        
+        Returns:
+            Number of vectors deleted
+        """
+        if not ids or self._wal is None:
+            return 0
+        
+        with self._lock:
+            self._wal.append_delete(ids)
+            deleted = self._apply_delete(ids)
+        
+        logger.info(f"Deleted {deleted} vectors from LocalStore")
+        return deleted
+    
+    def query(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Query the local index.
+        
+        Args:
+            query_text: The query text
+            top_k: Number of results to return
+            filter_dict: Optional metadata filter
+            query_embedding: Optional precomputed query vector
+        
+        Returns:
+            List of matching documents with scores
+        """
+        if query_embedding is None:
+            query_embedding = self.embedder.embed_text(query_text)
+        
+        return self.query_batch([query_embedding], top_k, filter_dict)[0]
+    
+    def query_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Query the local index with several vectors in one matrix product.
+        
+        Args:
+            query_embeddings: Query vectors
+            top_k: Number of results per query
+            filter_dict: Optional metadata filter
+        
+        Returns:
+            One list of matching documents per query vector
+        """
+        # The view, its tuple and the segments in it are never mutated; the
+        # projection and quantizer always belong to these segments
+        view = self._view
+        segments = view.segments
+        
+        if not segments or not query_embeddings:
+            return [[] for _ in query_embeddings]
+        
+        try:
+            queries = self._prepare(query_embeddings, view.projection)
+            
+            parallel = self._parallel_segments(segments)
+            hits = self._search_parallel(parallel, queries, top_k, filter_dict) if parallel else []
+            
+            for segment in segments:
+                if any(segment is s for s in parallel):
+                    continue
+                found = self._search_segment(segment, queries, top_k, filter_dict, view.quantizer)
+                if found is not None:
+                    hits.append((segment, *found))
+            
+            if not hits:
+                return [[] for _ in query_embeddings]
+            
+            # Merge the per-segment top-k lists
+            all_scores = np.concatenate([scores for _, scores, _ in hits], axis=1)
+            all_rows = np.concatenate([rows for _, _, rows in hits], axis=1)
+            owners = np.concatenate([
+                np.full(rows.shape, i, dtype=np.int64) for i, (_, _, rows) in enumerate(hits)
+            ], axis=1)
+            top = self._top_k(all_scores, top_k)
+            
+            results = []
+            for q in range(len(queries)):
+                matches = []
+                for column in top[q]:
+                    segment = hits[owners[q, column]][0]
+                    record = segment.records[int(all_rows[q, column])]
+                    matches.append({
+                        "id": record["id"],
+                        "score": float(all_scores[q, column]),
+                        "text": record["text"],
+                        "metadata": record["metadata"]
+                    })
+                results.append(matches)
+            
+            logger.debug(f"Answered {len(results)} queries from LocalStore ({len(segments)} segments)")
+            return results
+        
+        except Exception as e:
+            logger.error(f"Error querying LocalStore: {e}")
+            raise
+    
+    def flush(self) -> None:
+        """Write the in-memory segments to a disk segment."""
+        with self._maintenance_lock:
+            with self._lock:
+                memory = [s for s in self._segments if not s.persisted]
+                self._last_flush = time.monotonic()
+                if not memory:
+                    return
+                
+                # New inserts go to a fresh log file while this one is persisted
+                wal_seq = self._wal.rotate()
+                name = self._new_segment_name()
+            
+            records = [record for segment in memory for record in segment.records]
+            segment = Segment.write(self.path, name, [s.vectors for s in memory], records)
+            segment.codes = self._merge_codes(segment, memory, [None] * len(memory))
+            
+            with self._lock:
+                self._replace_segments(memory, segment, [None] * len(memory))
+                self._wal_seq = wal_seq
+                self._refit_quantizer()
+                self._write_manifest()
+                self._wal.remove_before(wal_seq)
+            
+            self._remove_unused_files()
+        
+        logger.info(f"Flushed {len(records)} vectors to segment {name}")
+    
+    def compact(self) -> bool:
+        """
+        Run one bounded compaction pass (see _compaction_victims()).
+        
+        Returns:
+            True if any segments were compacted
+        """
+        with self._maintenance_lock:
+            with self._lock:
+                victims = self._compaction_victims([s for s in self._segments if s.persisted])
+                if not victims:
+                    return False
+                name = self._new_segment_name()
+            
+            # Copy the rows that are live now; rows deleted meanwhile are
+            # tombstoned again at the swap
+            kept = [np.flatnonzero(~s.deleted) for s in victims]
+            records = [s.records[row] for s, rows in zip(victims, kept) for row in rows]
+            
+            segment = None
+            if records:
+                segment = Segment.write(
+                    self.path,
+                    name,
+                    [np.asarray(s.vectors[rows]) for s, rows in zip(victims, kept) if rows.size],
+                    records
+                )
+                segment.codes = self._merge_codes(segment, victims, kept)
+            
+            with self._lock:
+                self._replace_segments(victims, segment, kept)
+                self._refit_quantizer()
+                self._write_manifest()
+            
+            self._remove_unused_files()
+        
+        logger.info(f"Compacted {len(victims)} segments ({len(records)} live vectors kept)")
+        return True
+    
+    def close(self) -> None:
+        """Stop the background thread and search processes, flush and close the log."""
+        self._stop_worker()
+        self._stop_pool()
+        
+        if self._wal is not None:
+            self.flush()
+            self._wal.close()
+            self._wal = None
+    
+    def fit_projection(
+        self,
+        method: str = "pca",
+        n_components: Optional[int] = None,
+        target_variance: Optional[float] = None,
+        sample_size: int = 10_000
+    ) -> Projection:
+        """
+        Fit a projection on the stored vectors and rebuild the index with it.
+        
+        The original vectors are replaced by their projections, so this can
+        only be done once per index; re-fitting requires re-ingesting.
+        
+        Args:
+            method: "pca" or "random"
+            n_components: Output dimension (default: settings; 0 means choose
+                by target_variance)
+            target_variance: Variance to keep when choosing the dimension
+                (default: settings)
+            sample_size: Number of stored vectors to fit on
+        
+        Returns:
+            The fitted projection
+        """
+        if n_components is None:
+            n_components = settings.LOCAL_PROJECTION_DIM
+        n_components = n_components or None
+        target_variance = target_variance or settings.LOCAL_PROJECTION_VARIANCE
+        
+        # Writers are blocked for the whole rebuild
+        with self._maintenance_lock, self._lock:
+            if self._projection is not None:
+                raise ValueError(
+                    f"Index is already projected (version {self._projection.version}); "
+                    "re-ingest the documents to fit a new projection"
+                )
+            
+            live = [(s, np.flatnonzero(~s.deleted)) for s in self._segments]
+            if not sum(rows.size for _, rows in live):
+                raise ValueError("Cannot fit a projection on an empty index")
+            
+            sample = self._sample(live, sample_size)
+            
+            if method == "pca":
+                projection = Projection.fit_pca(sample, n_components, target_variance)
+            elif method == "random":
+                projection = Projection.fit_random(self.dimension, n_components or 256)
+            else:
+                raise ValueError(f"Unknown projection method: {method}")
+            
+            chunks = [
+                self._normalize(projection.transform(np.asarray(s.vectors[rows[start:start + QUANTIZER_SAMPLE]])))
+                for s, rows in live
+                for start in range(0, rows.size, QUANTIZER_SAMPLE)
+            ]
+            records = [s.records[row] for s, rows in live for row in rows]
+            
+            # Rebuild from scratch in the projected space; everything in the
+            # log is part of the new segment
+            projection.save(self.path / self.PROJECTION)
+            (self.path / self.QUANTIZER).unlink(missing_ok=True)
+            segment = Segment.write(self.path, self._new_segment_name(), chunks, records)
+            
+            # Queries switch to the projection and its segments at once; the
+            # quantizer is refitted in the projected space
+            self._publish(segments=(segment,), projection=projection, quantizer=make_quantizer(self.quantization))
+            self._quantizer_rows = 0
+            self._refit_quantizer()
+            self.dimension = projection.dimension
+            self._wal_seq = self._wal.rotate()
+            self._write_manifest()
+            self._wal.remove_before(self._wal_seq)
+        
+        self._remove_unused_files()
+        logger.info(
+            f"Rebuilt LocalStore with {projection.method} projection {projection.version} "
+            f"({projection.source_dimension} -> {projection.dimension} dims)"
+        )
+        return projection
+    
+    def delete_index(self) -> None:
+        """Delete the local index files."""
+        self._stop_worker()
+        self._stop_pool()
+        
+        with self._maintenance_lock, self._lock:
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+            
+            self._view = _View((), None, make_quantizer(self.quantization))
+            self.dimension = None
+            self._next_segment = 0
+            
+            if self.path.exists():
+                for file in self.path.iterdir():
+                    if file.is_file():
+                        file.unlink()
+                self.path.rmdir()
+        
+        logger.info(f"Deleted local index at {self.path}")
+    
+    def _search_segment(
+        self,
+        segment: Segment,
+        queries: np.ndarray,
+        top_k: int,
+        filter_dict: Optional[Dict[str, Any]],
+        quantizer: Any = None
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Top-k search of one segment.
+        
+        Args:
+            segment: Segment to search
+            queries: Normalized query matrix (m x d)
+            top_k: Number of results per query
+            filter_dict: Optional metadata filter
+            quantizer: Quantizer of the segment codes (default: current)
+        
+        Returns:
+            Tuple of (scores, rows), or None if no row qualifies
+        """
+        rows = self._segment_rows(segment, filter_dict)
+        if len(segment) == 0 or (rows is not None and rows.size == 0):
+            return None
+        
+        if segment.codes is not None:
+            return self._search_quantized(queries, segment.vectors, segment.codes, rows, top_k, quantizer)
+        
+        scores = queries @ (segment.vectors[rows] if rows is not None else segment.vectors).T
+        top = self._top_k(scores, top_k)
+        return np.take_along_axis(scores, top, axis=1), (rows[top] if rows is not None else top)
+    
+    def _segment_rows(self, segment: Segment, filter_dict: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        Rows of a segment that are live and match the filter.
+        
+        Args:
+            segment: Segment to search
+            filter_dict: Optional metadata filter
+        
+        Returns:
+            Row indices, or None if every row qualifies
+        """
+        if not filter_dict:
+            return segment.live_rows()
+        
+        # The filter resolves against the segment's metadata columns, so a
+        # selective filter only touches its matching rows
+        rows = segment.metadata_index.rows(filter_dict)
+        if segment.deleted.any():
+            rows = rows[~segment.deleted[rows]]
+        return rows
+    
+    def _parallel_segments(self, segments: Tuple[Segment, ...]) -> List[Segment]:
+        """Disk segments worth searching in worker processes (may be empty)."""
+        if self.search_workers <= 1:
+            return []
+        
+        # Quantized segments are searched in-process: their codes live here
+        disk = [s for s in segments if s.persisted and s.codes is None and len(s)]
+        if sum(len(s) for s in disk) < settings.LOCAL_PARALLEL_MIN_ROWS:
+            return []
+        return disk
+    
+    def _search_parallel(
+        self,
+        segments: List[Segment],
+        queries: np.ndarray,
+        top_k: int,
+        filter_dict: Optional[Dict[str, Any]]
+    ) -> List[Tuple[Segment, np.ndarray, np.ndarray]]:
+        """
+        Scatter shards of disk segments to the process pool and gather them.
+        
+        Args:
+            segments: Disk segments to search
+            queries: Normalized query matrix (m x d)
+            top_k: Number of results per query
+            filter_dict: Optional metadata filter
+        
+        Returns:
+            (segment, scores, rows) for every searched shard
+        """
+        total = sum(len(s) for s in segments)
+        shard_rows = -(-total // self.search_workers)
+        pool = self._get_pool()
+        
+        tasks = []
+        for segment in segments:
+            rows = self._segment_rows(segment, filter_dict)
+            
+            if rows is None:
+                for start in range(0, len(segment), shard_rows):
+                    stop = min(start + shard_rows, len(segment))
+                    tasks.append((segment, (start, stop, None)))
+            else:
+                for start in range(0, rows.size, shard_rows):
+                    tasks.append((segment, (0, 0, rows[start:start + shard_rows])))
+        
+        futures = [
+            pool.submit(search_shard, str(self.path / segment.files["vectors"]), queries, top_k, *shard)
+            for segment, shard in tasks
+        ]
+        
+        hits = []
+        for (segment, shard), future in zip(tasks, futures):
+            try:
+                scores, rows = future.result()
+            except FileNotFoundError:
+                # Compaction removed the file after this snapshot was taken;
+                # the mapping held here is still valid
+                scores, rows = search_vectors(segment.vectors, queries, top_k, *shard)
+            hits.append((segment, scores, rows))
+        return hits
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Get the shard search process pool, creating it on first use."""
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs threads is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.search_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                logger.info(f"Started {self.search_workers} LocalStore search processes")
+            return self._pool
+    
+    def _stop_pool(self) -> None:
+        """Shut down the shard search processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+    
+    def _apply_add(self, records: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        """Replace existing ids and append a memory segment (caller holds _lock)."""
+        self._apply_delete([record["id"] for record in records])
+        segment = Segment(vectors, records, codes=self._encode(vectors))
+        self._publish(segments=self._segments + (segment,))
+    
+    def _apply_delete(self, ids: List[str]) -> int:
+        """Tombstone ids in every segment (caller holds _lock)."""
+        deleted = 0
+        segments = []
+        for segment in self._segments:
+            rows = [row for row in map(segment.row_of, ids) if row is not None and not segment.deleted[row]]
+            if rows:
+                segment = segment.with_deleted(rows)
+                deleted += len(rows)
+            segments.append(segment)
+        self._publish(segments=tuple(segments))
+        return deleted
+    
+    def _compaction_victims(self, disk: List[Segment]) -> List[Segment]:
+        """
+        Pick the segments rewritten by one compaction pass.
+        
+        The segment with the most tombstones is rewritten alone once more
+        than COMPACT_DELETED_FRACTION of it is deleted. Otherwise the
+        smallest size tier of segments below compact_rows that holds
+        COMPACT_MIN_SEGMENTS segments is merged, its smallest
+        COMPACT_MAX_SEGMENTS at most, so a pass never rewrites more than a
+        bounded set of similar-sized segments.
+        
+        Args:
+            disk: Disk segments
+        
+        Returns:
+            Segments to merge (empty if there is nothing to do)
+        """
+        deleted = [s for s in disk if s.deleted_count > COMPACT_DELETED_FRACTION * len(s)]
+        if deleted:
+            return [max(deleted, key=lambda s: s.deleted_count)]
+        
+        tiers: Dict[int, List[Segment]] = {}
+        for segment in disk:
+            if segment.live_count < self.compact_rows:
+                tier = int(math.log(max(segment.live_count, 1), COMPACT_TIER_FACTOR))
+                tiers.setdefault(tier, []).append(segment)
+        
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= COMPACT_MIN_SEGMENTS:
+                return sorted(tiers[tier], key=lambda s: s.live_count)[:COMPACT_MAX_SEGMENTS]
+        return []
+    
+    def _replace_segments(
+        self,
+        old: List[Segment],
+        new: Optional[Segment],
+        kept: List[Optional[np.ndarray]]
+    ) -> None:
+        """
+        Swap merged segments for their replacement (caller holds _lock).
+        
+        Deletes that hit the old segments while the replacement was being
+        written are carried over to it.
+        
+        Args:
+            old: Segments that were merged
+            new: The merged segment (None if nothing survived)
+            kept: Rows of each old segment copied into the new one (None = all)
+        """
+        current = {s.uid: s for s in self._segments}
+        if new is not None:
+            masks = [
+                current[s.uid].deleted if rows is None else current[s.uid].deleted[rows]
+                for s, rows in zip(old, kept)
+            ]
+            new = new.with_mask(np.concatenate(masks))
+        
+        old_uids = {s.uid for s in old}
+        segments = []
+        for segment in self._segments:
+            if segment.uid in old_uids:
+                if new is not None:
+                    segments.append(new)
+                    new = None
+            else:
+                segments.append(segment)
+        self._publish(segments=tuple(segments))
+    
+    def _memory_rows(self) -> int:
+        return sum(len(s) for s in self._segments if not s.persisted)
+    
+    def _new_segment_name(self) -> str:
+        name = f"seg_{self._next_segment:06d}"
+        self._next_segment += 1
+        return name
+    
+    def _encode(self, vectors: np.ndarray, quantizer: Any = None) -> Optional[np.ndarray]:
+        """Quantize vectors block by block (None until the quantizer is fitted)."""
+        quantizer = quantizer or self._quantizer
+        if quantizer is None or not quantizer.is_fitted:
+            return None
+        
+        if not len(vectors):
+            return quantizer.encode(np.asarray(vectors))
+        return np.concatenate([
+            quantizer.encode(np.asarray(vectors[start:start + QUANTIZER_SAMPLE]))
+            for start in range(0, len(vectors), QUANTIZER_SAMPLE)
+        ])
+    
+    def _merge_codes(
+        self,
+        segment: Segment,
+        sources: List[Segment],
+        kept: List[Optional[np.ndarray]]
+    ) -> Optional[np.ndarray]:
+        """
+        Codes of a segment written from the rows of other segments.
+        
+        Args:
+            segment: The new segment
+            sources: Segments its rows were copied from
+            kept: Rows copied from each source (None = all)
+        
+        Returns:
+            The sources' codes when all of them have codes, else a fresh
+            encoding (None without a fitted quantizer)
+        """
+        if any(s.codes is None for s in sources):
+            return self._encode(segment.vectors)
+        return np.concatenate([s.codes if rows is None else s.codes[rows] for s, rows in zip(sources, kept)])
+    
+    def _refit_quantizer(self) -> bool:
+        """
+        Fit the quantizer once the index is large enough, and refit it as it grows.
+        
+        Codes clip everything outside the range the quantizer was fitted
+        on, and rescoring cannot recover rows the codes never shortlisted,
+        so a quantizer fitted on the first few inserts is useless. Segments
+        carry no codes (and are searched exactly) until QUANTIZER_MIN_SAMPLE
+        live vectors exist; the quantizer is then fitted on a sample of the
+        whole index and refitted, re-encoding every segment, each time the
+        index has grown QUANTIZER_REFIT_GROWTH-fold since, up to
+        QUANTIZER_SAMPLE vectors.
+        
+        The caller holds _maintenance_lock and _lock: writers wait for the
+        re-encode, queries keep searching the previous view.
+        
+        Returns:
+            True if the quantizer was (re)fitted
+        """
+        if self._quantizer is None:
+            return False
+        
+        live = [(s, np.flatnonzero(~s.deleted)) for s in self._segments]
+        total = sum(rows.size for _, rows in live)
+        if self._quantizer.is_fitted:
+            if self._quantizer_rows >= QUANTIZER_SAMPLE or total < QUANTIZER_REFIT_GROWTH * self._quantizer_rows:
+                return False
+        elif total < QUANTIZER_MIN_SAMPLE:
+            return False
+        
+        quantizer = make_quantizer(self.quantization).fit(self._sample(live, QUANTIZER_SAMPLE))
+        segments = tuple(s.with_codes(self._encode(s.vectors, quantizer)) for s in self._segments)
+        
+        quantizer_tmp = self.path / ("tmp_" + self.QUANTIZER)
+        quantizer.save(quantizer_tmp)
+        os.replace(quantizer_tmp, self.path / self.QUANTIZER)
+        
+        self._quantizer_rows = min(total, QUANTIZER_SAMPLE)
+        self._publish(segments=segments, quantizer=quantizer)
+        logger.info(f"Fitted {self.quantization} quantizer on {self._quantizer_rows} of {total} vectors")
+        return True
+    
+    @staticmethod
+    def _sample(live: List[Tuple[Segment, np.ndarray]], size: int) -> np.ndarray:
+        """
+        Uniform random sample of live vectors.
+        
+        Args:
+            live: (segment, live rows) pairs
+            size: Approximate number of vectors to draw
+        
+        Returns:
+            Sample matrix, read from each segment in row order
+        """
+        total = sum(rows.size for _, rows in live)
+        rng = np.random.default_rng(0)
+        fraction = min(1.0, size / total)
+        return np.concatenate([
+            np.asarray(s.vectors[np.sort(rng.choice(rows, int(np.ceil(rows.size * fraction)), replace=False))])
+            for s, rows in live if rows.size
+        ])
+    
+    def _prepare(self, vectors: List[List[float]], projection: Optional[Projection] = None) -> np.ndarray:
+        """
+        Normalize input vectors and apply the projection, if any.
+        
+        Args:
+            vectors: Raw embeddings
+            projection: Projection of the view being searched (default: current)
+        
+        Returns:
+            Normalized float32 matrix in the index space
+        """
+        projection = projection or self._projection
+        vectors = self._normalize(np.asarray(vectors, dtype=np.float32))
+        if projection is not None:
+            vectors = self._normalize(projection.transform(vectors))
+        return vectors
+    
+    def _search_quantized(
+        self,
+        queries: np.ndarray,
+        vectors: np.ndarray,
+        codes: np.ndarray,
+        rows: Optional[np.ndarray],
+        top_k: int,
+        quantizer: Any = None
+    ):
+        """
+        Search the compact codes, then rescore the candidates exactly.
+        
+        Args:
+            queries: Normalized query matrix (m x d)
+            vectors: Full-precision vectors (memory-mapped)
+            codes: Quantized codes of the vectors
+            rows: Optional subset of rows to search (after filtering)
+            top_k: Number of results per query
+            quantizer: Quantizer that produced the codes (default: current)
+        
+        Returns:
+            Tuple of (scores, rows), each m x min(top_k, candidates), best first
+        """
+        quantizer = quantizer or self._quantizer
+        approx = quantizer.scores(queries, codes[rows] if rows is not None else codes)
+        candidates = self._top_k(approx, top_k * self.rescore_factor)
+        if rows is not None:
+            candidates = rows[candidates]
+        
+        # Read each candidate row from disk once, in file order
+        unique_rows, inverse = np.unique(candidates, return_inverse=True)
+        exact = queries @ np.asarray(vectors[unique_rows]).T
+        exact = np.take_along_axis(exact, inverse.reshape(candidates.shape), axis=1)
+        
+        top = self._top_k(exact, top_k)
+        return np.take_along_axis(exact, top, axis=1), np.take_along_axis(candidates, top, axis=1)
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype(np.float32, copy=False)
+    
+    @staticmethod
+    def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """
+        Get the column indices of the top_k scores of each row, best first.
+        
+        Args:
+            scores: Score matrix (queries x candidates)
+            top_k: Number of results per row
+        
+        Returns:
+            Index matrix (queries x min(top_k, candidates))
+        """
+        n = scores.shape[1]
+        k = min(top_k, n)
+        
+        if k < n:
+            part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            part = np.tile(np.arange(n), (scores.shape[0], 1))
+        
+        order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+        return np.take_along_axis(part, order, axis=1)
+    
+    def _start_worker(self) -> None:
+        """Start the background flush/compaction thread."""
+        if not self.background or self._worker is not None:
+            return
+        
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._maintain, name="local-store-maintenance", daemon=True)
+        self._worker.start()
+    
+    def _stop_worker(self) -> None:
+        """Stop the background thread and wait for it."""
+        if self._worker is None:
+            return
+        
+        self._stop.set()
+        self._wakeup.set()
+        self._worker.join()
+        self._worker = None
+    
+    def _maintain(self) -> None:
+        """Background loop: flush on size or age, then compact."""
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            
+            try:
+                pending = self._memory_rows()
+                due = time.monotonic() - self._last_flush >= self.flush_interval
+                if pending >= self.flush_rows or (pending and due):
+                    self.flush()
+                self.compact()
+            except Exception as e:
+                logger.error(f"Error in LocalStore background maintenance: {e}")
+    
+    def _write_manifest(self) -> None:
+        """Atomically record the disk segments, their tombstones and the log position."""
+        disk = [s for s in self._segments if s.persisted]
+        manifest = {
+            "dimension": self.dimension,
+            "projection": self._projection.version if self._projection is not None else None,
+            "segments": [
+                dict(s.files, count=len(s), deleted=np.flatnonzero(s.deleted).tolist())
+                for s in disk
+            ],
+            "wal_seq": self._wal_seq,
+            "next_segment": self._next_segment,
+            "quantizer_rows": self._quantizer_rows
+        }
+        
+        manifest_tmp = self.path / (self.MANIFEST + ".tmp")
+        manifest_tmp.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+        os.replace(manifest_tmp, self.path / self.MANIFEST)
+    
+    def _load(self) -> None:
+        """Open the disk segments and replay the write-ahead log."""
+        manifest = json.loads((self.path / self.MANIFEST).read_text(encoding="utf-8"))
+        self.dimension = manifest["dimension"]
+        
+        if manifest.get("projection"):
+            self._publish(projection=Projection.load(self.path / self.PROJECTION, manifest["projection"]))
+        
+        self._next_segment = manifest.get("next_segment", 0)
+        self._wal_seq = manifest.get("wal_seq", 0)
+        self._quantizer_rows = manifest.get("quantizer_rows", 0)
+        
+        segments = []
+        for entry in manifest["segments"]:
+            segment = Segment.load(self.path, {"vectors": entry["vectors"], "records": entry["records"]}, entry["count"])
+            if entry.get("deleted"):
+                segment = segment.with_deleted(entry["deleted"])
+            segments.append(segment)
+        
+        if self._quantizer is not None:
+            quantizer_path = self.path / self.QUANTIZER
+            if quantizer_path.exists():
+                quantizer = load_quantizer(quantizer_path)
+                if quantizer.kind == self.quantization:
+                    self._publish(quantizer=quantizer)
+            for segment in segments:
+                segment.codes = self._encode(segment.vectors)
+        
+        with self._lock:
+            self._publish(segments=tuple(segments))
+            
+            self._wal = WriteAheadLog(self.path, sync=settings.LOCAL_WAL_FSYNC)
+            replayed = 0
+            for op, payload in self._wal.replay(self._wal_seq):
+                if op == "add":
+                    self._apply_add(*payload)
+                    replayed += len(payload[0])
+                else:
+                    self._apply_delete(payload)
+            
+            if self._refit_quantizer():
+                self._write_manifest()
+        
+        if replayed:
+            logger.info(f"Replayed {replayed} logged inserts into LocalStore")
+        
+        self._start_worker()
+    
+    def _remove_unused_files(self) -> None:
+        """Delete segment files no longer referenced by the manifest."""
+        manifest = json.loads((self.path / self.MANIFEST).read_text(encoding="utf-8"))
+        used = {name for entry in manifest["segments"] for name in (entry["vectors"], entry["records"])}
+        
+        # Files may still be mapped by readers (and cannot be removed on
+        # Windows while they are); try, and retry after later writes
+        for file in self.path.glob("seg_*"):
+            if file.name not in used:
+                try:
+                    file.unlink()
+                except OSError:
+                    pass
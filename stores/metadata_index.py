@@ -0,0 +1,303 @@
+"""
+Metadata filtering for the in-process stores: a row-by-row matcher and a
+columnar index that compiles filters to row selections.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+import numpy as np
+
+OPERATORS = ("$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte")
+
+# A selection is either sorted row numbers (selective results) or a mask
+Selection = Tuple[str, np.ndarray]
+
+
+def evaluate_condition(value: Any, op: str, operand: Any) -> bool:
+    """
+    Evaluate one filter operator against one metadata value.
+    
+    A list value (e.g. tags) matches $eq/$in when any element matches and
+    $ne/$nin when none does.
+    
+    Args:
+        value: Metadata value (None if the field is missing)
+        op: Filter operator
+        operand: Operator argument
+    
+    Returns:
+        True if the value satisfies the condition
+    """
+    if isinstance(value, list):
+        if op in ("$eq", "$ne"):
+            found = operand in value
+        elif op in ("$in", "$nin"):
+            found = any(item in operand for item in value)
+        else:
+            return False
+        return found if op in ("$eq", "$in") else not found
+    
+    if op == "$eq":
+        return value == operand
+    if op == "$ne":
+        return value != operand
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        if value is None:
+            return False
+        return {
+            "$gt": lambda: value > operand,
+            "$gte": lambda: value >= operand,
+            "$lt": lambda: value < operand,
+            "$lte": lambda: value <= operand,
+        }[op]()
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def matches_filter(metadata: Dict[str, Any], filter_dict: Optional[Dict[str, Any]]) -> bool:
+    """
+    Check a metadata dict against a Pinecone-style filter.
+    
+    Supports plain equality ({"field": value}) and the operators $eq, $ne,
+    $in, $nin, $gt, $gte, $lt and $lte.
+    
+    Args:
+        metadata: Metadata of a stored vector
+        filter_dict: Filter to apply (None matches everything)
+    
+    Returns:
+        True if the metadata satisfies every condition
+    """
+    if not filter_dict:
+        return True
+    
+    for field, condition in filter_dict.items():
+        value = metadata.get(field)
+        
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        
+        for op, operand in condition.items():
+            if not evaluate_condition(value, op, operand):
+                return False
+    
+    return True
+
+
+class _NumericColumn:
+    """Numbers as float64 (NaN = missing), with a lazy sort order for ranges."""
+    
+    def __init__(self, values: List[Any]):
+        self.values = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        self._order: Optional[np.ndarray] = None
+    
+    def select(self, op: str, operand: Any, n: int) -> Selection:
+        if op in ("$eq", "$ne", "$in", "$nin"):
+            operands = operand if op in ("$in", "$nin") else [operand]
+            numbers = [o for o in operands if isinstance(o, (int, float))]
+            mask = np.isin(self.values, numbers) if numbers else np.zeros(n, dtype=bool)
+            if any(o is None for o in operands):
+                mask |= np.isnan(self.values)
+            return ("mask", ~mask if op in ("$ne", "$nin") else mask)
+        
+        # Same outcome as comparing row by row: bools compare as 0/1,
+        # anything else that is not a number cannot be ordered against one
+        if not isinstance(operand, (int, float)):
+            raise TypeError(f"{op} needs a number, got {operand!r}")
+        
+        # Ranges are answered from the sorted order, so their cost grows
+        # with the number of matching rows
+        if self._order is None:
+            self._order = np.argsort(self.values, kind="stable")
+        ordered = self.values[self._order]
+        present = int(np.count_nonzero(~np.isnan(self.values)))
+        
+        if op == "$gt":
+            lo, hi = np.searchsorted(ordered[:present], operand, side="right"), present
+        elif op == "$gte":
+            lo, hi = np.searchsorted(ordered[:present], operand, side="left"), present
+        elif op == "$lt":
+            lo, hi = 0, np.searchsorted(ordered[:present], operand, side="left")
+        else:
+            lo, hi = 0, np.searchsorted(ordered[:present], operand, side="right")
+        return ("rows", np.sort(self._order[lo:hi]))
+
+
+class _CategoricalColumn:
+    """Hashable values (or lists of them) with a posting list per value."""
+    
+    def __init__(self, values: List[Any]):
+        self.values = values
+        self.multi = any(isinstance(v, list) for v in values)
+        self.postings: Dict[Any, np.ndarray] = {}
+        
+        rows_by_value: Dict[Any, List[int]] = {}
+        missing: List[int] = []
+        for row, value in enumerate(values):
+            if self.multi and value is None:
+                missing.append(row)
+                continue
+            # A list matches any of its elements
+            items = value if isinstance(value, list) else [value]
+            for item in items:
+                rows_by_value.setdefault(item, []).append(row)
+        
+        for value, rows in rows_by_value.items():
+            self.postings[value] = np.unique(np.asarray(rows, dtype=np.int64))
+        
+        # Rows without the field; they are compared as a plain None (so
+        # {"$in": [None]} matches them), not as an empty list
+        self.missing = np.asarray(missing, dtype=np.int64)
+    
+    def select(self, op: str, operand: Any, n: int) -> Selection:
+        if op in ("$eq", "$ne", "$in", "$nin"):
+            operands = operand if op in ("$in", "$nin") else [operand]
+            found = [self._lookup(o) for o in operands]
+            if any(o is None for o in operands):
+                found.append(self.missing)
+            rows = np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+        else:
+            # Ranges over strings and mixed values are compared row by row
+            return ("mask", np.fromiter(
+                (evaluate_condition(value, op, operand) for value in self.values),
+                dtype=bool,
+                count=n
+            ))
+        
+        if op in ("$eq", "$in"):
+            return ("rows", rows)
+        mask = np.ones(n, dtype=bool)
+        mask[rows] = False
+        return ("mask", mask)
+    
+    def _lookup(self, value: Any) -> np.ndarray:
+        try:
+            return self.postings.get(value, np.empty(0, dtype=np.int64))
+        except TypeError:
+            return np.empty(0, dtype=np.int64)
+
+
+class _ObjectColumn:
+    """Fallback for unhashable values: evaluated row by row."""
+    
+    def __init__(self, values: List[Any]):
+        self.values = values
+    
+    def select(self, op: str, operand: Any, n: int) -> Selection:
+        return ("mask", np.fromiter(
+            (evaluate_condition(value, op, operand) for value in self.values),
+            dtype=bool,
+            count=n
+        ))
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class MetadataIndex:
+    """
+    Typed metadata columns of a fixed set of records.
+    
+    Numeric fields become float64 columns, other fields posting lists of row
+    numbers per value (list fields such as tags are indexed per element).
+    Equality and range filters on selective values resolve to a short row
+    list without looking at the other rows; negations become masks.
+    """
+    
+    def __init__(self, records: List[Dict[str, Any]]):
+        """
+        Build the columns.
+        
+        Args:
+            records: Records with a "metadata" dict each
+        """
+        self.size = len(records)
+        self._metadata = [record["metadata"] for record in records]
+        self._columns: Dict[str, Union[_NumericColumn, _CategoricalColumn, _ObjectColumn]] = {}
+    
+    def _column(self, field: str):
+        """Build a column on first use; fields never filtered cost nothing."""
+        column = self._columns.get(field)
+        if column is not None:
+            return column
+        
+        values = [metadata.get(field) for metadata in self._metadata]
+        present = [v for v in values if v is not None]
+        
+        if present and all(_is_number(v) for v in present):
+            column = _NumericColumn(values)
+        else:
+            try:
+                column = _CategoricalColumn(values)
+            except TypeError:
+                column = _ObjectColumn(values)
+        
+        self._columns[field] = column
+        return column
+    
+    def rows(self, filter_dict: Dict[str, Any]) -> np.ndarray:
+        """
+        Rows matching a Pinecone-style filter.
+        
+        Args:
+            filter_dict: Filter (same syntax as matches_filter)
+        
+        Returns:
+            Sorted row numbers
+        """
+        kind, selection = self._select(filter_dict)
+        return selection if kind == "rows" else np.flatnonzero(selection)
+    
+    def mask(self, filter_dict: Dict[str, Any]) -> np.ndarray:
+        """
+        Boolean mask of rows matching a Pinecone-style filter.
+        
+        Args:
+            filter_dict: Filter (same syntax as matches_filter)
+        
+        Returns:
+            Boolean array of length size
+        """
+        kind, selection = self._select(filter_dict)
+        if kind == "mask":
+            return selection
+        mask = np.zeros(self.size, dtype=bool)
+        mask[selection] = True
+        return mask
+    
+    def _select(self, filter_dict: Dict[str, Any]) -> Selection:
+        """AND together the selections of every condition."""
+        result: Optional[Selection] = None
+        
+        for field, condition in filter_dict.items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            
+            for op, operand in condition.items():
+                if op not in OPERATORS:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                
+                selection = self._column(field).select(op, operand, self.size)
+                result = selection if result is None else _intersect(result, selection)
+                
+                if result[0] == "rows" and result[1].size == 0:
+                    return result
+        
+        if result is None:
+            return ("mask", np.ones(self.size, dtype=bool))
+        return result
+
+
+def _intersect(a: Selection, b: Selection) -> Selection:
+    """Intersect two selections, staying with row lists where possible."""
+    if a[0] == "rows" and b[0] == "rows":
+        return ("rows", np.intersect1d(a[1], b[1], assume_unique=True))
+    if a[0] == "rows":
+        return ("rows", a[1][b[1][a[1]]])
+    if b[0] == "rows":
+        return ("rows", b[1][a[1][b[1]]])
+    return ("mask", a[1] & b[1])
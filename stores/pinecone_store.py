@@ -2,13 +2,34 @@
 Pinecone vector store implementation for RAG.
 """
 
-from typing import List, Dict, Any
+import asyncio
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Tuple
+
+import httpx
 from pinecone import Pinecone, ServerlessSpec
+from pinecone.exceptions import NotFoundException
 from loguru import logger
 
 from config.settings import settings
 from embeddings.embedder import Embedder
 
+# Data plane API version matching pinecone-client 5.x
+PINECONE_API_VERSION = "2024-07"
+
+# Seconds between describe_index calls while an index is initializing
+READY_POLL_INTERVAL = 1.0
+
+# Index handles and hosts resolved in this process, by (api key, index name);
+# all stores on the same index share them. A connection in progress is a
+# future the other callers wait on, so only one of them polls Pinecone.
+_handles: Dict[Tuple[str, str], Tuple[Any, str]] = {}
+_connecting: Dict[Tuple[str, str], Future] = {}
+_handles_lock = threading.Lock()
+
 
 class PineconeStore:
     """
@@ -43,29 +64,121 @@ class PineconeStore:
         self.pc = Pinecone(api_key=self.api_key)
         self.index = None
         
+        # The async path talks to the index host over HTTP directly; httpx
+        # async connections are bound to the loop that opened them
+        self._host: Optional[str] = None
+        self._http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        
         logger.info(f"Initialized PineconeStore with index: {self.index_name}")
     
     def create_index(self, dimension: int = None, metric: str = "cosine") -> None:
         """
-        Create a new Pinecone index.
+        Create the Pinecone index if it does not exist, and connect to it.
+        
+        Once connected, further calls return without a network round trip.
         
         Args:
             dimension: Dimension of the vectors
             metric: Distance metric (cosine, euclidean, dotproduct)
         """
-        dimension = dimension or self.embedder.get_embedding_dimension()
+        if self.index is not None:
+            return
         
         try:
-            # Check if index already exists
-            existing_indexes = self.pc.list_indexes()
-            index_names = [idx.name for idx in existing_indexes]
+            self._connect(create=True, dimension=dimension, metric=metric)
+        except Exception as e:
+            logger.error(f"Error creating Pinecone index: {e}")
+            raise
+    
+    def _connect(
+        self,
+        create: bool = False,
+        dimension: int = None,
+        metric: str = "cosine"
+    ) -> bool:
+        """
+        Resolve the index handle once, waiting until the index is ready.
+        
+        One caller per index describes (or creates) it and polls until it is
+        ready, without holding a lock; concurrent callers wait for its
+        result. The handle is published only once the index is ready.
+        
+        Args:
+            create: Create the index if it does not exist
+            dimension: Dimension of the vectors of a new index
+            metric: Distance metric of a new index
+            
+        Returns:
+            True if connected, False if the index does not exist (and
+            ``create`` is False)
+        """
+        key = (self.api_key, self.index_name)
+        
+        while self.index is None:
+            with _handles_lock:
+                handle = _handles.get(key)
+                future = _connecting.get(key) if handle is None else None
+                leader = handle is None and future is None
+                if leader:
+                    future = _connecting[key] = Future()
+            
+            if handle is None and not leader:
+                # Another caller is resolving the index; wait for its result
+                handle = future.result()
+                if handle is None and create:
+                    # It only looked the index up; create it on the next pass
+                    continue
+            
+            if leader:
+                try:
+                    handle = self._resolve(create, dimension, metric)
+                except BaseException as e:
+                    with _handles_lock:
+                        _connecting.pop(key, None)
+                    future.set_exception(e)
+                    raise
+                
+                with _handles_lock:
+                    if handle is not None:
+                        _handles[key] = handle
+                    _connecting.pop(key, None)
+                future.set_result(handle)
             
-            if self.index_name in index_names:
-                logger.info(f"Index '{self.index_name}' already exists")
-                self.index = self.pc.Index(self.index_name)
-                return
+            if handle is None:
+                return False
             
-            # Create new index
+            # The host is set first: a non-None index means it is usable
+            self._host = handle[1]
+            self.index = handle[0]
+        
+        return True
+    
+    def _resolve(
+        self,
+        create: bool,
+        dimension: Optional[int],
+        metric: str
+    ) -> Optional[Tuple[Any, str]]:
+        """
+        Describe or create the index and wait until it is ready.
+        
+        Args:
+            create: Create the index if it does not exist
+            dimension: Dimension of the vectors of a new index
+            metric: Distance metric of a new index
+            
+        Returns:
+            Tuple of (index handle, host), or None if the index does not
+            exist and ``create`` is False
+        """
+        try:
+            description = self.pc.describe_index(self.index_name)
+            logger.info(f"Index '{self.index_name}' already exists")
+        except NotFoundException:
+            if not create:
+                return None
+            
+            dimension = dimension or self.embedder.get_embedding_dimension()
             logger.info(f"Creating Pinecone index '{self.index_name}' with dimension {dimension}")
             self.pc.create_index(
                 name=self.index_name,
@@ -76,19 +189,45 @@ class PineconeStore:
                     region="us-east-1"
                 )
             )
-            
-            self.index = self.pc.Index(self.index_name)
             logger.info(f"Successfully created index '{self.index_name}'")
+            description = self.pc.describe_index(self.index_name)
         
-        except Exception as e:
-            logger.error(f"Error creating Pinecone index: {e}")
-            raise
+        description = self._wait_until_ready(description)
+        
+        # Passing the host skips the describe_index lookup inside Index()
+        return self.pc.Index(host=description.host), description.host
+    
+    def _wait_until_ready(self, description: Any) -> Any:
+        """
+        Poll describe_index until a new index can serve reads and writes.
+        
+        Args:
+            description: Latest describe_index() result
+            
+        Returns:
+            describe_index() result of the ready index
+        """
+        deadline = time.monotonic() + settings.PINECONE_READY_TIMEOUT
+        
+        while not _is_ready(description):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Index '{self.index_name}' not ready after {settings.PINECONE_READY_TIMEOUT:.0f}s"
+                )
+            logger.info(f"Waiting for index '{self.index_name}' to become ready")
+            time.sleep(READY_POLL_INTERVAL)
+            description = self.pc.describe_index(self.index_name)
+        
+        return description
     
     def add_texts(
         self,
         texts: List[str],
         metadata: List[Dict[str, Any]] = None,
-        namespace: str = ""
+        namespace: str = "",
+        embeddings: Optional[List[List[float]]] = None,
+        ids: Optional[List[str]] = None,
+        store_text: bool = True
     ) -> None:
         """
         Add texts to the Pinecone index.
@@ -97,24 +236,29 @@ class PineconeStore:
             texts: List of texts to add
             metadata: Optional list of metadata dicts for each text
             namespace: Pinecone namespace
+            embeddings: Optional precomputed vectors (one per text); if omitted,
+                texts are embedded with the store's embedder
+            ids: Optional vector ids (default: doc_<position>)
+            store_text: Keep the text with the vector (False when a
+                DocStore holds it)
         """
-        if not self.index:
-            self.create_index()
+        self.create_index()
         
         if not texts:
             logger.warning("No texts provided to add")
             return
         
         try:
-            # Generate embeddings
-            logger.info(f"Generating embeddings for {len(texts)} texts")
-            embeddings = self.embedder.embed_batch(texts)
+            # Generate embeddings unless the caller already has them
+            if embeddings is None:
+                logger.info(f"Generating embeddings for {len(texts)} texts")
+                embeddings = self.embedder.embed_batch(texts)
             
             # Prepare vectors for upsert
             vectors = []
             for i, (text, embedding) in enumerate(zip(texts, embeddings)):
-                vector_id = f"doc_{i}"
-                vector_metadata = {"text": text}
+                vector_id = ids[i] if ids else f"doc_{i}"
+                vector_metadata = {"text": text} if store_text else {}
                 
                 if metadata and i < len(metadata):
                     vector_metadata.update(metadata[i])
@@ -143,7 +287,8 @@ class PineconeStore:
         query_text: str,
         top_k: int = 5,
         namespace: str = "",
-        filter_dict: Dict[str, Any] = None
+        filter_dict: Dict[str, Any] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """
         Query the Pinecone index.
@@ -153,17 +298,20 @@ class PineconeStore:
             top_k: Number of results to return
             namespace: Pinecone namespace to query
             filter_dict: Optional metadata filter
+            query_embedding: Optional precomputed query vector
             
         Returns:
             List of matching documents with scores
         """
-        if not self.index:
-            logger.error("Index not initialized. Call create_index() first.")
-            return []
-        
         try:
-            # Generate query embedding
-            query_embedding = self.embedder.embed_text(query_text)
+            # Connect to an existing index on first use
+            if self.index is None and not self._connect():
+                logger.warning(f"Index '{self.index_name}' does not exist yet")
+                return []
+            
+            # Generate query embedding unless the caller already has it
+            if query_embedding is None:
+                query_embedding = self.embedder.embed_text(query_text)
             
             # Query Pinecone
             logger.info(f"Querying Pinecone for: '{query_text[:50]}...'")
@@ -192,6 +340,87 @@ class PineconeStore:
             logger.error(f"Error querying Pinecone: {e}")
             raise
     
+    async def aquery(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        namespace: str = "",
+        filter_dict: Dict[str, Any] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Asynchronous variant of query() over the index's HTTP API.
+        
+        Args:
+            query_text: The query text
+            top_k: Number of results to return
+            namespace: Pinecone namespace to query
+            filter_dict: Optional metadata filter
+            query_embedding: Optional precomputed query vector
+            
+        Returns:
+            List of matching documents with scores
+        """
+        try:
+            if self.index is None and not await asyncio.to_thread(self._connect):
+                logger.warning(f"Index '{self.index_name}' does not exist yet")
+                return []
+            
+            if query_embedding is None:
+                query_embedding = await self.embedder.aembed_text(query_text)
+            
+            body = {
+                "vector": query_embedding,
+                "topK": top_k,
+                "namespace": namespace,
+                "includeMetadata": True
+            }
+            if filter_dict:
+                body["filter"] = filter_dict
+            
+            logger.info(f"Querying Pinecone for: '{query_text[:50]}...'")
+            response = await self._get_http_client().post(f"https://{self._host}/query", json=body)
+            response.raise_for_status()
+            
+            matches = []
+            for match in response.json().get("matches", []):
+                metadata = match.get("metadata") or {}
+                matches.append({
+                    "id": match["id"],
+                    "score": match.get("score", 0.0),
+                    "text": metadata.get("text", ""),
+                    "metadata": metadata
+                })
+            
+            logger.info(f"Found {len(matches)} matches in Pinecone")
+            return matches
+        
+        except Exception as e:
+            logger.error(f"Error querying Pinecone: {e}")
+            raise
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Get the HTTP client of the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._http_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                headers={
+                    "Api-Key": self.api_key,
+                    "X-Pinecone-API-Version": PINECONE_API_VERSION
+                },
+                timeout=httpx.Timeout(30.0, connect=10.0),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+            )
+            self._http_clients[loop] = client
+        return client
+    
+    async def aclose(self) -> None:
+        """Close the HTTP client of the running event loop, if any."""
+        client = self._http_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+    
     def delete_index(self) -> None:
         """Delete the Pinecone index."""
         try:
@@ -200,4 +429,16 @@ class PineconeStore:
         except Exception as e:
             logger.error(f"Error deleting Pinecone index: {e}")
             raise
+        finally:
+            self.index = None
+            self._host = None
+            with _handles_lock:
+                _handles.pop((self.api_key, self.index_name), None)
+
 
+def _is_ready(description: Any) -> bool:
+    """Whether a describe_index() result reports the index as ready."""
+    status = getattr(description, "status", None) or {}
+    if isinstance(status, dict):
+        return bool(status.get("ready"))
+    return bool(getattr(status, "ready", False))
@@ -0,0 +1,174 @@
+"""
+Linear projections (PCA or random) that shrink embeddings before indexing.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+
+class Projection:
+    """
+    Linear map from the embedding space to a smaller space.
+    
+    ``transform`` computes ``(x - mean) @ components.T``. The same map must be
+    applied to stored vectors and to queries, so each projection carries a
+    version derived from its parameters; an index records the version it
+    was built with.
+    """
+    
+    def __init__(
+        self,
+        components: np.ndarray,
+        mean: np.ndarray,
+        method: str,
+        explained_variance: Optional[float] = None
+    ):
+        """
+        Initialize the projection.
+        
+        Args:
+            components: Projection matrix (k x d)
+            mean: Vector subtracted before projecting (d)
+            method: "pca" or "random"
+            explained_variance: Fraction of sample variance kept (PCA only)
+        """
+        self.components = components.astype(np.float32)
+        self.mean = mean.astype(np.float32)
+        self.method = method
+        self.explained_variance = explained_variance
+        self.version = hashlib.sha1(self.components.tobytes() + self.mean.tobytes()).hexdigest()[:12]
+    
+    @property
+    def source_dimension(self) -> int:
+        """Dimension of the vectors the projection accepts."""
+        return self.components.shape[1]
+    
+    @property
+    def dimension(self) -> int:
+        """Dimension of the projected vectors."""
+        return self.components.shape[0]
+    
+    @classmethod
+    def fit_pca(
+        cls,
+        sample: np.ndarray,
+        n_components: Optional[int] = None,
+        target_variance: float = 0.95
+    ) -> "Projection":
+        """
+        Fit a PCA projection on sample vectors.
+        
+        Args:
+            sample: Sample matrix (n x d)
+            n_components: Output dimension; if omitted, the smallest one
+                keeping target_variance of the variance is used
+            target_variance: Fraction of variance to keep when n_components
+                is not given
+        
+        Returns:
+            Fitted projection
+        """
+        sample = np.asarray(sample, dtype=np.float32)
+        mean = sample.mean(axis=0)
+        
+        _, singular_values, vt = np.linalg.svd(sample - mean, full_matrices=False)
+        ratios = singular_values ** 2 / np.sum(singular_values ** 2)
+        cumulative = np.cumsum(ratios)
+        
+        if n_components is None:
+            n_components = int(np.searchsorted(cumulative, target_variance) + 1)
+        n_components = min(n_components, len(singular_values))
+        explained = float(cumulative[n_components - 1])
+        
+        logger.info(
+            f"Fitted PCA projection {sample.shape[1]} -> {n_components} dims "
+            f"on {len(sample)} vectors ({explained:.1%} of variance kept)"
+        )
+        return cls(vt[:n_components], mean, "pca", explained)
+    
+    @classmethod
+    def fit_random(cls, dimension: int, n_components: int, seed: int = 0) -> "Projection":
+        """
+        Create a Gaussian random projection (approximately preserves angles).
+        
+        Args:
+            dimension: Input dimension
+            n_components: Output dimension
+            seed: Random seed
+        
+        Returns:
+            Projection
+        """
+        rng = np.random.default_rng(seed)
+        components = rng.standard_normal((n_components, dimension)) / np.sqrt(n_components)
+        
+        logger.info(f"Created random projection {dimension} -> {n_components} dims")
+        return cls(components, np.zeros(dimension), "random")
+    
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Project vectors.
+        
+        Args:
+            vectors: Matrix of input vectors (n x d)
+        
+        Returns:
+            Projected float32 matrix (n x k)
+        """
+        if vectors.shape[1] != self.source_dimension:
+            raise ValueError(
+                f"Vector dimension {vectors.shape[1]} does not match projection "
+                f"input dimension {self.source_dimension}"
+            )
+        return ((vectors - self.mean) @ self.components.T).astype(np.float32)
+    
+    def save(self, path: Path) -> None:
+        """
+        Save the projection to an .npz file.
+        
+        Args:
+            path: Target file path
+        """
+        np.savez(
+            path,
+            components=self.components,
+            mean=self.mean,
+            method=self.method,
+            explained_variance=np.nan if self.explained_variance is None else self.explained_variance,
+            version=self.version
+        )
+    
+    @classmethod
+    def load(cls, path: Path, expected_version: Optional[str] = None) -> "Projection":
+        """
+        Load a projection saved with save().
+        
+        Args:
+            path: Path of the .npz file
+            expected_version: Version the caller's index was built with; a
+                mismatch raises ValueError
+        
+        Returns:
+            Loaded projection
+        """
+        data = np.load(path)
+        explained = float(data["explained_variance"])
+        projection = cls(
+            data["components"],
+            data["mean"],
+            str(data["method"]),
+            None if np.isnan(explained) else explained
+        )
+        
+        if projection.version != str(data["version"]):
+            raise ValueError(f"Projection file {path} is corrupt (version mismatch)")
+        if expected_version is not None and projection.version != expected_version:
+            raise ValueError(
+                f"Projection {projection.version} in {path} does not match the "
+                f"index (built with {expected_version}); re-fit the projection"
+            )
+        return projection
@@ -0,0 +1,242 @@
+"""
+Compact vector codes (int8 and binary) for fast first-pass local search.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+# Rows decoded per block, bounding the temporary float buffer
+BLOCK_ROWS = 65536
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+    _HAS_WIDE_POPCOUNT = True
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    _HAS_WIDE_POPCOUNT = False
+    
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        return _POPCOUNT_TABLE[x]
+
+
+def _as_words(codes: np.ndarray) -> np.ndarray:
+    """View packed byte codes as 64-bit words when popcount supports them."""
+    if _HAS_WIDE_POPCOUNT and codes.shape[1] % 8 == 0:
+        return np.ascontiguousarray(codes).view(np.uint64)
+    return codes
+
+
+class ScalarQuantizer:
+    """
+    8-bit scalar quantizer with a per-dimension offset and scale.
+    
+    Each component is mapped linearly from [min, max] of its dimension to
+    0..255, shrinking float32 vectors 4x. Scores are asymmetric: the float
+    query is multiplied against the decoded codes, so only the stored side
+    loses precision.
+    """
+    
+    kind = "int8"
+    
+    def __init__(self, low: Optional[np.ndarray] = None, scale: Optional[np.ndarray] = None):
+        """
+        Initialize the quantizer.
+        
+        Args:
+            low: Per-dimension minimum (set by fit)
+            scale: Per-dimension step size (set by fit)
+        """
+        self.low = low
+        self.scale = scale
+    
+    @property
+    def is_fitted(self) -> bool:
+        """Whether fit() has been called (or parameters were loaded)."""
+        return self.scale is not None
+    
+    def fit(self, vectors: np.ndarray) -> "ScalarQuantizer":
+        """
+        Learn the per-dimension range from sample vectors.
+        
+        Args:
+            vectors: Sample matrix (n x d)
+        
+        Returns:
+            The fitted quantizer
+        """
+        self.low = vectors.min(axis=0).astype(np.float32)
+        scale = (vectors.max(axis=0) - self.low) / 255.0
+        scale[scale == 0] = 1.0
+        self.scale = scale.astype(np.float32)
+        return self
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Encode vectors; values outside the fitted range are clipped.
+        
+        Args:
+            vectors: Float matrix (n x d)
+        
+        Returns:
+            uint8 code matrix (n x d)
+        """
+        codes = np.rint((vectors - self.low) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+    
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Approximate inner products between queries and encoded vectors.
+        
+        Args:
+            queries: Float query matrix (m x d)
+            codes: Code matrix (n x d)
+        
+        Returns:
+            Score matrix (m x n), higher is closer
+        """
+        # q . (low + scale * c) = q . low + (q * scale) . c
+        bias = queries @ self.low
+        scaled = (queries * self.scale).astype(np.float32)
+        
+        out = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), BLOCK_ROWS):
+            block = codes[start:start + BLOCK_ROWS].astype(np.float32)
+            out[:, start:start + len(block)] = scaled @ block.T
+        out += bias[:, None]
+        return out
+    
+    def save(self, path: Path) -> None:
+        """Save the fitted parameters to an .npz file."""
+        np.savez(path, kind=self.kind, low=self.low, scale=self.scale)
+
+
+class BinaryQuantizer:
+    """
+    1-bit quantizer: one bit per dimension, compared by Hamming distance.
+    
+    A component becomes 1 when it is above that dimension's mean, so bits
+    stay balanced even when embeddings are not centred. Codes are packed
+    eight dimensions per byte, shrinking float32 vectors 32x.
+    """
+    
+    kind = "binary"
+    
+    def __init__(self, thresholds: Optional[np.ndarray] = None):
+        """
+        Initialize the quantizer.
+        
+        Args:
+            thresholds: Per-dimension bit thresholds (set by fit)
+        """
+        self.thresholds = thresholds
+    
+    @property
+    def is_fitted(self) -> bool:
+        """Whether fit() has been called (or parameters were loaded)."""
+        return self.thresholds is not None
+    
+    def fit(self, vectors: np.ndarray) -> "BinaryQuantizer":
+        """
+        Learn the per-dimension thresholds from sample vectors.
+        
+        Args:
+            vectors: Sample matrix (n x d)
+        
+        Returns:
+            The fitted quantizer
+        """
+        self.thresholds = vectors.mean(axis=0).astype(np.float32)
+        return self
+    
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Encode vectors as packed bits.
+        
+        Args:
+            vectors: Float matrix (n x d)
+        
+        Returns:
+            uint8 code matrix (n x ceil(d / 8))
+        """
+        return np.packbits(vectors > self.thresholds, axis=1)
+    
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Negated Hamming distances between queries and encoded vectors.
+        
+        Args:
+            queries: Float query matrix (m x d)
+            codes: Packed code matrix (n x ceil(d / 8))
+        
+        Returns:
+            Score matrix (m x n), higher is closer
+        """
+        query_codes = _as_words(self.encode(queries))
+        
+        # Column-major words: each step is a contiguous xor + popcount over
+        # all rows, avoiding slow reductions along a short trailing axis
+        columns = np.ascontiguousarray(_as_words(codes).T)
+        
+        out = np.empty((len(queries), len(codes)), dtype=np.float32)
+        buffer = np.empty(len(codes), dtype=columns.dtype)
+        for q, query in enumerate(query_codes):
+            distances = np.zeros(len(codes), dtype=np.int32)
+            for word, column in zip(query, columns):
+                np.bitwise_xor(column, word, out=buffer)
+                distances += _popcount(buffer)
+            np.negative(distances, out=out[q], casting="unsafe")
+        return out
+    
+    def save(self, path: Path) -> None:
+        """Save the fitted parameters to an .npz file."""
+        np.savez(path, kind=self.kind, thresholds=self.thresholds)
+
+
+QUANTIZERS = {
+    ScalarQuantizer.kind: ScalarQuantizer,
+    BinaryQuantizer.kind: BinaryQuantizer,
+}
+
+
+def make_quantizer(kind: Optional[str]):
+    """
+    Create an unfitted quantizer.
+    
+    Args:
+        kind: "int8", "binary", or None / "none" for no quantization
+    
+    Returns:
+        Quantizer instance, or None
+    """
+    if not kind or kind == "none":
+        return None
+    if kind not in QUANTIZERS:
+        raise ValueError(f"Unknown quantization: {kind} (expected one of {list(QUANTIZERS)})")
+    return QUANTIZERS[kind]()
+
+
+def load_quantizer(path: Path):
+    """
+    Load a quantizer saved with save().
+    
+    Args:
+        path: Path of the .npz file
+    
+    Returns:
+        Fitted quantizer
+    """
+    data = np.load(path)
+    kind = str(data["kind"])
+    
+    if kind == ScalarQuantizer.kind:
+        quantizer = ScalarQuantizer(data["low"], data["scale"])
+    elif kind == BinaryQuantizer.kind:
+        quantizer = BinaryQuantizer(data["thresholds"])
+    else:
+        raise ValueError(f"Unknown quantizer in {path}: {kind}")
+    
+    logger.debug(f"Loaded {kind} quantizer from {path}")
+    return quantizer
@@ -2,7 +2,7 @@
 Relevance AI vector store implementation for RAG.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from relevanceai import RelevanceAI
 from loguru import logger
 
@@ -76,7 +76,10 @@ class RelevanceStore:
     def add_texts(
         self,
         texts: List[str],
-        metadata: List[Dict[str, Any]] = None
+        metadata: List[Dict[str, Any]] = None,
+        embeddings: Optional[List[List[float]]] = None,
+        ids: Optional[List[str]] = None,
+        store_text: bool = True
     ) -> None:
         """
         Add texts to Relevance AI dataset.
@@ -84,6 +87,11 @@ class RelevanceStore:
         Args:
             texts: List of texts to add
             metadata: Optional list of metadata dicts for each text
+            embeddings: Optional precomputed vectors (one per text); if omitted,
+                texts are embedded with the store's embedder
+            ids: Optional document ids (default: doc_<position>)
+            store_text: Keep the text with the vector (False when a
+                DocStore holds it)
         """
         if not texts:
             logger.warning("No texts provided to add")
@@ -95,16 +103,17 @@ class RelevanceStore:
             if self.dataset_id not in datasets:
                 self.create_collection()
             
-            # Generate embeddings
-            logger.info(f"Generating embeddings for {len(texts)} texts")
-            embeddings = self.embedder.embed_batch(texts)
+            # Generate embeddings unless the caller already has them
+            if embeddings is None:
+                logger.info(f"Generating embeddings for {len(texts)} texts")
+                embeddings = self.embedder.embed_batch(texts)
             
             # Prepare documents
             documents = []
             for i, (text, embedding) in enumerate(zip(texts, embeddings)):
                 doc = {
-                    "_id": f"doc_{i}",
-                    "text": text,
+                    "_id": ids[i] if ids else f"doc_{i}",
+                    "text": text if store_text else "",
                     "text_vector_": embedding,
                     "doc_id": i
                 }
@@ -132,7 +141,8 @@ class RelevanceStore:
         self,
         query_text: str,
         top_k: int = 5,
-        filter_dict: Dict[str, Any] = None
+        filter_dict: Dict[str, Any] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """
         Query Relevance AI for similar documents.
@@ -141,13 +151,15 @@ class RelevanceStore:
             query_text: The query text
             top_k: Number of results to return
             filter_dict: Optional metadata filter
+            query_embedding: Optional precomputed query vector
             
         Returns:
             List of matching documents with scores
         """
         try:
-            # Generate query embedding
-            query_embedding = self.embedder.embed_text(query_text)
+            # Generate query embedding unless the caller already has it
+            if query_embedding is None:
+                query_embedding = self.embedder.embed_text(query_text)
             
             # Query Relevance AI
             logger.info(f"Querying Relevance AI for: '{query_text[:50]}...'")
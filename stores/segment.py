@@ -0,0 +1,336 @@
+"""
+Immutable vector segments and the write-ahead log of the local store.
+"""
+
+import base64
+import itertools
+import json
+import os
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+import numpy as np
+from loguru import logger
+
+from stores.metadata_index import MetadataIndex
+
+_segment_uids = itertools.count()
+
+
+class Segment:
+    """
+    Immutable block of normalized vectors and their records.
+    
+    Disk segments are memory-mapped files written once; memory segments hold
+    fresh inserts until they are flushed. Nothing is modified in place:
+    a delete returns a copy of the segment with a new ``deleted`` mask, so
+    readers holding the old object keep a consistent view.
+    """
+    
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        records: List[Dict[str, Any]],
+        files: Optional[Dict[str, str]] = None,
+        deleted: Optional[np.ndarray] = None,
+        codes: Optional[np.ndarray] = None,
+        uid: Optional[int] = None
+    ):
+        """
+        Initialize the segment.
+        
+        Args:
+            vectors: Vector matrix (n x d), in memory or memory-mapped
+            records: Matching id/text/metadata records
+            files: {"vectors": ..., "records": ...} file names for disk segments
+            deleted: Boolean tombstone mask (default: nothing deleted)
+            codes: Quantized codes of the vectors, if quantization is enabled
+            uid: Identity kept across copies made by with_deleted()
+        """
+        self.vectors = vectors
+        self.records = records
+        self.files = files
+        self.deleted = deleted if deleted is not None else np.zeros(len(records), dtype=bool)
+        self.codes = codes
+        self.uid = next(_segment_uids) if uid is None else uid
+        self._rows: Optional[Dict[str, int]] = None
+        self._metadata_index: Optional[MetadataIndex] = None
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    @property
+    def persisted(self) -> bool:
+        """Whether the segment is stored on disk."""
+        return self.files is not None
+    
+    @property
+    def deleted_count(self) -> int:
+        """Number of tombstoned rows."""
+        return int(np.count_nonzero(self.deleted))
+    
+    @property
+    def live_count(self) -> int:
+        """Number of rows that are not deleted."""
+        return len(self.records) - self.deleted_count
+    
+    def row_of(self, vector_id: str) -> Optional[int]:
+        """
+        Find the row of a vector id.
+        
+        Args:
+            vector_id: Vector id
+        
+        Returns:
+            Row number, or None if the id is not in this segment
+        """
+        if self._rows is None:
+            self._rows = {record["id"]: row for row, record in enumerate(self.records)}
+        return self._rows.get(vector_id)
+    
+    @property
+    def metadata_index(self) -> MetadataIndex:
+        """Columnar index of the record metadata, built on first filtered search."""
+        if self._metadata_index is None:
+            self._metadata_index = MetadataIndex(self.records)
+        return self._metadata_index
+    
+    def with_deleted(self, rows: List[int]) -> "Segment":
+        """
+        Copy of the segment with additional rows tombstoned.
+        
+        Args:
+            rows: Rows to mark as deleted
+        
+        Returns:
+            New segment sharing the vectors, records and codes
+        """
+        deleted = self.deleted.copy()
+        deleted[rows] = True
+        return self.with_mask(deleted)
+    
+    def with_mask(self, deleted: np.ndarray) -> "Segment":
+        """
+        Copy of the segment with a replaced tombstone mask.
+        
+        Args:
+            deleted: New boolean mask
+        
+        Returns:
+            New segment sharing the vectors, records and codes
+        """
+        return self._copy(deleted, self.codes)
+    
+    def with_codes(self, codes: Optional[np.ndarray]) -> "Segment":
+        """
+        Copy of the segment with replaced quantized codes.
+        
+        Args:
+            codes: Codes of the vectors under a new quantizer (or None)
+        
+        Returns:
+            New segment sharing the vectors, records and tombstones
+        """
+        return self._copy(self.deleted, codes)
+    
+    def _copy(self, deleted: np.ndarray, codes: Optional[np.ndarray]) -> "Segment":
+        segment = Segment(self.vectors, self.records, self.files, deleted, codes, self.uid)
+        segment._rows = self._rows
+        segment._metadata_index = self._metadata_index
+        return segment
+    
+    def live_rows(self) -> Optional[np.ndarray]:
+        """
+        Rows that are not deleted.
+        
+        Returns:
+            Row indices, or None if nothing is deleted
+        """
+        if not self.deleted.any():
+            return None
+        return np.flatnonzero(~self.deleted)
+    
+    @classmethod
+    def write(
+        cls,
+        directory: Path,
+        name: str,
+        chunks: List[np.ndarray],
+        records: List[Dict[str, Any]]
+    ) -> "Segment":
+        """
+        Write vectors and records as a new disk segment.
+        
+        Args:
+            directory: Index directory
+            name: Segment file name stem
+            chunks: Vector blocks, written one after another
+            records: Records of all rows, in the same order
+        
+        Returns:
+            The memory-mapped segment
+        """
+        files = {"vectors": f"{name}.npy", "records": f"{name}.jsonl"}
+        dimension = chunks[0].shape[1]
+        
+        vectors = np.lib.format.open_memmap(
+            directory / files["vectors"],
+            mode="w+",
+            dtype=np.float32,
+            shape=(len(records), dimension)
+        )
+        start = 0
+        for chunk in chunks:
+            vectors[start:start + len(chunk)] = chunk
+            start += len(chunk)
+        vectors.flush()
+        del vectors
+        
+        with open(directory / files["records"], "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        
+        return cls.load(directory, files, len(records))
+    
+    @classmethod
+    def load(cls, directory: Path, files: Dict[str, str], count: int) -> "Segment":
+        """
+        Open a disk segment.
+        
+        Args:
+            directory: Index directory
+            files: Vector and record file names
+            count: Number of rows recorded in the manifest
+        
+        Returns:
+            The memory-mapped segment
+        """
+        vectors = np.load(directory / files["vectors"], mmap_mode="r")
+        
+        records = []
+        with open(directory / files["records"], "r", encoding="utf-8") as f:
+            for line in f:
+                if len(records) == count:
+                    break
+                records.append(json.loads(line))
+        
+        return cls(vectors[:count], records, dict(files))
+
+
+class WriteAheadLog:
+    """
+    Append-only log of inserts and deletes that are not yet in a disk segment.
+    
+    The log is split into numbered files. rotate() starts a new file, so a
+    flush can persist everything logged before the rotation while writers
+    keep appending; the manifest then records the first file still needed.
+    """
+    
+    def __init__(self, directory: Path, sync: bool = True):
+        """
+        Open the log, continuing after the newest existing file.
+        
+        Args:
+            directory: Index directory
+            sync: fsync after every append
+        """
+        self.directory = directory
+        self.sync = sync
+        
+        existing = self._sequences()
+        self.seq = existing[-1] + 1 if existing else 0
+        self._file = open(self._path(self.seq), "a", encoding="utf-8")
+    
+    def _path(self, seq: int) -> Path:
+        return self.directory / f"wal_{seq:06d}.jsonl"
+    
+    def _sequences(self) -> List[int]:
+        return sorted(int(p.stem.split("_")[1]) for p in self.directory.glob("wal_*.jsonl"))
+    
+    def _append(self, entry: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+    
+    def append_add(self, records: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        """
+        Log an insert batch.
+        
+        Args:
+            records: Inserted records
+            vectors: Their normalized float32 vectors
+        """
+        self._append({
+            "op": "add",
+            "records": records,
+            "dimension": int(vectors.shape[1]),
+            "vectors": base64.b64encode(np.ascontiguousarray(vectors, dtype=np.float32).tobytes()).decode("ascii")
+        })
+    
+    def append_delete(self, ids: List[str]) -> None:
+        """
+        Log a delete.
+        
+        Args:
+            ids: Deleted vector ids
+        """
+        self._append({"op": "delete", "ids": list(ids)})
+    
+    def rotate(self) -> int:
+        """
+        Close the current file and continue in a new one.
+        
+        Returns:
+            Sequence number of the new file
+        """
+        self._file.close()
+        self.seq += 1
+        self._file = open(self._path(self.seq), "a", encoding="utf-8")
+        return self.seq
+    
+    def replay(self, from_seq: int) -> Iterator[Tuple[str, Any]]:
+        """
+        Read logged operations in order.
+        
+        Args:
+            from_seq: First file to read; older files are already persisted
+        
+        Yields:
+            ("add", (records, vectors)) or ("delete", ids)
+        """
+        for seq in self._sequences():
+            if seq < from_seq or seq >= self.seq:
+                continue
+            
+            with open(self._path(seq), "r", encoding="utf-8") as f:
+                for line_no, line in enumerate(f, 1):
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash mid-append leaves a torn last line
+                        logger.warning(f"Ignoring truncated WAL entry {self._path(seq).name}:{line_no}")
+                        break
+                    
+                    if entry["op"] == "add":
+                        vectors = np.frombuffer(
+                            base64.b64decode(entry["vectors"]), dtype=np.float32
+                        ).reshape(-1, entry["dimension"])
+                        yield "add", (entry["records"], vectors)
+                    else:
+                        yield "delete", entry["ids"]
+    
+    def remove_before(self, seq: int) -> None:
+        """
+        Delete log files that are fully persisted.
+        
+        Args:
+            seq: First sequence number still needed
+        """
+        for old in self._sequences():
+            if old < seq:
+                self._path(old).unlink(missing_ok=True)
+    
+    def close(self) -> None:
+        """Close the current log file."""
+        self._file.close()
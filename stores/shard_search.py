@@ -0,0 +1,93 @@
+"""
+Shard search executed in worker processes over memory-mapped segment files.
+
+Only numpy is imported here, and the stores package loads its backends
+on first access, so spawned workers start without the vector store SDKs.
+"""
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Open mappings per worker process; bounded so that files removed by
+# compaction are eventually unmapped and their disk space released
+MAX_MAPPED_FILES = 32
+_mapped: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+
+def _open(path: str) -> np.ndarray:
+    """Memory-map a segment vector file, reusing earlier mappings."""
+    vectors = _mapped.pop(path, None)
+    if vectors is None:
+        vectors = np.load(path, mmap_mode="r")
+    _mapped[path] = vectors
+    
+    while len(_mapped) > MAX_MAPPED_FILES:
+        _mapped.popitem(last=False)
+    return vectors
+
+
+def search_shard(
+    path: str,
+    queries: np.ndarray,
+    top_k: int,
+    start: int,
+    stop: int,
+    rows: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-k search of one shard of a segment file (runs in a worker).
+    
+    Args:
+        path: Path of the segment's .npy vector file
+        queries: Normalized query matrix (m x d)
+        top_k: Number of results per query
+        start: First row of the shard
+        stop: End row of the shard (exclusive)
+        rows: Optional explicit rows to search instead of start:stop
+    
+    Returns:
+        Tuple of (scores, rows) as returned by search_vectors()
+    """
+    return search_vectors(_open(path), queries, top_k, start, stop, rows)
+
+
+def search_vectors(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    top_k: int,
+    start: int,
+    stop: int,
+    rows: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-k search of a row range of a vector matrix.
+    
+    Args:
+        vectors: Segment vectors (n x d)
+        queries: Normalized query matrix (m x d)
+        top_k: Number of results per query
+        start: First row of the shard
+        stop: End row of the shard (exclusive)
+        rows: Optional explicit rows to search instead of start:stop
+    
+    Returns:
+        Tuple of (scores, rows), each m x min(top_k, shard rows), best
+        first; rows are row numbers within the segment
+    """
+    if rows is None:
+        rows = np.arange(start, stop)
+        scores = queries @ vectors[start:stop].T
+    else:
+        scores = queries @ vectors[rows].T
+    
+    k = min(top_k, scores.shape[1])
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    
+    top_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return np.take_along_axis(top_scores, order, axis=1), rows[np.take_along_axis(part, order, axis=1)]
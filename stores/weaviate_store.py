@@ -2,15 +2,73 @@
 Weaviate vector store implementation for RAG.
 """
 
-from typing import List, Dict, Any, Optional
+import asyncio
+import queue
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional
 import weaviate
 from weaviate.classes.config import Configure, Property, DataType
-from weaviate.classes.query import MetadataQuery
+from weaviate.classes.query import Filter, MetadataQuery
 from loguru import logger
 
 from config.settings import settings
 from embeddings.embedder import Embedder
 
+# Seconds between pool checks while every client is borrowed
+POOL_WAIT_INTERVAL = 1.0
+
+
+def build_filter(filter_dict: Optional[Dict[str, Any]]) -> Any:
+    """
+    Translate a Pinecone-style metadata filter into a Weaviate filter.
+    
+    Supports plain equality ({"field": value}) and the operators $eq, $ne,
+    $in, $nin, $gt, $gte, $lt and $lte on the metadata properties written
+    by add_texts(); all conditions must hold.
+    
+    Args:
+        filter_dict: Filter to translate (None or empty for no filter)
+    
+    Returns:
+        Weaviate filter, or None if there is nothing to filter on
+    
+    Raises:
+        ValueError: On an unsupported operator or an empty $in list
+    """
+    conditions = []
+    for field, condition in (filter_dict or {}).items():
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        
+        prop = Filter.by_property(field)
+        for op, operand in condition.items():
+            if op == "$eq":
+                conditions.append(prop.equal(operand))
+            elif op == "$ne":
+                conditions.append(prop.not_equal(operand))
+            elif op == "$in":
+                if not operand:
+                    raise ValueError(f"Empty $in list for field '{field}' matches nothing")
+                conditions.append(Filter.any_of([prop.equal(value) for value in operand]))
+            elif op == "$nin":
+                conditions.extend(prop.not_equal(value) for value in operand)
+            elif op == "$gt":
+                conditions.append(prop.greater_than(operand))
+            elif op == "$gte":
+                conditions.append(prop.greater_or_equal(operand))
+            elif op == "$lt":
+                conditions.append(prop.less_than(operand))
+            elif op == "$lte":
+                conditions.append(prop.less_or_equal(operand))
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+    
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else Filter.all_of(conditions)
+
 
 class WeaviateStore:
     """
@@ -22,7 +80,8 @@ class WeaviateStore:
         url: str = None,
         api_key: str = None,
         class_name: str = None,
-        embedder: Embedder = None
+        embedder: Embedder = None,
+        pool_size: int = None
     ):
         """
         Initialize Weaviate store.
@@ -32,26 +91,107 @@ class WeaviateStore:
             api_key: Weaviate API key (optional)
             class_name: Name of the Weaviate class
             embedder: Embedder instance for generating vectors
+            pool_size: Maximum number of sync client connections
+                (default: settings.WEAVIATE_POOL_SIZE)
         """
         self.url = url or settings.WEAVIATE_URL
         self.api_key = api_key or settings.WEAVIATE_API_KEY
         self.class_name = class_name or settings.WEAVIATE_CLASS_NAME
         self.embedder = embedder or Embedder()
+        self.pool_size = max(1, pool_size or settings.WEAVIATE_POOL_SIZE)
         
-        # Initialize Weaviate client
+        # Async clients are bound to the event loop they were connected on
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        
+        # The sync client (and its batching) is not safe to share between
+        # threads, so each call borrows a connection from a bounded pool and
+        # returns it; short-lived threads therefore never leak connections
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._clients: List[Any] = []
+        self._clients_lock = threading.Lock()
+        self._opening = 0
+        
+        # Connect eagerly so that bad settings fail at construction
+        with self._borrow():
+            pass
+    
+    @contextmanager
+    def _borrow(self) -> Iterator[Any]:
+        """
+        Borrow a sync client for the duration of a with block.
+        
+        An idle client is reused; otherwise a new one is connected while
+        fewer than pool_size exist, and beyond that the caller waits for
+        one to be returned.
+        
+        Yields:
+            Connected WeaviateClient
+        """
+        client = self._acquire()
+        try:
+            yield client
+        finally:
+            self._release(client)
+    
+    def _acquire(self):
+        """Take an idle client, connect a new one, or wait for one."""
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            
+            with self._clients_lock:
+                grow = len(self._clients) + self._opening < self.pool_size
+                if grow:
+                    self._opening += 1
+            if grow:
+                break
+            
+            try:
+                return self._idle.get(timeout=POOL_WAIT_INTERVAL)
+            except queue.Empty:
+                # Re-check: close() may have emptied the pool meanwhile
+                continue
+        
+        client = None
+        try:
+            client = self._connect()
+        finally:
+            with self._clients_lock:
+                self._opening -= 1
+                if client is not None:
+                    self._clients.append(client)
+        return client
+    
+    def _release(self, client: Any) -> None:
+        """Return a borrowed client to the pool."""
+        with self._clients_lock:
+            # Clients closed by close() while borrowed are not reused
+            if any(c is client for c in self._clients):
+                self._idle.put(client)
+    
+    def _connect(self):
+        """
+        Open a new sync client connection.
+        
+        Returns:
+            Connected WeaviateClient
+        """
         try:
             if self.api_key:
-                self.client = weaviate.connect_to_wcs(
+                client = weaviate.connect_to_wcs(
                     cluster_url=self.url,
                     auth_credentials=weaviate.auth.AuthApiKey(self.api_key),
                     skip_init_checks=True
                 )
             else:
-                self.client = weaviate.connect_to_local(
+                client = weaviate.connect_to_local(
                     host=self.url.replace("http://", "").replace("https://", "")
                 )
             
-            logger.info(f"Connected to Weaviate at {self.url}")
+            logger.info(f"Connected to Weaviate at {self.url} ({threading.current_thread().name})")
+            return client
         except Exception as e:
             logger.error(f"Failed to connect to Weaviate: {e}")
             raise
@@ -61,46 +201,69 @@ class WeaviateStore:
         Create the Weaviate schema/class for storing documents.
         """
         try:
-            # Check if collection already exists
-            if self.client.collections.exists(self.class_name):
-                logger.info(f"Collection '{self.class_name}' already exists")
-                return
-            
-            # Create collection with vector configuration
-            logger.info(f"Creating Weaviate collection '{self.class_name}'")
-            
-            self.client.collections.create(
-                name=self.class_name,
-                vectorizer_config=Configure.Vectorizer.none(),
-                properties=[
-                    Property(
-                        name="text",
-                        data_type=DataType.TEXT,
-                        description="The document text"
-                    ),
-                    Property(
-                        name="doc_id",
-                        data_type=DataType.INT,
-                        description="Document ID"
-                    ),
-                    Property(
-                        name="chunk_id",
-                        data_type=DataType.INT,
-                        description="Chunk ID within document"
-                    )
-                ]
-            )
-            
-            logger.info(f"Successfully created collection '{self.class_name}'")
+            with self._borrow() as client:
+                self._create_schema(client)
         
         except Exception as e:
             logger.error(f"Error creating Weaviate schema: {e}")
             raise
     
+    def _create_schema(self, client: Any) -> None:
+        """Create the collection with the given client unless it exists."""
+        # Check if collection already exists
+        if client.collections.exists(self.class_name):
+            logger.info(f"Collection '{self.class_name}' already exists")
+            return
+        
+        # Create collection with vector configuration
+        logger.info(f"Creating Weaviate collection '{self.class_name}'")
+        
+        client.collections.create(
+            name=self.class_name,
+            vectorizer_config=Configure.Vectorizer.none(),
+            properties=[
+                Property(
+                    name="text",
+                    data_type=DataType.TEXT,
+                    description="The document text"
+                ),
+                Property(
+                    name="doc_id",
+                    data_type=DataType.INT,
+                    description="Document ID"
+                ),
+                Property(
+                    name="chunk_id",
+                    data_type=DataType.INT,
+                    description="Chunk ID within document"
+                ),
+                Property(
+                    name="parent_id",
+                    data_type=DataType.TEXT,
+                    description="Parent document ID in the DocStore"
+                ),
+                Property(
+                    name="start",
+                    data_type=DataType.INT,
+                    description="Chunk start offset in the parent document"
+                ),
+                Property(
+                    name="end",
+                    data_type=DataType.INT,
+                    description="Chunk end offset in the parent document"
+                )
+            ]
+        )
+        
+        logger.info(f"Successfully created collection '{self.class_name}'")
+    
     def add_texts(
         self,
         texts: List[str],
-        metadata: List[Dict[str, Any]] = None
+        metadata: List[Dict[str, Any]] = None,
+        embeddings: Optional[List[List[float]]] = None,
+        ids: Optional[List[str]] = None,
+        store_text: bool = True
     ) -> None:
         """
         Add texts to Weaviate.
@@ -108,18 +271,25 @@ class WeaviateStore:
         Args:
             texts: List of texts to add
             metadata: Optional list of metadata dicts for each text
+            embeddings: Optional precomputed vectors (one per text); if omitted,
+                texts are embedded with the store's embedder
+            ids: Optional object UUIDs (generated by Weaviate if omitted)
+            store_text: Keep the text with the vector (False when a
+                DocStore holds it)
         """
         if not texts:
             logger.warning("No texts provided to add")
             return
         
+        client = None
         try:
+            client = self._acquire()
             import time
             
             # Delete all objects first, then delete collection
-            if self.client.collections.exists(self.class_name):
+            if client.collections.exists(self.class_name):
                 logger.info(f"Clearing all objects from '{self.class_name}'")
-                collection = self.client.collections.get(self.class_name)
+                collection = client.collections.get(self.class_name)
                 
                 # Delete all objects
                 try:
@@ -131,44 +301,52 @@ class WeaviateStore:
                 
                 # Now delete collection
                 logger.info(f"Deleting collection '{self.class_name}'")
-                self.client.collections.delete(self.class_name)
+                client.collections.delete(self.class_name)
                 time.sleep(3)
             
             # Wait until fully deleted
             for i in range(10):
-                if not self.client.collections.exists(self.class_name):
+                if not client.collections.exists(self.class_name):
                     logger.info(f"Collection deleted after {i+1}s")
                     break
                 time.sleep(1)
             
             time.sleep(2)
-            self.create_schema()
+            self._create_schema(client)
             
-            # Generate embeddings
-            logger.info(f"Generating embeddings for {len(texts)} texts")
-            embeddings = self.embedder.embed_batch(texts)
+            # Generate embeddings unless the caller already has them
+            if embeddings is None:
+                logger.info(f"Generating embeddings for {len(texts)} texts")
+                embeddings = self.embedder.embed_batch(texts)
             
             # Get collection
-            collection = self.client.collections.get(self.class_name)
+            collection = client.collections.get(self.class_name)
             
             # Add documents
             with collection.batch.dynamic() as batch:
                 for i, (text, embedding) in enumerate(zip(texts, embeddings)):
+                    meta = metadata[i] if metadata and i < len(metadata) else {}
                     properties = {
-                        "text": text,
+                        "text": text if store_text else "",
                         "doc_id": i,
-                        "chunk_id": 0
+                        "chunk_id": meta.get("chunk_id", 0)
                     }
                     
-                    # Add metadata if provided
-                    if metadata and i < len(metadata):
-                        for key, value in metadata[i].items():
-                            if key not in properties:
-                                properties[key] = value
+                    # Chunks of parent documents (Retriever.add_parent_documents)
+                    # need their parent and offsets for small-to-big expansion
+                    for key in ("parent_id", "start", "end"):
+                        if meta.get(key) is not None:
+                            properties[key] = meta[key]
+                    
+                    # Add the remaining metadata
+                    for key, value in meta.items():
+                        if key not in properties:
+                            properties[key] = value
                     
                     batch.add_object(
                         properties=properties,
-                        vector=embedding
+                        vector=embedding,
+                        uuid=ids[i] if ids else None
                     )
             
             logger.info(f"Successfully added {len(texts)} texts to Weaviate")
@@ -187,12 +365,16 @@ class WeaviateStore:
         except Exception as e:
             logger.error(f"Error adding texts to Weaviate: {e}")
             raise
+        finally:
+            if client is not None:
+                self._release(client)
     
     def query(
         self,
         query_text: str,
         top_k: int = 5,
-        filter_dict: Optional[Dict[str, Any]] = None
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """
         Query Weaviate for similar documents.
@@ -200,40 +382,73 @@ class WeaviateStore:
         Args:
             query_text: The query text
             top_k: Number of results to return
-            filter_dict: Optional metadata filter
+            filter_dict: Optional metadata filter (see build_filter())
+            query_embedding: Optional precomputed query vector
             
         Returns:
             List of matching documents with scores
         """
         try:
-            # Generate query embedding
-            query_embedding = self.embedder.embed_text(query_text)
-            
-            # Get collection
-            collection = self.client.collections.get(self.class_name)
+            # Generate query embedding unless the caller already has it
+            if query_embedding is None:
+                query_embedding = self.embedder.embed_text(query_text)
             
             # Query Weaviate
             logger.info(f"Querying Weaviate for: '{query_text[:50]}...'")
             
-            response = collection.query.near_vector(
+            with self._borrow() as client:
+                collection = client.collections.get(self.class_name)
+                response = collection.query.near_vector(
+                    near_vector=query_embedding,
+                    limit=top_k,
+                    filters=build_filter(filter_dict),
+                    return_metadata=MetadataQuery(distance=True)
+                )
+            
+            matches = self._format_matches(response, top_k)
+            logger.info(f"Returning {len(matches)} matches from Weaviate (requested: {top_k})")
+            return matches
+        
+        except Exception as e:
+            logger.error(f"Error querying Weaviate: {e}")
+            raise
+    
+    async def aquery(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Asynchronous variant of query() using the Weaviate async client.
+        
+        Args:
+            query_text: The query text
+            top_k: Number of results to return
+            filter_dict: Optional metadata filter (see build_filter())
+            query_embedding: Optional precomputed query vector
+            
+        Returns:
+            List of matching documents with scores
+        """
+        try:
+            if query_embedding is None:
+                query_embedding = await self.embedder.aembed_text(query_text)
+            
+            client = await self._get_async_client()
+            collection = client.collections.get(self.class_name)
+            
+            logger.info(f"Querying Weaviate for: '{query_text[:50]}...'")
+            
+            response = await collection.query.near_vector(
                 near_vector=query_embedding,
                 limit=top_k,
+                filters=build_filter(filter_dict),
                 return_metadata=MetadataQuery(distance=True)
             )
             
-            # Format results
-            matches = []
-            for obj in response.objects:
-                matches.append({
-                    "id": str(obj.uuid),
-                    "score": 1 - obj.metadata.distance if obj.metadata.distance else 0,
-                    "text": obj.properties.get("text", ""),
-                    "metadata": obj.properties
-                })
-            
-            # Принудительно ограничиваем до top_k
-            matches = matches[:top_k]
-            
+            matches = self._format_matches(response, top_k)
             logger.info(f"Returning {len(matches)} matches from Weaviate (requested: {top_k})")
             return matches
         
@@ -241,20 +456,83 @@ class WeaviateStore:
             logger.error(f"Error querying Weaviate: {e}")
             raise
     
+    async def _get_async_client(self):
+        """
+        Get the async client of the running event loop, connecting it on first use.
+        
+        Returns:
+            Connected WeaviateAsyncClient
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is not None:
+            return client
+        
+        if self.api_key:
+            client = weaviate.use_async_with_weaviate_cloud(
+                cluster_url=self.url,
+                auth_credentials=weaviate.auth.AuthApiKey(self.api_key),
+                skip_init_checks=True
+            )
+        else:
+            client = weaviate.use_async_with_local(
+                host=self.url.replace("http://", "").replace("https://", "")
+            )
+        await client.connect()
+        
+        # Another coroutine may have connected while this one was waiting
+        existing = self._async_clients.get(loop)
+        if existing is not None:
+            await client.close()
+            return existing
+        
+        self._async_clients[loop] = client
+        logger.info(f"Connected async Weaviate client to {self.url}")
+        return client
+    
+    @staticmethod
+    def _format_matches(response: Any, top_k: int) -> List[Dict[str, Any]]:
+        """Convert a near_vector response into result dicts."""
+        matches = []
+        for obj in response.objects:
+            matches.append({
+                "id": str(obj.uuid),
+                "score": 1 - obj.metadata.distance if obj.metadata.distance else 0,
+                "text": obj.properties.get("text", ""),
+                "metadata": obj.properties
+            })
+        
+        # Принудительно ограничиваем до top_k
+        return matches[:top_k]
+    
     def delete_schema(self) -> None:
         """Delete the Weaviate class/schema."""
         try:
-            self.client.collections.delete(self.class_name)
+            with self._borrow() as client:
+                client.collections.delete(self.class_name)
             logger.info(f"Deleted Weaviate collection '{self.class_name}'")
         except Exception as e:
             logger.error(f"Error deleting Weaviate collection: {e}")
             raise
     
     def close(self) -> None:
-        """Close the Weaviate client connection."""
-        try:
-            self.client.close()
-            logger.info("Closed Weaviate connection")
-        except Exception as e:
-            logger.error(f"Error closing Weaviate connection: {e}")
+        """Close all pooled sync client connections (borrowed ones are closed too)."""
+        with self._clients_lock:
+            clients, self._clients = self._clients, []
+            while not self._idle.empty():
+                self._idle.get_nowait()
+        
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.error(f"Error closing Weaviate connection: {e}")
+        logger.info(f"Closed {len(clients)} Weaviate connection(s)")
+    
+    async def aclose(self) -> None:
+        """Close the async client of the running event loop, if any."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+            logger.info("Closed async Weaviate connection")
 
@@ -0,0 +1,68 @@
+"""
+Shared pytest setup: make the project packages importable from tests/
+and provide offline stand-ins for the OpenAI embedder and tiktoken.
+"""
+
+import hashlib
+import sys
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class FakeEmbedder:
+    """Deterministic embedder: a unit vector derived from the text hash."""
+    
+    dimension = 16
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def embed_text(self, text: str) -> List[float]:
+        self.calls += 1
+        return self._vector(text)
+    
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        return [self._vector(text) for text in texts if text and text.strip()]
+    
+    async def aembed_text(self, text: str) -> List[float]:
+        return self.embed_text(text)
+    
+    async def aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_batch(texts)
+    
+    def get_embedding_dimension(self) -> int:
+        return self.dimension
+    
+    def _vector(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        vector = np.frombuffer(digest[:self.dimension], dtype=np.uint8).astype(np.float32) - 127.5
+        return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeEncoding:
+    """Byte-level stand-in for a tiktoken encoding (no download needed)."""
+    
+    def encode(self, text: str, **kwargs) -> List[int]:
+        return list(text.encode("utf-8"))
+    
+    def decode(self, tokens: List[int]) -> str:
+        return bytes(tokens).decode("utf-8", errors="ignore")
+
+
+@pytest.fixture
+def embedder() -> FakeEmbedder:
+    return FakeEmbedder()
+
+
+@pytest.fixture
+def offline_tiktoken(monkeypatch):
+    import tiktoken
+    
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: FakeEncoding())
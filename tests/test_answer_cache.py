@@ -0,0 +1,136 @@
+"""
+AnswerCache through RAGGenerator: repeated requests skip the chat API.
+"""
+
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from rag.answer_cache import AnswerCache
+from rag.compression import ContextCompressor
+from rag.generator import RAGGenerator
+from rag.rate_limit import RateLimiter
+
+
+DOCUMENTS = [
+    {"id": "1", "text": "Пинекон хранит векторы в облаке. Он масштабируется сам.", "score": 0.9},
+    {"id": "2", "text": "Weaviate можно запустить локально.", "score": 0.7},
+]
+
+
+def _response(content: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=None
+    )
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+    
+    def create(self, stream=False, **kwargs):
+        self.calls += 1
+        content = f"ответ {self.calls}"
+        if not stream:
+            return _response(content)
+        return [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))], usage=None)
+            for part in content.split(" ")
+        ]
+
+
+class FakeAsyncCompletions(FakeCompletions):
+    async def create(self, **kwargs):
+        return super().create(**kwargs)
+
+
+@pytest.fixture
+def generator(tmp_path, offline_tiktoken):
+    generator = RAGGenerator(
+        answer_cache=AnswerCache(path=str(tmp_path / "answers.db"), ttl=3600),
+        rate_limiter=RateLimiter(0, 0)
+    )
+    generator.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    yield generator
+    generator.answer_cache.close()
+
+
+def test_repeated_question_is_served_from_cache(generator):
+    completions = generator.client.chat.completions
+    
+    first = generator.generate_answer("Где хранятся векторы?", DOCUMENTS)
+    second = generator.generate_answer("  где хранятся   векторы? ", list(reversed(DOCUMENTS)))
+    
+    assert first == second == "ответ 1"
+    assert completions.calls == 1
+    assert generator.answer_cache.hits == 1
+
+
+def test_changed_context_misses(generator):
+    generator.generate_answer("Где хранятся векторы?", DOCUMENTS)
+    answer = generator.generate_answer("Где хранятся векторы?", DOCUMENTS[:1])
+    
+    assert answer == "ответ 2"
+    assert generator.client.chat.completions.calls == 2
+
+
+def test_stream_and_async_share_the_cache(generator):
+    answer = "".join(generator.stream_answer("Где хранятся векторы?", DOCUMENTS))
+    
+    async_completions = FakeAsyncCompletions()
+    generator._get_async_client = lambda: SimpleNamespace(chat=SimpleNamespace(completions=async_completions))
+    cached = asyncio.run(generator.agenerate_answer("Где хранятся векторы?", DOCUMENTS))
+    
+    assert answer == "ответ1"
+    assert cached == answer
+    assert async_completions.calls == 0
+
+
+def test_cached_answer_is_streamed_whole(generator):
+    generator.answer_cache.put(
+        generator._pack("Вопрос", DOCUMENTS)[1], "готовый ответ", generator.model
+    )
+    
+    assert list(generator.stream_answer("Вопрос", DOCUMENTS)) == ["готовый ответ"]
+    assert generator.client.chat.completions.calls == 0
+
+
+def test_cache_hit_skips_compression(generator, embedder):
+    generator.compressor = ContextCompressor(embedder=embedder, max_tokens=1000)
+    query_embedding = embedder.embed_text("Где хранятся векторы?")
+    embedder.calls = 0
+    
+    generator.generate_answer("Где хранятся векторы?", DOCUMENTS, query_embedding=query_embedding)
+    # Only the sentences were embedded; the query vector was reused
+    assert embedder.calls == 1
+    
+    generator.generate_answer("Где хранятся векторы?", DOCUMENTS, query_embedding=query_embedding)
+    assert embedder.calls == 1
+    assert generator.client.chat.completions.calls == 1
+
+
+def test_compressor_settings_are_part_of_the_key(generator, embedder):
+    generator.generate_answer("Где хранятся векторы?", DOCUMENTS)
+    
+    generator.compressor = ContextCompressor(embedder=embedder, max_tokens=1000)
+    generator.generate_answer("Где хранятся векторы?", DOCUMENTS)
+    
+    assert generator.client.chat.completions.calls == 2
+
+
+class BrokenCache(AnswerCache):
+    def get(self, key):
+        raise sqlite3.OperationalError("database is locked")
+    
+    def put(self, key, answer, model=""):
+        raise sqlite3.OperationalError("database or disk is full")
+
+
+def test_cache_errors_do_not_fail_the_request(generator, tmp_path):
+    generator.answer_cache = BrokenCache(path=str(tmp_path / "broken.db"))
+    
+    assert generator.generate_answer("Где хранятся векторы?", DOCUMENTS) == "ответ 1"
+    assert list(generator.stream_answer("Где хранятся векторы?", DOCUMENTS)) == ["ответ", "2"]
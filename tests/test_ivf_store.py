@@ -0,0 +1,46 @@
+"""
+IVFStore persistence: records stay aligned with the index rows.
+"""
+
+import json
+
+from stores.ivf_store import IVFStore
+
+
+TEXTS = [f"passage {i}" for i in range(30)]
+
+
+def make_store(path, embedder) -> IVFStore:
+    return IVFStore(path=str(path), embedder=embedder, nlist=4, nprobe=4, train_size=16)
+
+
+def test_reload(tmp_path, embedder):
+    store = make_store(tmp_path, embedder)
+    ids = store.add_texts(TEXTS[:10], metadata=[{"n": i} for i in range(10)])
+    store.add_texts(TEXTS[10:])
+    
+    reopened = make_store(tmp_path, embedder)
+    assert reopened.count() == len(TEXTS)
+    assert reopened.query(TEXTS[3], top_k=1)[0]["id"] == ids[3]
+    assert reopened.query(TEXTS[3], top_k=1, filter_dict={"n": 3})[0]["metadata"] == {"n": 3}
+
+
+def test_records_of_an_interrupted_save_are_dropped(tmp_path, embedder):
+    store = make_store(tmp_path, embedder)
+    store.add_texts(TEXTS[:20])
+    
+    # The records of a batch were written, then the save stopped before
+    # the vectors (and in the middle of a line)
+    orphan = {"id": "orphan", "text": "never indexed", "metadata": {}}
+    with open(tmp_path / IVFStore.RECORDS, "a", encoding="utf-8") as f:
+        f.write(json.dumps(orphan) + "\n" + json.dumps(orphan)[:10])
+    
+    reopened = make_store(tmp_path, embedder)
+    assert reopened.count() == 20
+    new_ids = reopened.add_texts(TEXTS[20:])
+    
+    reopened = make_store(tmp_path, embedder)
+    assert reopened.count() == len(TEXTS)
+    for i, vector_id in enumerate(new_ids):
+        match = reopened.query(TEXTS[20 + i], top_k=1)[0]
+        assert (match["id"], match["text"]) == (vector_id, TEXTS[20 + i])
@@ -0,0 +1,171 @@
+"""
+LocalStore: add, query, delete, compaction, reload and quantized recall.
+"""
+
+import numpy as np
+import pytest
+
+from stores.local_store import LocalStore
+
+
+TEXTS = [f"document number {i}" for i in range(40)]
+
+
+def make_store(path, embedder, **kwargs) -> LocalStore:
+    kwargs.setdefault("quantization", "none")
+    return LocalStore(
+        path=str(path),
+        embedder=embedder,
+        background=False,
+        search_workers=1,
+        **kwargs
+    )
+
+
+def clustered_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(16, dim))
+    vectors = centers[rng.integers(0, len(centers), n)] + rng.normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_add_and_query(tmp_path, embedder):
+    store = make_store(tmp_path, embedder)
+    ids = store.add_texts(TEXTS, metadata=[{"n": i} for i in range(len(TEXTS))])
+    
+    assert store.count() == len(TEXTS)
+    
+    results = store.query(TEXTS[7], top_k=3)
+    assert results[0]["id"] == ids[7]
+    assert results[0]["text"] == TEXTS[7]
+    assert results[0]["metadata"] == {"n": 7}
+    assert results[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    
+    filtered = store.query(TEXTS[7], top_k=5, filter_dict={"n": {"$gte": 30}})
+    assert filtered and all(r["metadata"]["n"] >= 30 for r in filtered)
+    store.close()
+
+
+def test_empty_texts_keep_alignment(tmp_path, embedder):
+    store = make_store(tmp_path, embedder)
+    ids = store.add_texts(["first", "", "third"], metadata=[{"n": 1}, {"n": 2}, {"n": 3}], ids=["a", "b", "c"])
+    
+    assert ids == ["a", "c"]
+    assert store.query("third", top_k=1)[0]["metadata"] == {"n": 3}
+    store.close()
+
+
+def test_delete(tmp_path, embedder):
+    store = make_store(tmp_path, embedder)
+    ids = store.add_texts(TEXTS)
+    
+    assert store.delete([ids[3], "unknown"]) == 1
+    assert store.count() == len(TEXTS) - 1
+    assert ids[3] not in [r["id"] for r in store.query(TEXTS[3], top_k=len(TEXTS))]
+    store.close()
+
+
+def test_compaction_drops_deleted_rows(tmp_path, embedder):
+    store = make_store(tmp_path, embedder, compact_rows=1000)
+    first = store.add_texts(TEXTS[:20])
+    store.flush()
+    second = store.add_texts(TEXTS[20:])
+    store.flush()
+    store.delete(first[:5])
+    
+    # Only the heavily deleted segment is rewritten
+    assert store.compact()
+    assert sorted(len(s) for s in store._segments) == [15, 20]
+    assert store.count() == len(TEXTS) - 5
+    
+    live = {r["id"] for r in store.query(TEXTS[0], top_k=len(TEXTS))}
+    assert live == set(first[5:] + second)
+    assert not store.compact()
+    store.close()
+
+
+def test_compaction_merges_a_bounded_tier(tmp_path, embedder):
+    store = make_store(tmp_path, embedder, compact_rows=1000)
+    for start in range(0, len(TEXTS), 4):
+        store.add_texts(TEXTS[start:start + 4])
+        store.flush()
+    
+    assert len(store._segments) == 10
+    assert store.compact()
+    # Eight segments of the tier are merged; the merged one is a tier up
+    assert sorted(len(s) for s in store._segments) == [4, 4, 32]
+    assert not store.compact()
+    assert store.count() == len(TEXTS)
+    store.close()
+
+
+def test_reload(tmp_path, embedder):
+    store = make_store(tmp_path, embedder)
+    ids = store.add_texts(TEXTS[:20])
+    store.flush()
+    store.add_texts(TEXTS[20:], ids=[f"late-{i}" for i in range(20)])
+    store.delete([ids[0]])
+    # Not flushed: the tail is recovered from the write-ahead log
+    store._wal.close()
+    
+    reopened = make_store(tmp_path, embedder)
+    assert reopened.count() == len(TEXTS) - 1
+    assert reopened.query(TEXTS[25], top_k=1)[0]["id"] == "late-5"
+    assert ids[0] not in [r["id"] for r in reopened.query(TEXTS[0], top_k=len(TEXTS))]
+    reopened.close()
+    
+    reopened = make_store(tmp_path, embedder)
+    assert reopened.count() == len(TEXTS) - 1
+    reopened.close()
+
+
+@pytest.mark.parametrize("quantization,rescore_factor,min_recall", [
+    ("int8", 4, 0.95),
+    ("binary", 16, 0.5),
+])
+def test_quantized_recall(tmp_path, embedder, quantization, rescore_factor, min_recall):
+    corpus = clustered_vectors(3000, 128)
+    queries = clustered_vectors(50, 128, seed=1)
+    k = 10
+    truth = np.argsort(-(queries @ corpus.T), axis=1)[:, :k]
+    
+    store = make_store(tmp_path, embedder, quantization=quantization, rescore_factor=rescore_factor)
+    ids = [str(i) for i in range(len(corpus))]
+    store.add_texts(ids, embeddings=corpus, ids=ids)
+    store.flush()
+    
+    found = [[int(r["id"]) for r in matches] for matches in store.query_batch(list(queries), k)]
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth.tolist())])
+    
+    assert recall >= min_recall
+    store.close()
+
+
+@pytest.mark.parametrize("quantization,rescore_factor,min_recall", [
+    ("int8", 4, 0.95),
+    ("binary", 16, 0.5),
+])
+def test_quantizer_is_not_fitted_on_a_tiny_first_batch(tmp_path, embedder, quantization, rescore_factor, min_recall):
+    corpus = clustered_vectors(5000, 128)
+    queries = clustered_vectors(50, 128, seed=1)
+    k = 10
+    truth = np.argsort(-(queries @ corpus.T), axis=1)[:, :k]
+    
+    store = make_store(tmp_path, embedder, quantization=quantization, rescore_factor=rescore_factor)
+    ids = [str(i) for i in range(len(corpus))]
+    # One document first, as the GUI adds them, then the rest in batches
+    for start, stop in [(0, 1), (1, 500), (500, 5000)]:
+        store.add_texts(ids[start:stop], embeddings=corpus[start:stop], ids=ids[start:stop])
+        store.flush()
+    
+    found = [[int(r["id"]) for r in matches] for matches in store.query_batch(list(queries), k)]
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth.tolist())])
+    
+    assert all(s.codes is not None for s in store._segments)
+    assert recall >= min_recall
+    store.close()
+    
+    reopened = make_store(tmp_path, embedder, quantization=quantization, rescore_factor=rescore_factor)
+    reloaded = [[int(r["id"]) for r in matches] for matches in reopened.query_batch(list(queries), k)]
+    assert reloaded == found
+    reopened.close()
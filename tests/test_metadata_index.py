@@ -0,0 +1,72 @@
+"""
+MetadataIndex must select exactly the rows matches_filter accepts.
+"""
+
+import pytest
+
+from stores.metadata_index import MetadataIndex, matches_filter
+
+
+RECORDS = [
+    {"metadata": {"n": 1, "s": "a", "tags": ["x", "y"]}},
+    {"metadata": {"n": 2.5, "s": "b", "tags": ["y"]}},
+    {"metadata": {"s": "a", "tags": []}},
+    {"metadata": {"n": 3, "tags": None}},
+    {"metadata": {"n": -1, "s": None}},
+    {"metadata": {"n": 2, "s": "c", "tags": ["z", None]}},
+    {"metadata": {}},
+]
+
+FILTERS = [
+    {"s": "a"},
+    {"s": None},
+    {"s": {"$ne": "a"}},
+    {"s": {"$in": ["a", "c"]}},
+    {"s": {"$nin": ["a", None]}},
+    {"s": {"$gt": "a"}},
+    {"tags": "y"},
+    {"tags": None},
+    {"tags": {"$ne": "y"}},
+    {"tags": {"$in": ["x", "z"]}},
+    {"tags": {"$in": [None]}},
+    {"tags": {"$in": ["x", None]}},
+    {"tags": {"$nin": [None]}},
+    {"tags": {"$nin": ["y", None]}},
+    {"tags": {"$gte": "x"}},
+    {"n": 2},
+    {"n": None},
+    {"n": {"$in": [1, 3, None]}},
+    {"n": {"$nin": [2.5]}},
+    {"n": {"$gt": 1}},
+    {"n": {"$gte": 2}},
+    {"n": {"$lt": 2.5}},
+    {"n": {"$lte": True}},
+    {"n": {"$gte": 0, "$lt": 3}, "s": {"$ne": "b"}},
+    {"missing": None},
+    {"missing": {"$in": ["a"]}},
+    {},
+]
+
+
+@pytest.mark.parametrize("filter_dict", FILTERS)
+def test_rows_match_matches_filter(filter_dict):
+    index = MetadataIndex(RECORDS)
+    expected = [i for i, r in enumerate(RECORDS) if matches_filter(r["metadata"], filter_dict)]
+    
+    assert index.rows(filter_dict).tolist() == expected
+    assert index.mask(filter_dict).tolist() == [i in expected for i in range(len(RECORDS))]
+
+
+@pytest.mark.parametrize("operand", ["2", None, [1]])
+def test_range_on_numbers_raises_like_matches_filter(operand):
+    filter_dict = {"n": {"$gt": operand}}
+    
+    with pytest.raises(TypeError):
+        [matches_filter(r["metadata"], filter_dict) for r in RECORDS]
+    with pytest.raises(TypeError):
+        MetadataIndex(RECORDS).rows(filter_dict)
+
+
+def test_unsupported_operator():
+    with pytest.raises(ValueError):
+        MetadataIndex(RECORDS).rows({"n": {"$regex": "1"}})
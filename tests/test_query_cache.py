@@ -0,0 +1,104 @@
+"""
+QueryCache: hits, invalidation, stale writes and semantic near-hits.
+"""
+
+import pytest
+
+from rag.cache import QueryCache
+
+
+RESULTS = [{"id": "a", "score": 0.9, "text": "alpha"}]
+
+
+def test_hit_returns_copy():
+    cache = QueryCache()
+    key = cache.make_key("  What is RAG? ", "local", 5)
+    cache.put(key, RESULTS)
+    
+    cached = cache.get(cache.make_key("what is   rag?", "local", 5))
+    assert cached == RESULTS
+    cached[0]["store"] = "local"
+    assert "store" not in cache.get(key)[0]
+
+
+def test_key_includes_store_top_k_and_filter():
+    cache = QueryCache()
+    cache.put(cache.make_key("q", "local", 5), RESULTS)
+    
+    assert cache.get(cache.make_key("q", "ivf", 5)) is None
+    assert cache.get(cache.make_key("q", "local", 3)) is None
+    assert cache.get(cache.make_key("q", "local", 5, {"n": 1})) is None
+
+
+def test_invalidate_store():
+    cache = QueryCache()
+    local = cache.make_key("q", "local", 5)
+    ivf = cache.make_key("q", "ivf", 5)
+    cache.put(local, RESULTS)
+    cache.put(ivf, RESULTS)
+    
+    cache.invalidate("local")
+    
+    assert cache.get(local) is None
+    assert cache.get(ivf) == RESULTS
+
+
+def test_invalidate_all():
+    cache = QueryCache()
+    cache.put(cache.make_key("q", "local", 5), RESULTS)
+    cache.put(cache.make_key("q", "ivf", 5), RESULTS)
+    
+    cache.invalidate()
+    
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.parametrize("store_type", ["local", None])
+def test_results_of_a_stale_generation_are_dropped(store_type):
+    cache = QueryCache()
+    key = cache.make_key("q", "local", 5)
+    generation = cache.generation("local")
+    
+    # A write lands while the query is running
+    cache.invalidate(store_type)
+    cache.put(key, RESULTS, generation=generation)
+    assert cache.get(key) is None
+    
+    cache.put(key, RESULTS, generation=cache.generation("local"))
+    assert cache.get(key) == RESULTS
+
+
+def test_expired_entries_miss():
+    cache = QueryCache(ttl=0)
+    key = cache.make_key("q", "local", 5)
+    cache.put(key, RESULTS)
+    
+    assert cache.get(key) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction():
+    cache = QueryCache(max_entries=2)
+    keys = [cache.make_key(q, "local", 5) for q in ("a", "b", "c")]
+    cache.put(keys[0], RESULTS)
+    cache.put(keys[1], RESULTS)
+    cache.get(keys[0])
+    cache.put(keys[2], RESULTS)
+    
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == RESULTS
+
+
+def test_semantic_near_hit(embedder):
+    cache = QueryCache(semantic_threshold=0.95)
+    vector = embedder.embed_text("q")
+    cache.put(cache.make_key("q", "local", 5), RESULTS, vector)
+    
+    near = [x * 1.01 if i == 0 else x for i, x in enumerate(vector)]
+    assert cache.get_similar(cache.make_key("other wording", "local", 5), near) == RESULTS
+    assert cache.get_similar(cache.make_key("other wording", "ivf", 5), near) is None
+    assert cache.get_similar(cache.make_key("far", "local", 5), embedder.embed_text("far")) is None
+    
+    stats = cache.stats()
+    assert stats["semantic_hits"] == 1
+    assert stats["misses"] == 2
@@ -0,0 +1,80 @@
+"""
+RateLimiter in RAGGenerator: batch jobs are throttled, interactive calls are not.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import rag.generator
+from rag.generator import RAGGenerator
+from rag.rate_limit import RateLimiter
+
+
+DOCUMENTS = [{"id": "1", "text": "Weaviate можно запустить локально.", "score": 0.9}]
+
+
+class CountingLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(0, 0)
+        self.acquired = 0
+    
+    def acquire(self, tokens=0):
+        self.acquired += 1
+        super().acquire(tokens)
+    
+    async def aacquire(self, tokens=0):
+        self.acquired += 1
+        await super().aacquire(tokens)
+
+
+class FakeCompletions:
+    def create(self, **kwargs):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ответ"))],
+            usage=None
+        )
+
+
+class FakeAsyncCompletions(FakeCompletions):
+    async def create(self, **kwargs):
+        return super().create(**kwargs)
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    limiter = CountingLimiter()
+    monkeypatch.setattr(rag.generator, "get_shared_limiter", lambda: limiter)
+    return limiter
+
+
+@pytest.fixture
+def generator(offline_tiktoken, shared):
+    generator = RAGGenerator(answer_cache=None)
+    generator.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    generator._get_async_client = lambda: SimpleNamespace(chat=SimpleNamespace(completions=FakeAsyncCompletions()))
+    return generator
+
+
+def test_interactive_calls_are_not_throttled_by_default(generator, shared):
+    assert generator.generate_answer("Где запустить Weaviate?", DOCUMENTS) == "ответ"
+    assert shared.acquired == 0
+
+
+def test_batch_uses_the_shared_limiter(generator, shared, tmp_path):
+    items = [(f"Вопрос {i}", DOCUMENTS) for i in range(3)]
+    
+    stats = generator.generate_many(items, str(tmp_path / "answers.jsonl"))
+    
+    assert stats["succeeded"] == 3
+    assert shared.acquired == 3
+
+
+def test_explicit_limiter_applies_to_every_call(generator, shared, tmp_path):
+    limiter = generator.rate_limiter = CountingLimiter()
+    
+    generator.generate_answer("Где запустить Weaviate?", DOCUMENTS)
+    generator.generate_many([("Вопрос", DOCUMENTS)], str(tmp_path / "answers.jsonl"))
+    
+    assert limiter.acquired == 2
+    assert shared.acquired == 0
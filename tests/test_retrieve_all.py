@@ -0,0 +1,50 @@
+"""
+Retriever.retrieve_all(): deadlines and abandoned store queries.
+"""
+
+import threading
+
+from config.settings import settings
+from rag.retriever import Retriever
+
+
+class HangingStore:
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+    
+    def query(self, query_text, top_k=5, filter_dict=None, query_embedding=None):
+        self.calls += 1
+        self.release.wait()
+        return []
+
+
+class FastStore:
+    def query(self, query_text, top_k=5, filter_dict=None, query_embedding=None):
+        return [{"id": "fast", "score": 1.0, "text": query_text, "metadata": {}}]
+
+
+def test_hanging_store_is_abandoned_and_bounded(embedder):
+    hanging = HangingStore()
+    retriever = Retriever(embedder=embedder, coalesce=False, docstore=None)
+    retriever._stores.update(pinecone=hanging, local=FastStore())
+    
+    try:
+        for _ in range(settings.RETRIEVE_MAX_ABANDONED + 2):
+            results = retriever.retrieve_all("question", stores=["pinecone", "local"], store_timeout=0.1)
+            assert results.timed_out == ["pinecone"]
+            assert [r["id"] for r in results["local"]] == ["fast"]
+        
+        # Once the limit is reached the store is skipped, not queried
+        assert hanging.calls == settings.RETRIEVE_MAX_ABANDONED
+        
+        hanging.release.set()
+        retriever._executor.shutdown(wait=True)
+        retriever._executor = None
+        
+        results = retriever.retrieve_all("question", stores=["pinecone", "local"], store_timeout=1.0)
+        assert results.errors == {}
+        assert hanging.calls == settings.RETRIEVE_MAX_ABANDONED + 1
+    finally:
+        hanging.release.set()
+        retriever.cleanup()
@@ -0,0 +1,164 @@
+"""
+Async Retriever APIs: aretrieve, coalescing, caching, aretrieve_all and agenerate.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from rag.cache import QueryCache
+from rag.retriever import Retriever
+from stores.local_store import LocalStore
+
+
+class FakeStore:
+    """Sync store returning fixed results after an optional delay."""
+    
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.embeddings = []
+    
+    def query(self, query_text, top_k=5, filter_dict=None, query_embedding=None):
+        time.sleep(self.delay)
+        return self._results(query_text, top_k, query_embedding)
+    
+    def _results(self, query_text, top_k, query_embedding):
+        self.calls += 1
+        self.embeddings.append(query_embedding)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return [
+            {"id": f"{self.name}-{i}", "score": 1.0 - i / 10, "text": query_text, "metadata": {}}
+            for i in range(top_k)
+        ]
+
+
+class FakeAsyncStore(FakeStore):
+    """Store with a native aquery coroutine, like Pinecone and Weaviate."""
+    
+    async def aquery(self, query_text, top_k=5, filter_dict=None, query_embedding=None):
+        await asyncio.sleep(self.delay)
+        return self._results(query_text, top_k, query_embedding)
+
+
+def make_retriever(embedder, cache=None, **stores) -> Retriever:
+    retriever = Retriever(embedder=embedder, cache=cache, docstore=None)
+    retriever._stores.update(stores)
+    return retriever
+
+
+def test_aretrieve_tags_results(embedder):
+    store = FakeStore("local")
+    retriever = make_retriever(embedder, local=store)
+    
+    results = asyncio.run(retriever.aretrieve("question", "local", top_k=3))
+    
+    assert [r["id"] for r in results] == ["local-0", "local-1", "local-2"]
+    assert all(r["store"] == "local" for r in results)
+    assert store.calls == 1
+
+
+def test_aretrieve_embeds_for_async_stores(embedder):
+    store = FakeAsyncStore("pinecone")
+    retriever = make_retriever(embedder, pinecone=store)
+    
+    asyncio.run(retriever.aretrieve("question", "pinecone"))
+    
+    assert store.embeddings == [embedder.embed_text("question")]
+
+
+def test_concurrent_identical_queries_are_coalesced(embedder):
+    store = FakeStore("local", delay=0.05)
+    retriever = make_retriever(embedder, local=store)
+    
+    async def run():
+        return await asyncio.gather(*[retriever.aretrieve("question", "local") for _ in range(5)])
+    
+    results = asyncio.run(run())
+    
+    assert store.calls == 1
+    assert all(r == results[0] for r in results)
+    results[0][0]["id"] = "changed"
+    assert results[1][0]["id"] == "local-0"
+
+
+def test_cache_is_invalidated_by_aadd_documents(tmp_path, embedder):
+    store = LocalStore(path=str(tmp_path), embedder=embedder, background=False, search_workers=1)
+    retriever = make_retriever(embedder, cache=QueryCache(), local=store)
+    
+    async def run():
+        await retriever.aadd_documents(["alpha text", "", "beta text"], "local", [{"n": 1}, {"n": 2}, {"n": 3}])
+        first = await retriever.aretrieve("beta text", "local", top_k=1)
+        cached = await retriever.aretrieve("beta text", "local", top_k=1)
+        await retriever.aadd_documents(["gamma text"], "local")
+        fresh = await retriever.aretrieve("beta text", "local", top_k=5)
+        return first, cached, fresh
+    
+    first, cached, fresh = asyncio.run(run())
+    
+    assert first[0]["text"] == "beta text"
+    assert first[0]["metadata"] == {"n": 3}
+    assert cached == first
+    assert retriever.cache.stats()["hits"] == 1
+    assert {r["text"] for r in fresh} == {"alpha text", "beta text", "gamma text"}
+    store.close()
+
+
+def test_aretrieve_all_reports_failures_and_timeouts(embedder):
+    retriever = make_retriever(
+        embedder,
+        local=FakeStore("local"),
+        ivf=FakeStore("ivf", fail=True),
+        pinecone=FakeAsyncStore("pinecone", delay=1.0)
+    )
+    
+    results = asyncio.run(retriever.aretrieve_all(
+        "question", top_k=2, stores=["pinecone", "ivf", "local"], store_timeout=0.2
+    ))
+    
+    assert list(results) == ["pinecone", "ivf", "local"]
+    assert [r["id"] for r in results["local"]] == ["local-0", "local-1"]
+    assert results["ivf"] == [] and "ivf is down" in results.errors["ivf"]
+    assert results["pinecone"] == [] and results.timed_out == ["pinecone"]
+
+
+def test_aretrieve_all_embeds_once_and_uses_cache(embedder):
+    local, ivf = FakeStore("local"), FakeStore("ivf")
+    retriever = make_retriever(embedder, cache=QueryCache(), local=local, ivf=ivf)
+    
+    async def run():
+        await retriever.aretrieve_all("question", stores=["local", "ivf"])
+        embedder.calls = 0
+        # Exact cache hits need no embedding and no store round trip
+        return await retriever.aretrieve_all("question", stores=["local", "ivf"]), embedder.calls
+    
+    results, calls = asyncio.run(run())
+    
+    assert calls == 0
+    assert local.embeddings == ivf.embeddings == [embedder.embed_text("question")]
+    assert [r["id"] for r in results["ivf"]] == [f"ivf-{i}" for i in range(5)]
+
+
+def test_agenerate_reuses_the_query_vector(embedder):
+    store = FakeStore("local")
+    retriever = make_retriever(embedder, local=store)
+    seen = {}
+    
+    async def agenerate_answer_with_sources(query, results, query_embedding=None):
+        seen["query_embedding"] = query_embedding
+        return {"answer": "ok", "sources": results, "num_sources": len(results)}
+    
+    generator = SimpleNamespace(
+        compressor=object(),
+        agenerate_answer_with_sources=agenerate_answer_with_sources
+    )
+    
+    answer = asyncio.run(retriever.agenerate("question", "local", top_k=2, generator=generator))
+    
+    assert answer["num_sources"] == 2
+    assert store.embeddings == [seen["query_embedding"]] == [embedder.embed_text("question")]
@@ -2,6 +2,15 @@
 
 from .logger import setup_logger, logger
 from .chunker import TextChunker
+from .openai_client import get_openai_client, get_async_openai_client, close_clients, aclose_clients
 
-__all__ = ["setup_logger", "logger", "TextChunker"]
+__all__ = [
+    "setup_logger",
+    "logger",
+    "TextChunker",
+    "get_openai_client",
+    "get_async_openai_client",
+    "close_clients",
+    "aclose_clients",
+]
 
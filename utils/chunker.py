@@ -2,7 +2,7 @@
 Text chunking utilities for processing large documents.
 """
 
-from typing import List, Optional
+from typing import List, Dict, Any, Optional
 import tiktoken
 from loguru import logger
 
@@ -73,6 +73,51 @@ class TextChunker:
         logger.info(f"Split text into {len(chunks)} chunks (total tokens: {total_tokens})")
         return chunks
     
+    def chunk_with_offsets(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Split text like chunk_text() and record where each chunk lies.
+        
+        Chunk boundaries are moved to character boundaries, so every chunk
+        is exactly ``text[start:end]`` and can be cut back out of the
+        stored parent document.
+        
+        Args:
+            text: The text to chunk
+            
+        Returns:
+            List of dictionaries with 'text', 'start' and 'end' (character
+            offsets into text)
+        """
+        if not text or not text.strip():
+            logger.warning("Empty text provided to chunker")
+            return []
+        
+        tokens = self.encoding.encode(text)
+        total_tokens = len(tokens)
+        
+        # Character offset at which each token starts
+        _, offsets = self.encoding.decode_with_offsets(tokens)
+        
+        def char_offset(token_idx: int) -> int:
+            return offsets[token_idx] if token_idx < total_tokens else len(text)
+        
+        chunks = []
+        start_idx = 0
+        
+        while start_idx < total_tokens:
+            end_idx = min(start_idx + self.chunk_size, total_tokens)
+            start, end = char_offset(start_idx), char_offset(end_idx)
+            
+            if end > start:
+                chunks.append({"text": text[start:end], "start": start, "end": end})
+            
+            if end_idx == total_tokens:
+                break
+            start_idx = max(end_idx - self.chunk_overlap, start_idx + 1)
+        
+        logger.info(f"Split text into {len(chunks)} chunks with offsets (total tokens: {total_tokens})")
+        return chunks
+    
     def chunk_documents(self, documents: List[str]) -> List[dict]:
         """
         Chunk multiple documents and track their source.
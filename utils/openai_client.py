@@ -0,0 +1,142 @@
+"""
+Process-wide OpenAI clients sharing one tuned HTTP connection pool.
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Dict, Any
+
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from loguru import logger
+
+from config.settings import settings
+
+_lock = threading.Lock()
+_http_client = None
+_clients: Dict[str, OpenAI] = {}
+
+# httpx async connections belong to the event loop that opened them, so
+# async clients are shared per loop and dropped together with it
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+def _http_options() -> Dict[str, Any]:
+    """Pool limits, timeouts and protocol of the shared HTTP clients."""
+    http2 = settings.OPENAI_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("OPENAI_HTTP2 is set but the h2 package is not installed - using HTTP/1.1")
+            http2 = False
+    
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY
+        ),
+        "timeout": httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT),
+        "http2": http2
+    }
+
+
+def get_openai_client(api_key: str = None) -> OpenAI:
+    """
+    Get the shared synchronous OpenAI client.
+    
+    All clients use one HTTP connection pool, so embedding and generation
+    requests from any thread reuse warm keep-alive connections.
+    
+    Args:
+        api_key: OpenAI API key (defaults to settings)
+    
+    Returns:
+        OpenAI client for the key
+    """
+    global _http_client
+    api_key = api_key or settings.OPENAI_API_KEY
+    
+    client = _clients.get(api_key)
+    if client is None:
+        with _lock:
+            client = _clients.get(api_key)
+            if client is None:
+                if _http_client is None:
+                    options = _http_options()
+                    _http_client = DefaultHttpxClient(**options)
+                    logger.info(
+                        f"Created shared OpenAI HTTP pool "
+                        f"(max_connections={options['limits'].max_connections}, http2={options['http2']})"
+                    )
+                client = OpenAI(api_key=api_key, http_client=_http_client)
+                _clients[api_key] = client
+    return client
+
+
+def get_async_openai_client(api_key: str = None) -> AsyncOpenAI:
+    """
+    Get the shared asynchronous OpenAI client of the running event loop.
+    
+    Must be called from inside an event loop; all coroutines of that loop
+    share one HTTP connection pool.
+    
+    Args:
+        api_key: OpenAI API key (defaults to settings)
+    
+    Returns:
+        AsyncOpenAI client for the key and the current loop
+    """
+    api_key = api_key or settings.OPENAI_API_KEY
+    loop = asyncio.get_running_loop()
+    
+    with _lock:
+        entry = _async_clients.get(loop)
+        if entry is None:
+            entry = {"http_client": DefaultAsyncHttpxClient(**_http_options()), "clients": {}}
+            _async_clients[loop] = entry
+        
+        client = entry["clients"].get(api_key)
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key, http_client=entry["http_client"])
+            entry["clients"][api_key] = client
+    return client
+
+
+async def aclose_clients() -> None:
+    """
+    Close the asynchronous connection pool of the running event loop.
+    
+    Await it before the loop ends (e.g. at the end of the coroutine given to
+    asyncio.run()); a later get_async_openai_client() call opens a new pool.
+    """
+    with _lock:
+        entry = _async_clients.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry["http_client"].aclose()
+
+
+def close_clients() -> None:
+    """
+    Close the shared connection pools and forget all clients.
+    
+    Async pools can only be closed on their own event loop: the pools of
+    running loops are closed there, the pools of loops that are not running
+    are dropped. From async code, await aclose_clients() on each loop
+    before it stops.
+    """
+    global _http_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        _clients.clear()
+        
+        entries = list(_async_clients.items())
+        _async_clients.clear()
+    
+    for loop, entry in entries:
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(entry["http_client"].aclose(), loop)